@@ -1,77 +1,188 @@
+import time
+# Start of the script run: module imports and the first render are reported as startup spans
+SCRIPT_STARTED = time.perf_counter()
+
 import streamlit as st
 import subprocess
 import os
-import json
-import google.generativeai as genai
 from dotenv import load_dotenv
 from datetime import datetime
-import pandas as pd
-from deepgram import DeepgramClient, PrerecordedOptions, SpeakOptions
-import asyncio
 import re
-import pyaudio
-import wave
-import tempfile
-from io import BytesIO
-import time
+import weakref
+# Heavy modules (pandas, the Gemini/Deepgram SDKs, aiohttp, the audio stack) are imported
+# where they are first needed so the page starts rendering without waiting for them
+from query_engine import answer_locally, format_size
+from cache import ResponseCache, AudioCache
+from snapshot_service import SnapshotService, FROM_ENV
+from commands import parse_command, run_plan, describe_plan, summarize
+from content_index import parse_content_query, summarize_matches
+from duplicates import is_duplicate_query, summarize_duplicates
+from backends import Deferred, GeminiBackend, DeepgramSTTBackend, DeepgramTTSBackend
+from metrics import get_tracer, span, start_metrics_server
 
 # Load environment variables
 load_dotenv()
 
-# Configure all services
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel('gemini-2.0-flash-001')
+@st.cache_resource
+def get_gemini_model():
+    """Gemini model, configured on first use (once per process)"""
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    return genai.GenerativeModel('gemini-2.0-flash-001')
+
+@st.cache_resource
+def get_deepgram_client():
+    """Deepgram v3/v4 client for both STT and TTS, created on first use"""
+    from deepgram import DeepgramClient
+    return DeepgramClient(os.getenv("DEEPGRAM_API_KEY"))
+
+# SDK clients are built the first time a request needs them, not on every script run
+model = Deferred(get_gemini_model)
+deepgram = Deferred(get_deepgram_client)
+
+get_tracer().record("script_imports", time.perf_counter() - SCRIPT_STARTED)
+
+@st.cache_resource
+def get_response_cache():
+    """Process-wide Gemini response cache (shared by all sessions, survives reruns)"""
+    cache = ResponseCache.from_env()
+    get_tracer().register_gauges("response_cache", cache.stats)
+    return cache
+
+@st.cache_resource
+def get_tts_cache():
+    """Process-wide cache of synthesized replies"""
+    cache = AudioCache.from_env()
+    get_tracer().register_gauges("tts_cache", cache.stats)
+    return cache
+
+@st.cache_resource
+def get_snapshot_service():
+    """Process-wide directory snapshot: one scan, one watcher and one index for all sessions"""
+    return SnapshotService()
+
+@st.cache_resource
+def get_metrics_server():
+    """Prometheus /metrics endpoint, started once per process (None if disabled or the port is taken)"""
+    return start_metrics_server()
 
-# Initialize Deepgram v3/v4 client for both STT and TTS
-deepgram = DeepgramClient(os.getenv("DEEPGRAM_API_KEY"))
+@st.cache_resource
+def get_service_runner():
+    """Background event loop with the pooled async API client, shared by all sessions"""
+    from services import ServiceRunner
+    return ServiceRunner()
+
+def create_backends():
+    """LLM, STT and TTS backends: the SDK clients, or the async service layer with AI_CLIENT=async"""
+    if os.getenv("AI_CLIENT", "sdk").lower() == "async":
+        from services import ServiceLLMBackend, ServiceSTTBackend, ServiceTTSBackend
+        runner = get_service_runner()
+        return ServiceLLMBackend(runner), ServiceSTTBackend(runner), ServiceTTSBackend(runner)
+    return GeminiBackend(model), DeepgramSTTBackend(deepgram), DeepgramTTSBackend(deepgram)
 
 class SmartFileSystemTool:
-    def __init__(self):
-        self.compile_c_program()
-        self.file_cache = None
-        self.last_update = None
+    def __init__(self, scanner=None, max_depth=FROM_ENV, include=None, exclude=None, response_cache=None,
+                 llm=None, service=None):
+        # Sessions share the process-wide snapshot service; without one the tool scans on its own
+        self.service = (service or SnapshotService(scanner, max_depth, include, exclude)).acquire()
+        weakref.finalize(self, self.service.release)
+        self.response_cache = response_cache
+        self.llm = llm or GeminiBackend(model)
     
-    def compile_c_program(self):
-        """Compile the C program"""
-        if not os.path.exists("file_lister.exe"):
-            result = subprocess.run(
-                ["gcc", "-o", "file_lister.exe", "file_lister.c", "-ladvapi32"],
-                capture_output=True, text=True
-            )
-            if result.returncode != 0:
-                st.error(f"Compilation error: {result.stderr}")
+    def prepare_scanner(self):
+        """Report scanner setup problems (the native backend compiles its C program once per process)
+
+        Setup runs in the background; this waits for it, so call it where the scan is shown.
+        """
+        success, message = self.service.prepare_result
+        if not success:
+            st.error(f"Compilation error: {message}")
+    
+    @property
+    def snapshot(self):
+        return self.service.current()
+    
+    @property
+    def last_update(self):
+        return self.service.last_update
+    
+    @property
+    def file_cache(self):
+        """Current snapshot as {"files", "total_files", "version"} (None before the first scan)"""
+        return self.service.listing()
+    
+    def iter_files(self):
+        """Stream file records as the scan progresses; the cache is filled once the walk completes"""
+        return self.service.iter_files()
+    
+    def sync_changes(self):
+        """Apply pending watcher deltas to the cached snapshot instead of rescanning"""
+        self.service.sync_changes()
+    
+    def apply_changes(self, paths):
+        """Bring a batch of changed paths into the snapshot as one delta"""
+        self.service.apply_changes(paths)
+    
+    def run_command(self, plan):
+        """Preview or execute a batch of create/delete operations, then update the snapshot once"""
+        if plan.dry_run:
+            return describe_plan(plan)
+        results = run_plan(plan, {
+            "create": lambda op: create_custom_file(op.path, op.content),
+            "delete": lambda op: delete_file(op.path),
+        })
+        self.apply_changes([result.message if result.operation.action == "create" else result.operation.path
+                            for result in results if result.success])
+        return summarize(plan, results)
     
     def get_all_files(self, force_refresh=False):
         """Get all files with caching"""
-        if not force_refresh and self.file_cache:
-            return self.file_cache
-        
         try:
-            result = subprocess.run(["./file_lister.exe"], capture_output=True, text=True)
-            data = json.loads(result.stdout)
-            self.file_cache = data
-            self.last_update = datetime.now()
-            return data
+            return self.service.get_all_files(force_refresh)
         except Exception as e:
             st.error(f"Error getting files: {e}")
             return {"files": [], "total_files": 0}
     
+    def get_store(self):
+        """Columnar view of the current snapshot, rebuilt only when the version changes"""
+        return self.service.get_store()
+    
+    def get_explorer(self):
+        """Paginated File Explorer view, reused until the snapshot changes"""
+        return self.service.get_explorer()
+    
+    def get_duplicates(self):
+        """Groups of identical files, found once per snapshot version"""
+        return self.service.get_duplicates()
+    
     def find_file(self, filename):
         """Find a specific file by name (fuzzy matching)"""
-        data = self.get_all_files()
-        filename_lower = filename.lower()
+        if self.file_cache is not None:
+            matches = self.search_files(filename, limit=1)
+            return matches[0] if matches else None
         
-        # Exact match
-        for file in data['files']:
-            if file['name'].lower() == filename_lower:
-                return file
+        # Cold start: an exact hit in the persistent index needs no scan at all
+        indexed = self.service.find_indexed(filename)
+        if indexed is not None:
+            return indexed
         
-        # Partial match
-        for file in data['files']:
-            if filename_lower in file['name'].lower():
+        # Otherwise search the streaming scan and stop at the first exact hit
+        filename_lower = filename.lower()
+        partial = None
+        for file in self.iter_files():
+            name_lower = file['name'].lower()
+            # Exact match
+            if name_lower == filename_lower:
                 return file
+            # Partial match (remember the first one)
+            if partial is None and filename_lower in name_lower:
+                partial = file
         
-        return None
+        return partial
+    
+    def search_files(self, query, limit=10, fuzzy=False):
+        """Ranked filename lookup via the name index (exact, prefix, substring, optionally fuzzy)"""
+        return self.service.search(query, limit=limit, fuzzy=fuzzy)
     
     def clean_text_for_speech(self, text):
         """Clean text for TTS - remove markdown and formatting"""
@@ -104,63 +215,73 @@ class SmartFileSystemTool:
     
     def query_files(self, query):
         """Smart query processor for natural language"""
+        return "".join(self.stream_query(query))
+    
+    def stream_query(self, query):
+        """Yield the answer as it is produced (Gemini replies stream in chunks, others arrive whole)"""
         data = self.get_all_files()
-        query_lower = query.lower()
-        
-        # Check if user wants to create a file
-        create_patterns = [
-            r"create (?:a )?(?:file (?:named|called) )?([^\s]+)",
-            r"make (?:a )?(?:file (?:named|called) )?([^\s]+)",
-            r"create ([^\s]+) file",
-            r"new file ([^\s]+)"
-        ]
         
-        for pattern in create_patterns:
-            match = re.search(pattern, query_lower)
-            if match:
-                filename = match.group(1)
-                # Check if content is specified
-                content_match = re.search(r"with content[:\s]+(.+)", query, re.IGNORECASE)
-                content = content_match.group(1) if content_match else ""
-                
-                success, result = create_custom_file(filename, content)
-                if success:
-                    # Refresh file list
-                    self.get_all_files(force_refresh=True)
-                    return f"✅ Successfully created file '{result}'! The file has been added to your directory. You can now query its properties or list all files to see it."
-                else:
-                    return f"❌ Failed to create file: {result}"
-        
-        # Check if user wants to delete a file
-        delete_patterns = [
-            r"delete (?:file )?([^\s]+)",
-            r"remove (?:file )?([^\s]+)",
-            r"delete ([^\s]+) file",
-            r"remove ([^\s]+) file"
-        ]
-        
-        for pattern in delete_patterns:
-            match = re.search(pattern, query_lower)
-            if match:
-                filename = match.group(1)
-                # Find the actual file (case-insensitive)
-                file_info = self.find_file(filename)
-                if file_info:
-                    success, result = delete_file(file_info['name'])
-                    if success:
-                        self.get_all_files(force_refresh=True)
-                        return f"✅ Successfully deleted '{result}'. The file has been removed from your directory."
-                    else:
-                        return f"❌ Failed to delete file: {result}"
-                else:
-                    return f"❌ File '{filename}' not found in the directory."
+        # Create/delete commands, possibly several files or a glob ("delete all .tmp files")
+        with span("intent", kind="command") as attrs:
+            plan = parse_command(query, data['files'], self.find_file)
+            attrs['matched'] = plan is not None
+        if plan is not None:
+            with span("command", operations=len(plan.operations), dry_run=plan.dry_run):
+                result = self.run_command(plan)
+            yield result
+            return
+        
+        # "Which files contain invoice?" is answered from the full-text index, not the listing
+        terms = parse_content_query(query)
+        if terms is not None:
+            if self.service.content_index is None:
+                yield "Searching file contents is turned off (CONTENT_INDEX=off)."
+                return
+            with span("content_search", terms=len(terms)) as attrs:
+                paths, progress = self.service.search_content(terms)
+                attrs['matches'] = len(paths)
+            yield summarize_matches(terms, paths, progress)
+            return
+        
+        # "Find duplicate files" hashes only same-size candidates, never the whole tree
+        with span("intent", kind="duplicates") as attrs:
+            attrs['matched'] = is_duplicate_query(query)
+        if attrs['matched']:
+            yield summarize_duplicates(self.get_duplicates())
+            return
+        
+        # Structured questions (counts, filters, largest/newest, owner/time of a file)
+        # are answered exactly from the snapshot without calling Gemini
+        store = self.get_store()
+        with span("intent", kind="local") as attrs:
+            local_answer = answer_locally(query, store, self.find_file)
+            attrs['matched'] = local_answer is not None
+        if local_answer is not None:
+            yield local_answer
+            return
+        
+        # Same question against an unchanged directory -> reuse the earlier answer
+        cache_key = ResponseCache.make_key(query, store.fingerprint())
+        if self.response_cache is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        # Only the most relevant entries go into the prompt, within the token budget
+        from retrieval import build_context
+        with span("context_build") as attrs:
+            context, included, dropped = build_context(query, store)
+            attrs.update(included=included, dropped=dropped)
         
         # Build intelligent prompt for Gemini
         prompt = f"""
         You are a file system assistant. The user asked: "{query}"
         
-        Here's the current directory information:
-        {json.dumps(data, indent=2)}
+        Here's the current directory information ({data['total_files']} entries, {included} listed,
+        most relevant first; one entry per line as path|type|size|owner|created|modified|flags,
+        type d=directory f=file, size in bytes, times in UTC, flags H=hidden S=system R=readonly):
+        {context}
         
         Please provide a natural, conversational response to their question.
         
@@ -177,41 +298,50 @@ class SmartFileSystemTool:
         Important: Always use the actual data provided above. Don't make up information.
         """
         
+        tracer = get_tracer()
+        started = time.perf_counter()
         try:
-            response = model.generate_content(prompt)
-            return response.text
+            chunks = []
+            for chunk in self.llm.stream(prompt):
+                if not chunks:
+                    tracer.record("llm_first_token", time.perf_counter() - started)
+                chunks.append(chunk)
+                yield chunk
+            tracer.record("llm", time.perf_counter() - started, attrs={"prompt_bytes": len(prompt.encode('utf-8'))})
+            if self.response_cache is not None:
+                self.response_cache.put(cache_key, "".join(chunks))
         except Exception as e:
+            tracer.record("llm", time.perf_counter() - started, error=type(e).__name__)
             st.error(f"Gemini API Error: {e}")
             # Fallback response
-            return f"Error processing query. File count: {data['total_files']}"
+            yield f"Error processing query. File count: {data['total_files']}"
 
 class VoiceAssistant:
-    def __init__(self, file_tool):
+    def __init__(self, file_tool, tts_cache=None, tts_backend=None, stt_backend=None, codecs=None):
         self.file_tool = file_tool
         self.deepgram = deepgram
-        
-    def transcribe_audio(self, audio_path):
-        """Transcribe audio using Deepgram v3/v4 - synchronous version"""
+        self.tts_cache = tts_cache
+        self.tts_backend = tts_backend or DeepgramTTSBackend(deepgram)
+        self.stt_backend = stt_backend or DeepgramSTTBackend(deepgram)
+        # Wire formats for audio (STT_CODECS / TTS_CODEC) and per-turn byte counts
+        from audio_codec import AudioCodecs
+        self.codecs = codecs or AudioCodecs.from_env()
+        
+    def transcribe_audio(self, audio):
+        """Transcribe a Recording, WAV bytes or a WAV file path"""
+        from audio_capture import Recording
         try:
-            with open(audio_path, 'rb') as audio_file:
-                buffer_data = audio_file.read()
-            
-            payload = {"buffer": buffer_data}
-            
-            # Configure options
-            options = PrerecordedOptions(
-                model="nova-2",
-                smart_format=True,
-                punctuate=True,
-                language="en-US"
-            )
-            
-            # Transcribe using v3/v4 API
-            response = self.deepgram.listen.rest.v("1").transcribe_file(payload, options)
+            if isinstance(audio, Recording):
+                # In-memory PCM is encoded in whichever allowed format is smallest; nothing touches the disk
+                buffer_data, mimetype = self.codecs.encode_upload(audio.pcm, audio.sample_rate)
+            else:
+                if not isinstance(audio, (bytes, bytearray)):
+                    with open(audio, 'rb') as audio_file:
+                        audio = audio_file.read()
+                buffer_data, mimetype = audio, 'audio/wav'
             
-            # Extract transcript
-            transcript = response.results.channels[0].alternatives[0].transcript
-            return transcript
+            with span("stt", bytes=len(buffer_data), mimetype=mimetype):
+                return self.stt_backend.transcribe(buffer_data, mimetype)
             
         except Exception as e:
             st.error(f"Transcription error: {e}")
@@ -229,80 +359,62 @@ class VoiceAssistant:
             # Get selected voice model
             voice_model = st.session_state.get('voice_model', 'aura-asteria-en')
             
-            # Configure TTS options
-            options = SpeakOptions(
-                model=voice_model,
-                encoding="linear16",
-                container="wav"
-            )
-            
-            # Create the text payload
-            payload = {"text": text}
-            
-            # Use the save method which is more reliable
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
-                filename = tmp_file.name
-            
-            response = self.deepgram.speak.rest.v("1").save(filename, payload, options)
-            
-            # Read the file back
-            with open(filename, 'rb') as f:
-                audio_data = f.read()
-            
-            os.unlink(filename)  # Clean up
-            return audio_data
+            return self.synthesize(text, voice_model)
                 
         except Exception as e:
             st.error(f"Deepgram TTS Error: {e}")
             return None
     
-    def record_audio(self, duration=5):
-        """Record audio from microphone"""
+    def synthesize(self, text, voice_model):
+        """Synthesize already-cleaned text (safe to call from worker threads)"""
+        # Identical replies (e.g. create/delete confirmations) play back from cache
+        codec = self.codecs.tts_codec_for(text)
+        cache_key = AudioCache.make_key(voice_model, text, codec.name)
+        if self.tts_cache is not None:
+            cached = self.tts_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        # Synthesize straight into memory (no temp file round-trip), compressed on the wire
+        # and decoded back to WAV for playback
+        with span("tts", chars=len(text), codec=codec.name):
+            audio_data = self.tts_backend.synthesize(text, voice_model, codec.tts_options)
+            audio_data = self.codecs.decode_reply(audio_data, codec)
+        
+        if self.tts_cache is not None:
+            self.tts_cache.put(cache_key, audio_data)
+        return audio_data
+    
+    def stream_reply(self, query, voice_model=None):
+        """Answer a query and yield SpeechSegments sentence by sentence while the LLM is still generating"""
+        from voice_pipeline import StreamingVoicePipeline
+        voice_model = voice_model or st.session_state.get('voice_model', 'aura-asteria-en')
+        pipeline = StreamingVoicePipeline(
+            synthesize=lambda sentence: self.synthesize(sentence, voice_model),
+            clean=self.file_tool.clean_text_for_speech
+        )
+        yield from pipeline.run(self.file_tool.stream_query(query))
+        if pipeline.first_audio_latency is not None:
+            get_tracer().record("voice_first_audio", pipeline.first_audio_latency)
+    
+    def record_audio(self, duration=5, source=None):
+        """Record from the microphone (or a capture source) until the speaker stops, at most duration seconds"""
+        from audio_capture import create_capture_source, record_until_silence
         try:
-            CHUNK = 1024
-            FORMAT = pyaudio.paInt16
-            CHANNELS = 1
-            RATE = 16000
-            
-            p = pyaudio.PyAudio()
-            
-            # Create progress bar
-            progress_bar = st.progress(0)
             status_text = st.empty()
+            progress_bar = st.progress(0)
             
-            stream = p.open(format=FORMAT,
-                           channels=CHANNELS,
-                           rate=RATE,
-                           input=True,
-                           frames_per_buffer=CHUNK)
-            
-            frames = []
-            
-            for i in range(0, int(RATE / CHUNK * duration)):
-                data = stream.read(CHUNK)
-                frames.append(data)
-                # Update progress
-                progress = (i + 1) / int(RATE / CHUNK * duration)
-                progress_bar.progress(progress)
-                status_text.text(f"🎙️ Recording... {int(progress * 100)}%")
+            def on_frame(elapsed, in_speech):
+                progress_bar.progress(min(elapsed / duration, 1.0))
+                status_text.text("🎙️ Recording... (stops when you stop talking)" if in_speech else "👂 Listening...")
             
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
+            recording = record_until_silence(source or create_capture_source(), max_seconds=duration,
+                                             on_frame=on_frame)
             
             # Clear progress indicators
             progress_bar.empty()
             status_text.empty()
-            
-            # Save audio
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
-                wf = wave.open(tmp_file.name, 'wb')
-                wf.setnchannels(CHANNELS)
-                wf.setsampwidth(p.get_sample_size(FORMAT))
-                wf.setframerate(RATE)
-                wf.writeframes(b''.join(frames))
-                wf.close()
-                return tmp_file.name
+            return recording
         except Exception as e:
             st.error(f"Recording error: {e}. Make sure your microphone is connected.")
             return None
@@ -325,7 +437,8 @@ def create_custom_file(filename, content=""):
         if '.' not in safe_filename:
             safe_filename += '.txt'
         
-        with open(safe_filename, "w") as f:
+        # "x": never truncate a file that is already there
+        with open(safe_filename, "x") as f:
             if content:
                 f.write(content)
             else:
@@ -335,6 +448,8 @@ def create_custom_file(filename, content=""):
                 f.write(f"This file was created through the AI File System Assistant.")
         
         return True, safe_filename
+    except FileExistsError:
+        return False, f"'{safe_filename}' already exists"
     except Exception as e:
         return False, str(e)
 
@@ -343,7 +458,14 @@ def delete_file(filename):
     try:
         if os.path.exists(filename):
             # Don't delete system files or the app itself
-            protected_files = ['app.py', 'file_lister.c', 'file_lister.exe', 
+            protected_files = ['app.py', 'scanner.py', 'snapshot.py', 'watcher.py',
+                             'name_index.py', 'metadata_store.py', 'query_engine.py',
+                             'retrieval.py', 'cache.py', 'backends.py', 'voice_pipeline.py',
+                             'services.py', 'stand_in_server.py', 'commands.py', 'audio_capture.py',
+                             'audio_codec.py', 'explorer.py', 'snapshot_service.py',
+                             'benchmark.py', 'metrics.py', 'sqlite_index.py', 'content_index.py',
+                             'duplicates.py', 'dir_sizes.py',
+                             'file_lister.c', 'file_lister.exe', 'file_lister',
                              'requirements.txt', '.env', 'setup.bat']
             if filename.lower() in [f.lower() for f in protected_files]:
                 return False, "Cannot delete protected system files"
@@ -355,6 +477,14 @@ def delete_file(filename):
     except Exception as e:
         return False, str(e)
 
+def get_voice_assistant():
+    """This session's VoiceAssistant, created the first time speech is used (loads the audio stack)"""
+    if 'voice_assistant' not in st.session_state:
+        _, stt, tts = create_backends()
+        st.session_state.voice_assistant = VoiceAssistant(st.session_state.file_tool, tts_cache=get_tts_cache(),
+                                                          tts_backend=tts, stt_backend=stt)
+    return st.session_state.voice_assistant
+
 def main():
     st.set_page_config(page_title="AI File Assistant", page_icon="🤖", layout="wide")
     
@@ -373,15 +503,16 @@ def main():
     
     # Initialize session state
     if 'file_tool' not in st.session_state:
-        st.session_state.file_tool = SmartFileSystemTool()
-    if 'voice_assistant' not in st.session_state:
-        st.session_state.voice_assistant = VoiceAssistant(st.session_state.file_tool)
+        llm, _, _ = create_backends()
+        st.session_state.file_tool = SmartFileSystemTool(response_cache=get_response_cache(), llm=llm,
+                                                         service=get_snapshot_service())
     if 'messages' not in st.session_state:
         st.session_state.messages = []
     if 'audio_counter' not in st.session_state:
         st.session_state.audio_counter = 0
     if 'file_content' not in st.session_state:
         st.session_state.file_content = ""
+    metrics_server = get_metrics_server()
     
     # Header
     st.title("🤖 Intelligent File System Assistant")
@@ -393,9 +524,37 @@ def main():
         
         # Show API status
         with st.expander("🔌 API Status"):
-            st.success("✅ Gemini: gemini-2.0-flash-001")
-            st.success("✅ Deepgram STT: Connected")
-            st.success("✅ Deepgram TTS: Connected")
+            # Live status from the spans recorded so far in this process
+            summary = get_tracer().summary()
+            for label, name in (("Gemini: gemini-2.0-flash-001", "llm"), ("Deepgram STT", "stt"),
+                                ("Deepgram TTS", "tts")):
+                stats = summary.get(name)
+                if stats is None:
+                    st.info(f"⚪ {label}: not used yet")
+                elif stats['last_error']:
+                    st.warning(f"⚠️ {label}: last call failed ({stats['last_error']})")
+                else:
+                    st.success(f"✅ {label}: p50 {stats['p50_ms']:,.0f} ms, p95 {stats['p95_ms']:,.0f} ms "
+                               f"({stats['count']} calls)")
+            for label, cache in (("Response cache", get_response_cache()), ("TTS cache", get_tts_cache())):
+                cache_stats = cache.stats()
+                st.caption(f"💾 {label}: {cache_stats['hits'] + cache_stats['disk_hits']} hits, "
+                           f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)")
+        
+        # Per-stage latency
+        with st.expander("📊 Metrics"):
+            summary = get_tracer().summary()
+            if summary:
+                import pandas as pd
+                st.dataframe(pd.DataFrame.from_dict(summary, orient="index")[
+                    ["count", "p50_ms", "p95_ms", "mean_ms", "errors"]], use_container_width=True)
+            else:
+                st.caption("No spans recorded yet")
+            if metrics_server is not None:
+                host, port = metrics_server.server_address[:2]
+                st.caption(f"Prometheus: http://{host}:{port}/metrics")
+            if get_tracer().trace_file:
+                st.caption(f"Trace log: {get_tracer().trace_file}")
         
         # Voice settings
         with st.expander("🎙️ Voice Settings"):
@@ -489,8 +648,9 @@ def main():
                         st.balloons()  # Keep the balloons
                         # Clear the content area after successful creation
                         st.session_state.file_content = ""
-                        # Force refresh
-                        st.session_state.file_tool.get_all_files(force_refresh=True)                    else:
+                        # Add the new file to the cached snapshot
+                        st.session_state.file_tool.apply_changes([result])
+                    else:
                         st.error(f"❌ Error: {result}")
                 else:
                     st.warning("Please enter a filename!")
@@ -518,9 +678,14 @@ def main():
             "Show me all text files",
             "Show me all Python files",
             "What's the largest file?",
+            "What's the largest folder?",
             "How many files are there?",
             "Show files created today",
+            "Which files contain TODO?",
+            "Find duplicate files",
             "Create test.py with content: print('Hello')",
+            "Create notes.md, todo.txt and ideas.txt",
+            "Preview delete all .tmp files",
             "Delete old_file.txt"
         ]
         
@@ -562,7 +727,7 @@ def main():
                     
                     # Generate voice response with Deepgram
                     with st.spinner("🔊 Generating audio with Deepgram..."):
-                        audio = st.session_state.voice_assistant.text_to_speech(response)
+                        audio = get_voice_assistant().text_to_speech(response)
                         if audio:
                             # Increment counter for unique key
                             st.session_state.audio_counter += 1
@@ -576,29 +741,42 @@ def main():
         
         with col1:
             st.markdown("### Quick Voice Commands")
-            duration = st.slider("Recording duration (seconds)", 3, 10, 5)
+            duration = st.slider("Maximum recording duration (seconds)", 3, 10, 5,
+                                 help="Recording stops early once you stop talking")
             
             if st.button("🎤 Start Recording", type="primary", use_container_width=True):
+                get_voice_assistant().codecs.wire.reset()
                 with st.container():
-                    audio_path = st.session_state.voice_assistant.record_audio(duration)
-                    if audio_path:
-                        st.session_state.last_recording = audio_path
+                    recording = get_voice_assistant().record_audio(duration)
+                    if recording is not None and not recording.speech:
+                        st.warning("No speech detected. Please try again.")
+                    elif recording is not None:
+                        st.session_state.last_recording = recording
                         
                         # Auto-transcribe
                         with st.spinner("📝 Transcribing with Deepgram STT..."):
-                            transcript = st.session_state.voice_assistant.transcribe_audio(audio_path)
+                            transcript = get_voice_assistant().transcribe_audio(recording)
                             if transcript:
                                 st.session_state.last_transcript = transcript
                                 
-                                # Auto-process
-                                with st.spinner("🤖 Processing with Gemini..."):
-                                    response = st.session_state.file_tool.query_files(transcript)
-                                    st.session_state.last_voice_response = response
-                                
-                                # Generate audio response with Deepgram TTS
-                                with st.spinner("🔊 Generating audio with Deepgram TTS..."):
-                                    audio = st.session_state.voice_assistant.text_to_speech(response)
-                                    st.session_state.last_audio_response = audio
+                                # Auto-process: speak each sentence as soon as Gemini has produced it
+                                sentences = []
+                                clips = []
+                                reply_text = st.empty()
+                                try:
+                                    with st.spinner("🤖 Processing with Gemini and Deepgram TTS..."):
+                                        for segment in get_voice_assistant().stream_reply(transcript):
+                                            sentences.append(segment.text)
+                                            clips.append(segment.audio)
+                                            reply_text.caption(" ".join(sentences))
+                                            st.audio(segment.audio, format='audio/wav')
+                                except Exception as e:
+                                    st.error(f"Voice pipeline error: {e}")
+                                reply_text.empty()
+                                st.session_state.last_voice_response = " ".join(sentences)
+                                from voice_pipeline import merge_wav
+                                st.session_state.last_audio_response = merge_wav(clips)
+                                st.session_state.last_wire_stats = get_voice_assistant().codecs.wire.as_dict()
                             else:
                                 st.error("No transcript received. Please try again.")
         
@@ -617,61 +795,109 @@ def main():
                     if hasattr(st.session_state, 'last_audio_response') and st.session_state.last_audio_response:
                         st.session_state.audio_counter += 1
                         st.audio(st.session_state.last_audio_response, format='audio/wav')
+                
+                # Audio bytes on the wire this turn vs. uncompressed WAV
+                wire = st.session_state.get('last_wire_stats')
+                if wire:
+                    st.caption(f"📶 On the wire: ↑ {format_size(wire['sent'])} "
+                               f"({', '.join(wire['upload_codecs']) or 'none'}; WAV {format_size(wire['sent_raw'])}) · "
+                               f"↓ {format_size(wire['received'])} "
+                               f"({', '.join(wire['download_codecs']) or 'cached'}; WAV {format_size(wire['received_raw'])})")
     
     with tab3:
         st.subheader("📁 File Explorer")
         
-        # Get files
-        data = st.session_state.file_tool.get_all_files()
+        from explorer import SORT_COLUMNS, KIND_FILTERS, duplicate_frame
+        
+        # Get files (stream the first scan so progress shows on large trees)
+        file_tool = st.session_state.file_tool
+        file_tool.prepare_scanner()
+        if file_tool.file_cache is None:
+            progress_text = st.empty()
+            try:
+                for i, _ in enumerate(file_tool.iter_files(), 1):
+                    if i % 1000 == 0:
+                        progress_text.caption(f"🔎 Scanning... {i:,} entries found")
+            except Exception as e:
+                st.error(f"Error getting files: {e}")
+            progress_text.empty()
+        data = file_tool.get_all_files()
         
         if data['files']:
-            # Summary metrics
+            # Summary metrics (vectorized over the columnar store)
+            summary = file_tool.get_store().summary()
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
                 st.metric("Total Files", data['total_files'])
             
             with col2:
-                dirs = sum(1 for f in data['files'] if f['type'] == 'directory')
-                st.metric("Directories", dirs)
+                st.metric("Directories", summary['directories'])
             
             with col3:
-                files = sum(1 for f in data['files'] if f['type'] == 'file')
-                st.metric("Regular Files", files)
+                st.metric("Regular Files", summary['files'])
             
             with col4:
-                hidden = sum(1 for f in data['files'] if f['attributes']['hidden'])
-                st.metric("Hidden Items", hidden)
+                st.metric("Hidden Items", summary['hidden'])
             
             # File table
             st.markdown("### 📋 Detailed File List")
             
-            # Convert to DataFrame
-            df_data = []
-            for file in data['files']:
-                df_data.append({
-                    'Name': file['name'],
-                    'Type': file['type'],
-                    'Size': f"{file['size']:,}" if file['type'] == 'file' else 'N/A',
-                    'Owner': file['owner'].split('\\')[-1],
-                    'Created': file['created'],
-                    'Modified': file['modified'],
-                    'Hidden': '🔒' if file['attributes']['hidden'] else '',
-                    'ReadOnly': '📝' if file['attributes']['readonly'] else ''
-                })
-            
-            df = pd.DataFrame(df_data)
-            
-            # Highlight hello_world.txt if it exists
+            # Sort/filter/search run on the cached columnar view; only one page is rendered
+            explorer = file_tool.get_explorer()
+            col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
+            with col1:
+                search = st.text_input("Search", placeholder="Filter by path...", key="explorer_search")
+            with col2:
+                kind = st.selectbox("Show", list(KIND_FILTERS), key="explorer_kind")
+            with col3:
+                sort_by = st.selectbox("Sort by", list(SORT_COLUMNS), key="explorer_sort")
+            with col4:
+                page_size = st.selectbox("Rows", [50, 100, 250, 500], index=1, key="explorer_page_size")
+            descending = st.toggle("Descending", key="explorer_descending")
+            
+            with span("explorer_rows") as attrs:
+                rows = explorer.rows(search, kind, sort_by, descending)
+                attrs['rows'] = len(rows)
+            pages = max(1, -(-len(rows) // page_size))
+            page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key="explorer_page")
+            page = min(page, pages)
+            with span("explorer_page", page_size=page_size):
+                df = explorer.page(rows, page, page_size)
+            first = (page - 1) * page_size
+            st.caption(f"Showing {first + 1 if len(rows) else 0:,}–{first + len(df):,} of {len(rows):,} "
+                       f"(page {page} of {pages})")
+            
+            # Highlight hello_world.txt if it is on this page
             def highlight_target(row):
                 if row['Name'] == 'hello_world.txt':
                     return ['background-color: #90EE90'] * len(row)
                 return [''] * len(row)
             
-            styled_df = df.style.apply(highlight_target, axis=1)
-            st.dataframe(styled_df, use_container_width=True, height=400)
+            with span("render", rows=len(df)):
+                styled_df = df.style.apply(highlight_target, axis=1)
+                st.dataframe(styled_df, use_container_width=True, height=400)
+            
+            # Duplicates need file reads (same-size candidates only), so they're found on request
+            st.markdown("### 🧬 Duplicate Files")
+            if st.button("🔍 Find duplicates", key="find_duplicates"):
+                st.session_state.show_duplicates = True
+            if st.session_state.get('show_duplicates'):
+                with st.spinner("Comparing files..."):
+                    groups = file_tool.get_duplicates()
+                if groups:
+                    wasted = sum(group.wasted for group in groups)
+                    st.caption(f"{len(groups):,} groups of identical files; {format_size(wasted)} could be freed")
+                    st.dataframe(duplicate_frame(groups), use_container_width=True, height=300, hide_index=True)
+                else:
+                    st.info("No duplicate files found")
         else:
             st.warning("No files found in current directory")
+    
+    # Time from the top of the script to the whole page, once per session
+    if not st.session_state.get('first_render_recorded'):
+        st.session_state.first_render_recorded = True
+        get_tracer().record("first_render", time.perf_counter() - SCRIPT_STARTED)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
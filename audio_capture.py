@@ -0,0 +1,220 @@
+import io
+import os
+import time
+import wave
+from collections import deque, namedtuple
+
+import numpy as np
+
+# Captured speech as raw PCM; duration in seconds, speech False if nobody spoke
+Recording = namedtuple("Recording", ["pcm", "sample_rate", "channels", "sample_width", "duration", "speech"])
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+
+
+def pcm_to_wav(pcm, sample_rate=SAMPLE_RATE, channels=1, sample_width=2):
+    """Wrap raw PCM in a WAV header in memory"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(sample_width)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def frame_rms(pcm):
+    """Root-mean-square energy of a 16-bit PCM frame"""
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    if samples.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(samples.astype(np.float32) ** 2)))
+
+
+class CaptureSource:
+    """Mono 16-bit PCM source read in fixed-size frames; read() returns b"" when exhausted"""
+
+    sample_rate = SAMPLE_RATE
+
+    def open(self):
+        pass
+
+    def read(self, frames):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MicrophoneSource(CaptureSource):
+    """Default input device via PyAudio"""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frames_per_buffer=1024):
+        self.sample_rate = sample_rate
+        self.frames_per_buffer = frames_per_buffer
+        self.audio = None
+        self.stream = None
+
+    def open(self):
+        import pyaudio
+        self.audio = pyaudio.PyAudio()
+        self.stream = self.audio.open(format=pyaudio.paInt16, channels=1, rate=self.sample_rate,
+                                      input=True, frames_per_buffer=self.frames_per_buffer)
+
+    def read(self, frames):
+        return self.stream.read(frames, exception_on_overflow=False)
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+        if self.audio is not None:
+            self.audio.terminate()
+            self.audio = None
+
+
+class WavFileSource(CaptureSource):
+    """Plays a 16-bit WAV file (path or bytes) as if it were a microphone
+
+    Multi-channel files are downmixed to mono. With realtime=True reads are paced
+    at the file's sample rate.
+    """
+
+    def __init__(self, wav, realtime=False):
+        self.wav = wav
+        self.realtime = realtime
+        self.samples = None
+        self.position = 0
+        self.started = None
+
+    def open(self):
+        source = io.BytesIO(self.wav) if isinstance(self.wav, (bytes, bytearray)) else self.wav
+        with wave.open(source, "rb") as wf:
+            if wf.getsampwidth() != 2:
+                raise ValueError("only 16-bit WAV files are supported")
+            self.sample_rate = wf.getframerate()
+            samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+            channels = wf.getnchannels()
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        self.samples = samples
+        self.position = 0
+        self.started = time.perf_counter()
+
+    def read(self, frames):
+        chunk = self.samples[self.position:self.position + frames]
+        self.position += len(chunk)
+        if self.realtime:
+            delay = self.started + self.position / self.sample_rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return chunk.tobytes()
+
+
+def create_capture_source():
+    """Microphone, or the WAV file named by VOICE_INPUT_WAV (for demos and tests without a mic)"""
+    path = os.getenv("VOICE_INPUT_WAV")
+    if path:
+        return WavFileSource(path, realtime=True)
+    return MicrophoneSource()
+
+
+class VoiceActivityDetector:
+    """Energy-based speech detection against an adaptive noise floor
+
+    A frame counts as speech when its RMS exceeds both min_rms and ratio x the
+    running noise floor. Speech starts after start_ms of consecutive speech frames
+    and ends after silence_ms without any.
+    """
+
+    def __init__(self, ratio=3.0, min_rms=300.0, start_ms=90, silence_ms=800, frame_ms=FRAME_MS):
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self.frame_ms = frame_ms
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.reset()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            ratio=float(os.getenv("VOICE_VAD_RATIO", "3.0")),
+            min_rms=float(os.getenv("VOICE_VAD_MIN_RMS", "300")),
+            silence_ms=int(os.getenv("VOICE_SILENCE_MS", "800")),
+        )
+
+    def reset(self):
+        # Start from a quiet-room assumption so talking right away is still detected
+        self.noise_floor = self.min_rms / self.ratio
+        self.voiced_run = 0
+        self.silent_run = 0
+        self.in_speech = False
+        self.ended = False
+
+    def is_speech(self, rms):
+        return rms > max(self.min_rms, self.noise_floor * self.ratio)
+
+    def update(self, pcm):
+        """Feed one frame; returns True for frames that count as speech"""
+        rms = frame_rms(pcm)
+        voiced = self.is_speech(rms)
+        if not voiced and not self.in_speech:
+            # Track background level only while nobody is talking
+            self.noise_floor = 0.9 * self.noise_floor + 0.1 * rms
+        if self.in_speech:
+            self.silent_run = 0 if voiced else self.silent_run + 1
+            self.ended = self.silent_run >= self.silence_frames
+        else:
+            self.voiced_run = self.voiced_run + 1 if voiced else 0
+            self.in_speech = self.voiced_run >= self.start_frames
+        return voiced
+
+
+def record_until_silence(source, max_seconds=10, vad=None, pre_roll_ms=300, tail_ms=300, on_frame=None):
+    """Capture from source until the speaker stops (or max_seconds elapse), all in memory
+
+    Frames before speech starts live in a small ring buffer so the onset isn't
+    clipped; trailing silence beyond tail_ms is dropped. on_frame(elapsed, in_speech)
+    is called after every frame for progress display.
+    """
+    vad = vad or VoiceActivityDetector.from_env()
+    vad.reset()
+    with source:
+        frame_samples = source.sample_rate * vad.frame_ms // 1000
+        max_frames = int(max_seconds * 1000 / vad.frame_ms)
+        pre_roll = deque(maxlen=max(1, pre_roll_ms // vad.frame_ms))
+        speech = bytearray()
+        last_voiced = 0
+        for i in range(max_frames):
+            pcm = source.read(frame_samples)
+            if not pcm:
+                break
+            voiced = vad.update(pcm)
+            if not vad.in_speech:
+                pre_roll.append(pcm)
+            else:
+                if pre_roll:
+                    speech.extend(b"".join(pre_roll))
+                    pre_roll.clear()
+                speech.extend(pcm)
+                if voiced:
+                    last_voiced = len(speech)
+            if on_frame is not None:
+                on_frame((i + 1) * vad.frame_ms / 1000, vad.in_speech)
+            if vad.ended:
+                break
+
+    if not speech:
+        return Recording(b"", source.sample_rate, 1, 2, 0.0, False)
+    tail_bytes = source.sample_rate * tail_ms // 1000 * 2
+    pcm = bytes(speech[:last_voiced + tail_bytes])
+    return Recording(pcm, source.sample_rate, 1, 2, len(pcm) / 2 / source.sample_rate, True)
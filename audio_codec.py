@@ -0,0 +1,241 @@
+import io
+import os
+import wave
+import struct
+import threading
+
+import numpy as np
+
+from audio_capture import pcm_to_wav
+
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+
+WAVE_FORMAT_MULAW = 7
+
+# G.711 mu-law constants
+MULAW_BIAS = 0x84
+MULAW_CLIP = 32635
+
+
+def mulaw_encode(samples):
+    """16-bit PCM samples -> mu-law bytes (one byte per sample)"""
+    x = samples.astype(np.int32)
+    sign = (x < 0).astype(np.int32) << 7
+    x = np.minimum(np.abs(x), MULAW_CLIP) + MULAW_BIAS
+    exponent = np.floor(np.log2(x)).astype(np.int32) - 7
+    mantissa = (x >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8).tobytes()
+
+
+def mulaw_decode(data):
+    """mu-law bytes -> 16-bit PCM samples"""
+    u = ~np.frombuffer(data, dtype=np.uint8).astype(np.int32) & 0xFF
+    exponent = (u >> 4) & 0x07
+    magnitude = ((((u & 0x0F) << 3) + MULAW_BIAS) << exponent) - MULAW_BIAS
+    return np.where(u & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+def resample_pcm(pcm, from_rate, to_rate):
+    """16-bit mono PCM at from_rate -> to_rate (linear interpolation; fine for speech)"""
+    if from_rate == to_rate or not pcm:
+        return pcm
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float64)
+    count = max(1, round(len(samples) * to_rate / from_rate))
+    positions = np.arange(count) * (from_rate / to_rate)
+    resampled = np.interp(positions, np.arange(len(samples)), samples)
+    return np.clip(np.round(resampled), -32768, 32767).astype(np.int16).tobytes()
+
+
+def read_riff(data):
+    """(format tag, channels, sample rate, bits per sample, data chunk) of a RIFF/WAVE file
+
+    The wave module only reads PCM, so mu-law WAVs are parsed by hand.
+    """
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("not a WAV file")
+    fmt = None
+    position = 12
+    while position + 8 <= len(data):
+        chunk_id, size = struct.unpack("<4sI", data[position:position + 8])
+        body = data[position + 8:position + 8 + size]
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack("<HHIIHH", body[:16])
+        elif chunk_id == b"data":
+            if fmt is None:
+                break
+            return fmt[0], fmt[1], fmt[2], fmt[5], body
+        position += 8 + size + (size & 1)
+    raise ValueError("WAV file has no fmt/data chunk")
+
+
+class WavCodec:
+    """Uncompressed 16-bit PCM in a WAV container"""
+
+    name = "wav"
+    mimetype = "audio/wav"
+    tts_options = {"encoding": "linear16", "container": "wav"}
+
+    def encode(self, pcm, sample_rate):
+        return pcm_to_wav(pcm, sample_rate)
+
+    def decode(self, data):
+        """Encoded bytes -> (16-bit mono PCM, sample rate)"""
+        with wave.open(io.BytesIO(data), "rb") as wf:
+            return wf.readframes(wf.getnframes()), wf.getframerate()
+
+
+class MulawCodec:
+    """G.711 mu-law in a WAV container: half the size of linear16, telephone quality"""
+
+    name = "mulaw"
+    mimetype = "audio/wav"
+    tts_options = {"encoding": "mulaw", "container": "wav", "sample_rate": 16000}
+
+    def encode(self, pcm, sample_rate):
+        encoded = mulaw_encode(np.frombuffer(pcm, dtype=np.int16))
+        fmt = struct.pack("<HHIIHHH", WAVE_FORMAT_MULAW, 1, sample_rate, sample_rate, 1, 8, 0)
+        fact = struct.pack("<I", len(encoded))
+        chunks = (b"fmt " + struct.pack("<I", len(fmt)) + fmt +
+                  b"fact" + struct.pack("<I", len(fact)) + fact +
+                  b"data" + struct.pack("<I", len(encoded)) + encoded + b"\0" * (len(encoded) & 1))
+        return b"RIFF" + struct.pack("<I", 4 + len(chunks)) + b"WAVE" + chunks
+
+    def decode(self, data):
+        tag, channels, sample_rate, bits, body = read_riff(data)
+        if tag != WAVE_FORMAT_MULAW or channels != 1:
+            raise ValueError("expected a mono mu-law WAV")
+        return mulaw_decode(body).tobytes(), sample_rate
+
+
+class FlacCodec:
+    """Lossless FLAC via soundfile (libsndfile); roughly half the size of linear16 for speech"""
+
+    name = "flac"
+    mimetype = "audio/flac"
+    tts_options = {"encoding": "flac", "sample_rate": 24000}
+
+    def encode(self, pcm, sample_rate):
+        buffer = io.BytesIO()
+        soundfile.write(buffer, np.frombuffer(pcm, dtype=np.int16), sample_rate, format="FLAC", subtype="PCM_16")
+        return buffer.getvalue()
+
+    def decode(self, data):
+        samples, sample_rate = soundfile.read(io.BytesIO(data), dtype="int16")
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1).astype(np.int16)
+        return samples.tobytes(), sample_rate
+
+
+CODECS = {"wav": WavCodec, "mulaw": MulawCodec, "flac": FlacCodec}
+
+
+def codec_available(name):
+    return name in CODECS and (name != "flac" or soundfile is not None)
+
+
+def get_codec(name):
+    """Codec by name, falling back to WAV when it is unknown or its library is missing"""
+    name = (name or "wav").strip().lower()
+    return CODECS[name]() if codec_available(name) else WavCodec()
+
+
+def codec_for_encoding(encoding):
+    """Codec matching a Deepgram TTS encoding parameter"""
+    for name, cls in CODECS.items():
+        if cls.tts_options["encoding"] == encoding:
+            return get_codec(name)
+    return WavCodec()
+
+
+class WireStats:
+    """Bytes sent to STT and received from TTS during one voice turn (thread-safe)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.sent = 0
+            self.sent_raw = 0
+            self.received = 0
+            self.received_raw = 0
+            self.upload_codecs = set()
+            self.download_codecs = set()
+
+    def add_upload(self, codec, sent, raw):
+        with self.lock:
+            self.sent += sent
+            self.sent_raw += raw
+            self.upload_codecs.add(codec)
+
+    def add_download(self, codec, received, raw):
+        with self.lock:
+            self.received += received
+            self.received_raw += raw
+            self.download_codecs.add(codec)
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                "sent": self.sent, "sent_raw": self.sent_raw,
+                "received": self.received, "received_raw": self.received_raw,
+                "upload_codecs": sorted(self.upload_codecs), "download_codecs": sorted(self.download_codecs),
+            }
+
+
+class AudioCodecs:
+    """Picks wire formats for STT uploads and TTS downloads and decodes replies to WAV for playback
+
+    Uploads are encoded with every allowed codec and the smallest result is sent;
+    payloads under min_upload_bytes go out as plain WAV. TTS replies for texts
+    under min_tts_chars are requested as WAV, since they're small either way.
+    """
+
+    def __init__(self, upload_codecs=("flac", "wav"), tts_codec="wav", min_upload_bytes=16 * 1024, min_tts_chars=40):
+        self.upload_codecs = [get_codec(name) for name in upload_codecs if codec_available(name)] or [WavCodec()]
+        self.tts_codec = get_codec(tts_codec)
+        self.min_upload_bytes = min_upload_bytes
+        self.min_tts_chars = min_tts_chars
+        self.wire = WireStats()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            upload_codecs=[c.strip() for c in os.getenv("STT_CODECS", "flac,wav").split(",") if c.strip()],
+            tts_codec=os.getenv("TTS_CODEC", "wav"),
+            min_upload_bytes=int(os.getenv("AUDIO_CODEC_MIN_BYTES", str(16 * 1024))),
+            min_tts_chars=int(os.getenv("TTS_CODEC_MIN_CHARS", "40")),
+        )
+
+    def encode_upload(self, pcm, sample_rate):
+        """(payload, mimetype) for STT, using whichever allowed codec gives the fewest bytes"""
+        raw = len(pcm) + 44
+        if raw < self.min_upload_bytes:
+            candidates = [WavCodec()]
+        else:
+            candidates = self.upload_codecs
+        best = None
+        for codec in candidates:
+            payload = codec.encode(pcm, sample_rate)
+            if best is None or len(payload) < len(best[0]):
+                best = (payload, codec)
+        payload, codec = best
+        self.wire.add_upload(codec.name, len(payload), raw)
+        return payload, codec.mimetype
+
+    def tts_codec_for(self, text):
+        return self.tts_codec if len(text) >= self.min_tts_chars else WavCodec()
+
+    def decode_reply(self, data, codec):
+        """Encoded TTS reply -> 16-bit PCM WAV for playback and merging"""
+        if codec.name == "wav":
+            wav = data
+        else:
+            pcm, sample_rate = codec.decode(data)
+            wav = pcm_to_wav(pcm, sample_rate)
+        self.wire.add_download(codec.name, len(data), len(wav))
+        return wav
@@ -0,0 +1,145 @@
+import time
+import threading
+
+
+class Deferred:
+    """Stands in for an SDK client and builds it on first attribute access
+
+    Importing and configuring the Gemini and Deepgram SDKs takes long enough to
+    delay the first page render, and many sessions never use one of them.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._factory()
+        return self._value
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+class GeminiBackend:
+    """LLM backend around a google.generativeai GenerativeModel"""
+
+    def __init__(self, model):
+        self.model = model
+
+    def generate(self, prompt):
+        return self.model.generate_content(prompt).text
+
+    def stream(self, prompt):
+        """Yield text chunks as Gemini produces them"""
+        for chunk in self.model.generate_content(prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+
+class DeepgramSTTBackend:
+    """STT backend around a Deepgram client"""
+
+    def __init__(self, client, model="nova-2", language="en-US"):
+        self.client = client
+        self.model = model
+        self.language = language
+
+    def transcribe(self, audio, mimetype="audio/wav"):
+        from deepgram import PrerecordedOptions
+        options = PrerecordedOptions(model=self.model, smart_format=True, punctuate=True, language=self.language)
+        response = self.client.listen.rest.v("1").transcribe_file({"buffer": audio, "mimetype": mimetype}, options)
+        return response.results.channels[0].alternatives[0].transcript
+
+
+class DeepgramTTSBackend:
+    """TTS backend around a Deepgram client; returns WAV bytes"""
+
+    def __init__(self, client, encoding="linear16", container="wav"):
+        self.client = client
+        self.encoding = encoding
+        self.container = container
+
+    def synthesize(self, text, voice_model, options=None):
+        """options overrides encoding/container/sample_rate for this call (see audio_codec)"""
+        from deepgram import SpeakOptions
+        params = {"encoding": self.encoding, "container": self.container}
+        params.update(options or {})
+        response = self.client.speak.rest.v("1").stream_memory({"text": text}, SpeakOptions(model=voice_model, **params))
+        return response.stream_memory.getvalue()
+
+
+class FakeLLMBackend:
+    """Local stand-in for Gemini: echoes a canned answer in timed chunks"""
+
+    def __init__(self, answer=None, chunk_chars=24, first_token_delay=0.3, chunk_delay=0.05):
+        self.answer = answer
+        self.chunk_chars = chunk_chars
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self.prompt_bytes = 0
+
+    def respond(self, prompt):
+        if self.answer is not None:
+            return self.answer
+        # Mention how many listing rows were in the prompt so answers differ per directory
+        rows = prompt.count("|f|") + prompt.count("|d|")
+        return (f"I looked at {rows} entries in your directory. "
+                "Everything seems to be in order. Let me know if you need anything else!")
+
+    def generate(self, prompt):
+        return "".join(self.stream(prompt))
+
+    def stream(self, prompt):
+        self.calls += 1
+        self.prompt_bytes += len(prompt.encode("utf-8"))
+        answer = self.respond(prompt)
+        time.sleep(self.first_token_delay)
+        for start in range(0, len(answer), self.chunk_chars):
+            if start:
+                time.sleep(self.chunk_delay)
+            yield answer[start:start + self.chunk_chars]
+
+
+class FakeSTTBackend:
+    """Local stand-in for Deepgram STT: returns a fixed transcript after a delay"""
+
+    def __init__(self, transcript="How many files are there?", delay=0.3):
+        self.transcript = transcript
+        self.delay = delay
+        self.calls = 0
+        self.audio_bytes = 0
+
+    def transcribe(self, audio, mimetype="audio/wav"):
+        self.calls += 1
+        self.audio_bytes += len(audio)
+        time.sleep(self.delay)
+        return self.transcript
+
+
+class FakeTTSBackend:
+    """Local stand-in for Deepgram TTS: silent 16-bit mono WAV sized to the text"""
+
+    def __init__(self, delay=0.2, per_char_delay=0.002, sample_rate=16000, chars_per_second=15):
+        self.delay = delay
+        self.per_char_delay = per_char_delay
+        self.sample_rate = sample_rate
+        self.chars_per_second = chars_per_second
+        self.calls = 0
+
+    def synthesize(self, text, voice_model, options=None):
+        import numpy as np
+        from audio_codec import codec_for_encoding
+        self.calls += 1
+        time.sleep(self.delay + self.per_char_delay * len(text))
+        options = options or {}
+        sample_rate = options.get("sample_rate", self.sample_rate)
+        frames = int(sample_rate * max(len(text), 1) / self.chars_per_second)
+        # Low-level noise rather than digital silence so compressed sizes are realistic
+        pcm = (np.random.default_rng(len(text)).normal(0, 200, frames)).astype(np.int16).tobytes()
+        return codec_for_encoding(options.get("encoding", "linear16")).encode(pcm, sample_rate)
@@ -0,0 +1,306 @@
+"""Benchmark the file assistant on synthetic directory trees with local stand-ins for Gemini and Deepgram
+
+    python benchmark.py --sizes 1000,10000,100000 --output bench.json
+    python benchmark.py --sizes 1000000 --repeat 3 --compare bench.json
+
+Every stage is timed --repeat times per tree size (app startup once, as entries 0); results (median/mean/min/p95 in
+milliseconds plus stage-specific counters) are written as JSON together with the
+git commit, so runs on two commits can be compared with --compare.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+EXTENSIONS = [".txt", ".py", ".md", ".json", ".csv", ".log", ".tmp", ".c", ".html", ".wav", ".png", ""]
+
+WORDS = ["report", "notes", "data", "main", "utils", "config", "draft", "backup", "image", "test",
+         "readme", "invoice", "summary", "todo", "archive", "build", "cache", "index", "export", "sample"]
+
+# A markdown-heavy reply, the kind clean_text_for_speech has to strip before TTS
+SAMPLE_REPLY = """## Summary
+Here are the **largest files** in your directory:
+1. `data/export_42.csv` - *12.4 MB*
+2. `backup/archive_7.tmp` - *8.1 MB*
+- See [the docs](https://example.com/docs) for __details__.
+```
+ls -la
+```
+Let me know if you need _anything_ else!
+""" * 4
+
+LOCAL_QUERIES = ["How many Python files are there?", "What's the largest file?", "What's the largest folder?",
+                 "List all markdown files"]
+
+LLM_QUERIES = ["Which of these files look like temporary files I could clean up?",
+               "Summarize what this project seems to be about"]
+
+
+def make_tree(root, entries, seed=0, files_per_dir=50):
+    """Create entries files and directories under root (sparse files, so sizes cost no disk)"""
+    rng = random.Random(seed)
+    directories = [""]
+    created = 0
+    while created < entries:
+        parent = rng.choice(directories[-200:])
+        if rng.random() < 1 / files_per_dir:
+            path = os.path.join(parent, f"{rng.choice(WORDS)}_{created}")
+            os.mkdir(os.path.join(root, path))
+            directories.append(path)
+        else:
+            name = f"{rng.choice(WORDS)}_{created}{rng.choice(EXTENSIONS)}"
+            with open(os.path.join(root, parent, name), "wb") as f:
+                f.truncate(int(rng.lognormvariate(8, 2)))
+        created += 1
+    return directories
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def summarize(timings):
+    timings_ms = [t * 1000 for t in timings]
+    return {
+        "runs": len(timings_ms),
+        "median_ms": round(percentile(timings_ms, 0.5), 3),
+        "mean_ms": round(sum(timings_ms) / len(timings_ms), 3),
+        "min_ms": round(min(timings_ms), 3),
+        "p95_ms": round(percentile(timings_ms, 0.95), 3),
+    }
+
+
+def timed(fn, repeat, setup=None):
+    """Time fn() repeat times (setup() runs untimed before each call); returns (timings, last result)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return timings, result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def bench_startup(args):
+    """Import time of app.py in a fresh interpreter (streamlit preloaded, as under `streamlit run`)"""
+    code = "import time, streamlit; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    def run():
+        output = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True, check=True)
+        return float(output.stdout.strip().splitlines()[-1])
+
+    try:
+        timings = [run() for _ in range(args.repeat)]
+    except (subprocess.CalledProcessError, ValueError, IndexError) as e:
+        print(f"  app_import skipped: {e}")
+        return []
+    result = {"entries": 0, "stage": "app_import", **summarize(timings)}
+    print(f"  {'app_import':<28} median {result['median_ms']:>10.3f} ms  p95 {result['p95_ms']:>10.3f} ms")
+    return [result]
+
+
+def bench_tree(entries, args):
+    """Run every stage against one synthetic tree; returns a list of result dicts"""
+    from app import SmartFileSystemTool, VoiceAssistant
+    from backends import FakeLLMBackend, FakeSTTBackend, FakeTTSBackend
+    from cache import ResponseCache
+    from duplicates import DuplicateFinder
+    from explorer import ExplorerView
+    from scanner import get_scanner
+    from snapshot_service import SnapshotService
+    from sqlite_index import SQLiteIndex
+
+    results = []
+
+    def record(stage, timings, **extra):
+        results.append({"entries": entries, "stage": stage, **summarize(timings), **extra})
+        print(f"  {stage:<28} median {results[-1]['median_ms']:>10.3f} ms  p95 {results[-1]['p95_ms']:>10.3f} ms")
+
+    workdir = tempfile.mkdtemp(prefix="bench-tree-")
+    previous = os.getcwd()
+    try:
+        started = time.perf_counter()
+        make_tree(workdir, entries, seed=args.seed)
+        print(f"{entries:,} entries (tree built in {time.perf_counter() - started:.1f}s)")
+        os.chdir(workdir)
+
+        llm = FakeLLMBackend(first_token_delay=args.llm_latency, chunk_delay=0)
+
+        def new_tool():
+            # Fresh scanner too, so owner lookups aren't already memoized
+            return SmartFileSystemTool(max_depth=None, llm=llm, scanner=get_scanner(args.scanner))
+
+        # Scan: a fresh tool per run is a cold scan; afterwards the snapshot is served from cache
+        tools = [None]
+        timings, data = timed(lambda: tools[0].get_all_files(), args.repeat,
+                              setup=lambda: tools.__setitem__(0, new_tool()))
+        record("get_all_files_cold", timings, total_files=data["total_files"])
+        tool = tools[0]
+        timings, _ = timed(tool.get_all_files, args.repeat)
+        record("get_all_files_warm", timings)
+
+        # New process with a persistent index: unchanged directories come from SQLite
+        index_path = os.path.join(tempfile.mkdtemp(prefix="bench-index-"), "index.sqlite3")
+
+        def indexed_tool():
+            scanner = get_scanner(args.scanner)
+            index = SQLiteIndex(index_path, scanner) if hasattr(scanner, "list_directory") else None
+            return SmartFileSystemTool(llm=llm, service=SnapshotService(scanner, None, index=index))
+
+        if hasattr(get_scanner(args.scanner), "list_directory"):
+            indexed_tool().get_all_files()
+            timings, _ = timed(lambda: tools[0].get_all_files(), args.repeat,
+                               setup=lambda: tools.__setitem__(0, indexed_tool()))
+            record("get_all_files_indexed", timings)
+            shutil.rmtree(os.path.dirname(index_path), ignore_errors=True)
+
+        # Filename lookups: exact, substring and a miss
+        names = [r["name"] for r in random.Random(args.seed).sample(data["files"], min(50, len(data["files"])))]
+        for label, queries in (("exact", names), ("substring", [n[:5] for n in names]), ("miss", ["zz_no_such_file.xyz"])):
+            timings, _ = timed(lambda: [tool.find_file(q) for q in queries], args.repeat)
+            record(f"find_file_{label}", [t / len(queries) for t in timings], lookups=len(queries))
+
+        # Questions answered locally from the columnar store
+        tool.get_store()
+        timings, _ = timed(lambda: [tool.query_files(q) for q in LOCAL_QUERIES], args.repeat)
+        record("query_files_local", [t / len(LOCAL_QUERIES) for t in timings])
+
+        # Questions that go to the (fake) LLM; a fresh response cache each run so nothing is reused
+        def llm_setup():
+            tool.response_cache = ResponseCache(max_entries=64)
+            llm.calls = llm.prompt_bytes = 0
+
+        timings, _ = timed(lambda: [tool.query_files(q) for q in LLM_QUERIES], args.repeat, setup=llm_setup)
+        record("query_files_llm", [t / len(LLM_QUERIES) for t in timings],
+               prompt_bytes=llm.prompt_bytes // max(llm.calls, 1), llm_calls=llm.calls)
+        timings, _ = timed(lambda: [tool.query_files(q) for q in LLM_QUERIES], args.repeat)
+        record("query_files_cached", [t / len(LLM_QUERIES) for t in timings], llm_calls=llm.calls)
+
+        # Duplicate detection: a fresh finder hashes every candidate, a reused one hits its digest cache
+        timings, groups = timed(lambda: DuplicateFinder().find(data["files"]), args.repeat)
+        record("find_duplicates_cold", timings, groups=len(groups))
+        finder = DuplicateFinder()
+        finder.find(data["files"])
+        timings, _ = timed(lambda: finder.find(data["files"]), args.repeat)
+        record("find_duplicates_cached", timings)
+
+        timings, _ = timed(lambda: tool.clean_text_for_speech(SAMPLE_REPLY), args.repeat * 20)
+        record("clean_text_for_speech", timings, chars=len(SAMPLE_REPLY))
+
+        # File Explorer: columnar store + first page, from scratch and from the memoized view
+        def explorer_page(view):
+            return view.page(view.rows("", "All", "Name", False), 1, 100)
+
+        timings, _ = timed(lambda: explorer_page(ExplorerView(tool.service.get_store())), args.repeat,
+                           setup=lambda: setattr(tool.service, "store", None))
+        record("explorer_cold", timings)
+        view = tool.get_explorer()
+        explorer_page(view)
+        timings, _ = timed(lambda: explorer_page(view), args.repeat)
+        record("explorer_page_cached", timings)
+
+        # Voice turn with stand-in STT/TTS: transcribe, then answer sentence by sentence
+        assistant = VoiceAssistant(tool, stt_backend=FakeSTTBackend(delay=args.stt_latency),
+                                   tts_backend=FakeTTSBackend(delay=args.tts_latency, per_char_delay=0))
+        first_audio = []
+
+        def voice_turn():
+            transcript = assistant.transcribe_audio(b"RIFF")
+            segments = list(assistant.stream_reply(transcript + " Which files are temporary?", "aura-asteria-en"))
+            first_audio.append(segments[0].latency if segments else None)
+
+        timings, _ = timed(voice_turn, args.repeat, setup=llm_setup)
+        record("voice_turn", timings, first_audio_ms=round(1000 * percentile([a for a in first_audio if a], 0.5), 3))
+    finally:
+        os.chdir(previous)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline_path):
+    """Print median changes against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(r["entries"], r["stage"]): r["median_ms"] for r in baseline["results"]}
+    print(f"\nCompared with {baseline['meta'].get('commit')} ({baseline_path}):")
+    for r in results:
+        old = before.get((r["entries"], r["stage"]))
+        if old:
+            change = (r["median_ms"] - old) / old * 100
+            print(f"  {r['entries']:>9,} {r['stage']:<28} {old:>10.3f} -> {r['median_ms']:>10.3f} ms ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="comma-separated tree sizes in entries (up to 1000000)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scanner", default="scandir", help="scanner backend (scandir or native)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="fake Gemini time to first token (s)")
+    parser.add_argument("--stt-latency", type=float, default=0.0, help="fake Deepgram STT latency (s)")
+    parser.add_argument("--tts-latency", type=float, default=0.0, help="fake Deepgram TTS latency (s)")
+    parser.add_argument("--output", default=None, help="results file (default benchmarks/benchmark-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare medians against")
+    args = parser.parse_args()
+
+    # Keep the benchmark hermetic: no disk caches, indexes or trace log, and no watcher unless FILE_WATCHER is set
+    os.environ.setdefault("RESPONSE_CACHE_DIR", "off")
+    os.environ.setdefault("TTS_CACHE_DIR", "off")
+    os.environ.setdefault("TRACE_FILE", "off")
+    os.environ.setdefault("FILE_INDEX_DIR", "off")
+    os.environ.setdefault("CONTENT_INDEX", "off")
+    os.environ.setdefault("FILE_WATCHER", "off")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    commit = git_commit()
+    if args.output:
+        output = os.path.abspath(args.output)
+    else:
+        # Kept out of the working tree's top level; benchmarks/ is gitignored
+        results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+        os.makedirs(results_dir, exist_ok=True)
+        output = os.path.join(results_dir, f"benchmark-{commit or 'local'}.json")
+    print("Startup")
+    results = bench_startup(args)
+    for entries in (int(size) for size in args.sizes.split(",")):
+        results.extend(bench_tree(entries, args))
+
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {len(results)} results to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def default_cache_dir(name):
+    """Per-user cache directory, kept outside the scanned working directory"""
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ai-file-assistant", name)
+
+
+def cache_dir_from_env(variable, name):
+    """Disk tier location: unset = default per-user dir, "off" = memory only"""
+    value = os.getenv(variable)
+    if value is None or value == "":
+        return default_cache_dir(name)
+    if value.lower() in ("off", "none", "0", "false"):
+        return None
+    return value
+
+
+def normalize_query(query):
+    """Case/whitespace/trailing-punctuation insensitive form of a question"""
+    return re.sub(r"\s+", " ", query.strip().lower()).rstrip("?!. ")
+
+
+class LRUCache:
+    """Thread-safe LRU cache with optional TTL, byte budget and on-disk tier
+
+    Values must be str or bytes so the disk tier can store them as files.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=None, ttl=None, disk_dir=None, disk_max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.entries = OrderedDict()   # key -> (value, stored_at, size)
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def sizeof(value):
+        return len(value.encode("utf-8")) if isinstance(value, str) else len(value)
+
+    def expired(self, stored_at):
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def disk_path(self, key):
+        return os.path.join(self.disk_dir, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if not self.expired(entry[1]):
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self._drop(key)
+        value = self._disk_get(key)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, value[0], value[1])
+        return value[0]
+
+    def put(self, key, value):
+        stored_at = time.time()
+        with self.lock:
+            self._store(key, value, stored_at)
+        self._disk_put(key, value)
+
+    def _store(self, key, value, stored_at):
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = (value, stored_at, size)
+        self.total_bytes += size
+        while self.entries and (len(self.entries) > self.max_entries or
+                                (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+            oldest = next(iter(self.entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key):
+        _, _, size = self.entries.pop(key)
+        self.total_bytes -= size
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+        path = self.disk_path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if self.expired(stored_at):
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            return None
+        # First byte records whether the value was text or bytes
+        value = raw[1:].decode("utf-8") if raw[:1] == b"s" else raw[1:]
+        return value, stored_at
+
+    def _disk_put(self, key, value):
+        if not self.disk_dir:
+            return
+        raw = b"s" + value.encode("utf-8") if isinstance(value, str) else b"b" + value
+        path = self.disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(raw)
+            os.replace(tmp_path, path)
+        except OSError:
+            # Disk tier is best-effort
+            return
+        if self.disk_max_bytes is not None:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Delete expired files, then the oldest ones until the disk tier fits its budget"""
+        files = []
+        total = 0
+        with os.scandir(self.disk_dir) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                    if self.expired(st.st_mtime):
+                        os.remove(entry.path)
+                        continue
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        files.sort()
+        for _, size, path in files:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+class ResponseCache(LRUCache):
+    """LLM answers keyed by normalized question plus a fingerprint of the directory snapshot"""
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+            disk_dir=cache_dir_from_env("RESPONSE_CACHE_DIR", "responses"),
+            disk_max_bytes=int(os.getenv("RESPONSE_CACHE_DISK_BYTES", str(32 * 1024 * 1024))),
+        )
+
+    @staticmethod
+    def make_key(query, fingerprint):
+        return f"{fingerprint}:{normalize_query(query)}"
+
+
+class AudioCache(LRUCache):
+    """Synthesized speech keyed by (voice model, cleaned text), bounded by a byte budget"""
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_entries=int(os.getenv("TTS_CACHE_SIZE", "512")),
+            max_bytes=int(os.getenv("TTS_CACHE_BYTES", str(32 * 1024 * 1024))),
+            disk_dir=cache_dir_from_env("TTS_CACHE_DIR", "tts"),
+            disk_max_bytes=int(os.getenv("TTS_CACHE_DISK_BYTES", str(256 * 1024 * 1024))),
+        )
+
+    @staticmethod
+    def make_key(voice_model, text, audio_format="wav"):
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{voice_model}:{audio_format}:{digest}"
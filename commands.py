@@ -0,0 +1,232 @@
+import os
+import re
+import fnmatch
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from snapshot import record_path
+
+# One file operation of a batch; content is only used by creates
+Operation = namedtuple("Operation", ["action", "path", "content"])
+
+# operations run together; missing lists delete targets that matched nothing
+CommandPlan = namedtuple("CommandPlan", ["operations", "missing", "dry_run"])
+
+OperationResult = namedtuple("OperationResult", ["operation", "success", "message"])
+
+VERBS = {"create": "create", "make": "create", "new": "create", "delete": "delete", "remove": "delete"}
+
+VERB = re.compile(r"\b(create|make|new(?= files?\b)|delete|remove)\b", re.IGNORECASE)
+
+CONTENT = re.compile(r"\s+with content[:\s]+(.+)$", re.IGNORECASE | re.DOTALL)
+
+DRY_RUN = re.compile(r"\b(?:preview|dry[- ]?run|what would|simulate)\b", re.IGNORECASE)
+
+FILLER_WORDS = {
+    "a", "an", "the", "file", "files", "named", "called", "all", "every", "everything", "matching",
+    "like", "and", "then", "also", "please", "for", "me", "of", "them", "these", "those", "&",
+}
+
+GLOB_CHARS = set("*?[")
+
+MAX_WORKERS = 8
+
+MAX_PREVIEW = 20
+
+
+def looks_like_path(token):
+    """Tokens with an extension, a glob or a directory part name files; plain words don't"""
+    return "." in token or "/" in token or any(c in GLOB_CHARS for c in token)
+
+
+def clause_tokens(text):
+    tokens = (token.strip("\"'").rstrip("!?.") for token in re.split(r"[\s,;]+", text.strip()))
+    return [token for token in tokens if token]
+
+
+def split_targets(text):
+    """File names and patterns named in one clause ("a.txt, b.txt and c.md")"""
+    tokens = [t for t in clause_tokens(text) if t.lower() not in FILLER_WORDS]
+    targets = [t for t in tokens if looks_like_path(t)]
+    # "delete notes" keeps working: a lone plain word is the file name
+    return targets or tokens[:1]
+
+
+def leading_targets(text):
+    """Names right after a create verb ("a.txt, b.txt and c.md"), stopping at the first other word
+
+    "make a summary of a.txt" names summary, not a.txt: a file mentioned later in
+    the sentence is what the question is about, not something to create.
+    """
+    targets = []
+    for token in clause_tokens(text):
+        if token.lower() in FILLER_WORDS:
+            continue
+        if looks_like_path(token):
+            targets.append(token)
+            continue
+        if not targets:
+            # "create notes" keeps working: a plain first word is the file name
+            targets.append(token)
+        break
+    return targets
+
+
+def find_path(target, files):
+    """Record whose path (relative to the scan root) is target, ignoring case and separators"""
+    wanted = os.path.normpath(target).replace(os.sep, "/").lower()
+    for record in files:
+        if record["type"] == "file" and record_path(record).replace(os.sep, "/").lower() == wanted:
+            return record
+    return None
+
+
+def as_glob(target):
+    """Selection pattern for a target, or None for a literal name (".tmp" means "*.tmp")"""
+    if any(c in GLOB_CHARS for c in target):
+        return target
+    if target.startswith(".") and target.count(".") == 1 and len(target) > 1:
+        return "*" + target
+    return None
+
+
+def select(pattern, files):
+    """Regular files whose name (or path, when the pattern has a directory) matches the glob"""
+    pattern = pattern.lower()
+    on_path = "/" in pattern
+    for record in files:
+        if record["type"] != "file":
+            continue
+        subject = record_path(record) if on_path else record["name"]
+        if fnmatch.fnmatchcase(subject.lower().replace(os.sep, "/"), pattern):
+            yield record
+
+
+def parse_command(query, files, lookup):
+    """Turn a create/delete request into a CommandPlan, or None if it isn't one
+
+    files is the current listing (glob selections are resolved against it) and
+    lookup(name) finds a single file record by name. Create targets are the
+    names directly after the verb. Delete targets must be a file name with an
+    extension, a relative path, a glob, or a bare word that is exactly some
+    file's name.
+    """
+    content_match = CONTENT.search(query)
+    command = query[:content_match.start()] if content_match else query
+    content = content_match.group(1).strip() if content_match else ""
+
+    verbs = list(VERB.finditer(command))
+    if not verbs:
+        return None
+
+    operations = []
+    missing = []
+    seen = set()
+
+    def add(action, path, body=""):
+        path = os.path.normpath(path)
+        if path not in seen:
+            seen.add(path)
+            operations.append(Operation(action, path, body))
+
+    for i, verb in enumerate(verbs):
+        end = verbs[i + 1].start() if i + 1 < len(verbs) else len(command)
+        action = VERBS[verb.group(1).lower()]
+        clause = command[verb.end():end]
+        for target in leading_targets(clause) if action == "create" else split_targets(clause):
+            pattern = as_glob(target)
+            if action == "create":
+                if pattern is None:
+                    add("create", target, content)
+            elif pattern is not None:
+                matched = [record_path(r) for r in select(pattern, files)]
+                if not matched:
+                    missing.append(target)
+                for path in sorted(matched):
+                    add("delete", path)
+            elif looks_like_path(target):
+                # lookup only knows names; "sub/big.bin" is matched against the listing's paths
+                record = find_path(target, files) if "/" in target or os.sep in target else lookup(target)
+                if record is None:
+                    missing.append(target)
+                else:
+                    add("delete", record_path(record))
+            else:
+                # A bare word only names a file called exactly that; otherwise it is part of
+                # a question ("remove duplicate files"), not a target for the fuzzy lookup
+                record = lookup(target)
+                if record is not None and record["name"].lower() == target.lower():
+                    add("delete", record_path(record))
+
+    if not operations and not missing:
+        return None
+    return CommandPlan(operations, missing, bool(DRY_RUN.search(command)))
+
+
+def run_plan(plan, handlers, max_workers=MAX_WORKERS):
+    """Run the plan's operations concurrently; handlers maps action -> fn(operation) -> (success, message)
+
+    Results come back in plan order.
+    """
+    if not plan.operations:
+        return []
+    workers = min(max_workers, len(plan.operations))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outcomes = list(executor.map(lambda op: handlers[op.action](op), plan.operations))
+    return [OperationResult(op, success, message) for op, (success, message) in zip(plan.operations, outcomes)]
+
+
+def _listed(paths):
+    shown = ", ".join(f"'{p}'" for p in paths[:MAX_PREVIEW])
+    if len(paths) > MAX_PREVIEW:
+        shown += f" and {len(paths) - MAX_PREVIEW} more"
+    return shown
+
+
+def describe_plan(plan):
+    """Dry-run preview of what the plan would do"""
+    lines = []
+    for action, verb in (("create", "create"), ("delete", "delete")):
+        paths = [op.path for op in plan.operations if op.action == action]
+        if paths:
+            lines.append(f"🔍 Would {verb} {len(paths)} file{'s' if len(paths) != 1 else ''}: {_listed(paths)}")
+    if plan.missing:
+        lines.append(f"❌ Nothing matches {_listed(plan.missing)}")
+    if not plan.operations:
+        lines.append("Nothing would change.")
+    return "\n".join(lines)
+
+
+def summarize(plan, results):
+    """User-facing report of an executed plan"""
+    if len(results) == 1 and not plan.missing:
+        result = results[0]
+        if result.operation.action == "create":
+            if result.success:
+                return (f"✅ Successfully created file '{result.message}'! The file has been added to your directory. "
+                        "You can now query its properties or list all files to see it.")
+            return f"❌ Failed to create file: {result.message}"
+        if result.success:
+            return f"✅ Successfully deleted '{result.message}'. The file has been removed from your directory."
+        return f"❌ Failed to delete file: {result.message}"
+    if not results and len(plan.missing) == 1:
+        return f"❌ File '{plan.missing[0]}' not found in the directory."
+
+    lines = []
+    for action, verb in (("create", "Created"), ("delete", "Deleted")):
+        done = [r.message for r in results if r.operation.action == action and r.success]
+        if done:
+            lines.append(f"✅ {verb} {len(done)} file{'s' if len(done) != 1 else ''}: {_listed(done)}")
+    # Group failures sharing a reason so "delete *.py" doesn't list every protected file separately
+    failures = {}
+    for result in results:
+        if not result.success:
+            failures.setdefault((result.operation.action, result.message), []).append(result.operation.path)
+    for (action, message), paths in failures.items():
+        if len(paths) == 1:
+            lines.append(f"❌ Failed to {action} '{paths[0]}': {message}")
+        else:
+            lines.append(f"❌ Failed to {action} {len(paths)} files ({message}): {_listed(paths)}")
+    if plan.missing:
+        lines.append(f"❌ Not found: {_listed(plan.missing)}")
+    return "\n".join(lines)
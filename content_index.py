@@ -0,0 +1,204 @@
+import os
+import re
+import mmap
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from snapshot import record_path
+
+# Words: runs of ASCII letters/digits/underscore or UTF-8 multibyte characters
+TOKEN = re.compile(rb"[A-Za-z0-9_\x80-\xff]{2,}")
+
+MAX_TOKEN_LENGTH = 64
+
+# Files at least this large are mapped instead of read into memory
+MMAP_THRESHOLD = 256 * 1024
+
+# A NUL byte in the first block means the file is binary
+SNIFF_BYTES = 8192
+
+DEFAULT_EXTENSIONS = (".txt", ".md", ".rst", ".csv", ".tsv", ".log", ".json", ".xml", ".html", ".htm",
+                      ".yml", ".yaml", ".toml", ".ini", ".cfg", ".conf", ".py", ".c", ".h", ".cpp",
+                      ".js", ".ts", ".css", ".java", ".go", ".rs", ".sh", ".bat", ".sql")
+
+CONTENT_QUESTION = re.compile(
+    r"^(?:(?:which|what|find|show|list|search)\s+(?:me\s+)?(?:all\s+)?(?:the\s+)?)?(?:files?|documents?)\s+"
+    r"(?:that\s+|which\s+)?(?:(?:contains?|containing|mentions?|mentioning)\s+(?:the\s+)?(?:words?\s+|text\s+|phrase\s+)?"
+    r"|with\s+the\s+(?:words?|text|phrase)\s+)(.+?)[?!.]*$", re.IGNORECASE)
+
+SEARCH_COMMAND = re.compile(
+    r"^(?:search|grep)\s+(?:(?:the\s+|my\s+)?files\s+)?for\s+(.+?)(?:\s+in\s+(?:the\s+|my\s+|all\s+)?files)?[?!.]*$",
+    re.IGNORECASE)
+
+MAX_LISTED = 20
+
+EMPTY = frozenset()
+
+
+def tokenize(data):
+    """Distinct lowercase words of a bytes-like object (bytes or an mmap)"""
+    words = set(TOKEN.findall(data))
+    return frozenset(word.decode("utf-8", errors="ignore").lower() for word in words
+                     if len(word) <= MAX_TOKEN_LENGTH)
+
+
+def read_tokens(path, max_bytes):
+    """Words of a text file; None if it is too large or looks binary"""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size > max_bytes:
+            return None
+        if size == 0:
+            return EMPTY
+        if size < MMAP_THRESHOLD:
+            data = f.read()
+            return None if b"\0" in data[:SNIFF_BYTES] else tokenize(data)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return None if b"\0" in data[:SNIFF_BYTES] else tokenize(data)
+
+
+def parse_content_query(query):
+    """Search terms of a "which files contain X" question, or None for other questions"""
+    text = query.strip()
+    match = CONTENT_QUESTION.match(text) or SEARCH_COMMAND.match(text)
+    if match is None:
+        return None
+    terms = sorted(tokenize(match.group(1).strip("\"'").encode("utf-8")))
+    return terms or None
+
+
+def summarize_matches(terms, paths, progress):
+    """Chat reply listing the files that contain every term"""
+    indexed, pending = progress
+    quoted = " and ".join(f"'{term}'" for term in terms)
+    note = f" (still indexing: {pending} of {indexed + pending} files to go)" if pending else ""
+    if not paths:
+        return f"No indexed files contain {quoted}{note}."
+    listed = [f"- {path}" for path in paths[:MAX_LISTED]]
+    if len(paths) > MAX_LISTED:
+        listed.append(f"- ...and {len(paths) - MAX_LISTED} more")
+    count = f"{len(paths)} file{'s' if len(paths) != 1 else ''}"
+    return f"{count} contain{'s' if len(paths) == 1 else ''} {quoted}{note}:\n" + "\n".join(listed)
+
+
+class ContentIndex:
+    """Inverted index (word -> paths) over text files, filled by a background worker pool
+
+    A file is read only when its size or mtime differs from the indexed
+    version, so full rescans and watcher deltas cost one read per changed
+    file. Files over max_bytes, with other extensions or that look binary
+    are recorded as having no words. Kept alongside a FileSnapshot as an
+    observer; searches only touch the postings, never the files.
+    """
+
+    def __init__(self, root=".", max_bytes=1024 * 1024, extensions=DEFAULT_EXTENSIONS, workers=4):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.extensions = {ext.lower() for ext in extensions}
+        self.postings = defaultdict(set)   # word -> paths
+        self.documents = {}                # path -> ((size, modified), words)
+        self.queued = {}                   # path -> (size, modified) being read
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="content-index")
+
+    @classmethod
+    def from_env(cls):
+        """CONTENT_INDEX=off disables; size, extension and worker limits are configurable"""
+        if os.getenv("CONTENT_INDEX", "on").lower() in ("off", "none", "0", "false"):
+            return None
+        extensions = os.getenv("CONTENT_INDEX_EXTENSIONS")
+        return cls(
+            max_bytes=int(os.getenv("CONTENT_INDEX_MAX_BYTES", str(1024 * 1024))),
+            extensions=[e.strip() for e in extensions.split(",") if e.strip()] if extensions else DEFAULT_EXTENSIONS,
+            workers=int(os.getenv("CONTENT_INDEX_WORKERS", "4")),
+        )
+
+    def wants(self, record):
+        if record["type"] != "file" or record["size"] > self.max_bytes:
+            return False
+        return os.path.splitext(record["name"])[1].lower() in self.extensions
+
+    def update(self, records):
+        """Bring the index in line with a full listing: read new or changed files, forget missing ones"""
+        current = set()
+        for record in records:
+            if self.wants(record):
+                current.add(record_path(record))
+                self.schedule(record)
+        with self.lock:
+            for path in [p for p in self.documents if p not in current]:
+                self._drop(path)
+            for path in [p for p in self.queued if p not in current]:
+                del self.queued[path]
+
+    def schedule(self, record):
+        path = record_path(record)
+        signature = (record["size"], record["modified"])
+        with self.lock:
+            document = self.documents.get(path)
+            if document is not None and document[0] == signature:
+                return
+            if self.queued.get(path) == signature:
+                return
+            self.queued[path] = signature
+        self.executor.submit(self._index, path, signature)
+
+    def _index(self, path, signature):
+        try:
+            words = read_tokens(os.path.join(self.root, path), self.max_bytes)
+        except (OSError, ValueError):
+            words = None
+        with self.lock:
+            # Superseded by a newer change, or removed, while it was being read
+            if self.queued.get(path) != signature:
+                return
+            del self.queued[path]
+            self._drop(path)
+            words = words or EMPTY
+            self.documents[path] = (signature, words)
+            for word in words:
+                self.postings[word].add(path)
+
+    def _drop(self, path):
+        document = self.documents.pop(path, None)
+        if document is None:
+            return
+        for word in document[1]:
+            paths = self.postings.get(word)
+            if paths is not None:
+                paths.discard(path)
+                if not paths:
+                    del self.postings[word]
+
+    def remove(self, path):
+        with self.lock:
+            self.queued.pop(path, None)
+            self._drop(path)
+
+    def search(self, terms):
+        """Sorted paths of indexed files containing every term"""
+        with self.lock:
+            matches = sorted((self.postings.get(term, EMPTY) for term in terms), key=len)
+            if not matches:
+                return []
+            result = set(matches[0]).intersection(*matches[1:])
+        return sorted(result)
+
+    def progress(self):
+        """(files indexed, files waiting to be read)"""
+        with self.lock:
+            return len(self.documents), len(self.queued)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # FileSnapshot observer hooks
+    def on_upsert(self, old, new):
+        if self.wants(new):
+            self.schedule(new)
+        else:
+            self.remove(record_path(new))
+
+    def on_remove(self, record):
+        self.remove(record_path(record))
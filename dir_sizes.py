@@ -0,0 +1,85 @@
+import os
+
+from snapshot import record_path
+
+
+def ancestors(path):
+    """Parent directories of a relative path, innermost first, ending with "" (the scan root)"""
+    parent = os.path.dirname(path)
+    while parent:
+        yield parent
+        parent = os.path.dirname(parent)
+    yield ""
+
+
+class DirectoryTotals:
+    """Recursive size (bytes) and file count of every directory in a snapshot
+
+    Built bottom-up in one pass over the records; afterwards each delta only
+    adjusts the changed entry's ancestor chain. Kept alongside a FileSnapshot
+    as an observer.
+    """
+
+    def __init__(self, records=()):
+        totals = {"": [0, 0]}
+        for record in records:
+            path = record_path(record)
+            if record["type"] == "directory":
+                totals.setdefault(path, [0, 0])
+                continue
+            parent = os.path.dirname(path)
+            total = totals.get(parent)
+            if total is None:
+                total = totals[parent] = [0, 0]
+            total[0] += record["size"]
+            total[1] += 1
+        # Directories that only appear as parents (e.g. filtered out by include globs)
+        for path in list(totals):
+            for parent in ancestors(path) if path else ():
+                if parent in totals:
+                    break
+                totals[parent] = [0, 0]
+        # Deepest first, so each directory is complete before it is added to its parent
+        for path in sorted(totals, key=lambda p: p.count(os.sep) if p else -1, reverse=True):
+            if path:
+                total, parent = totals[path], totals[os.path.dirname(path)]
+                parent[0] += total[0]
+                parent[1] += total[1]
+        self.totals = totals
+
+    def get(self, path=""):
+        """(bytes, files) beneath a directory; (0, 0) for unknown paths"""
+        total = self.totals.get(path)
+        return (total[0], total[1]) if total is not None else (0, 0)
+
+    def copy(self):
+        """Point-in-time {directory: (bytes, files)}"""
+        return {path: (total[0], total[1]) for path, total in self.totals.items()}
+
+    def _adjust(self, path, size, files, create):
+        for parent in ancestors(path):
+            total = self.totals.get(parent)
+            if total is None:
+                if not create:
+                    # Removed together with the file (directory records are dropped first)
+                    continue
+                total = self.totals[parent] = [0, 0]
+            total[0] += size
+            total[1] += files
+
+    # FileSnapshot observer hooks
+    def on_upsert(self, old, new):
+        path = record_path(new)
+        if old is not None and old["type"] == "file":
+            self._adjust(path, -old["size"], -1, False)
+        if new["type"] == "file":
+            self._adjust(path, new["size"], 1, True)
+        else:
+            self.totals.setdefault(path, [0, 0])
+
+    def on_remove(self, record):
+        path = record_path(record)
+        if record["type"] == "file":
+            self._adjust(path, -record["size"], -1, False)
+        else:
+            self.totals.pop(path, None)
@@ -0,0 +1,156 @@
+import os
+import re
+import mmap
+import hashlib
+import threading
+from collections import namedtuple, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from snapshot import record_path
+from query_engine import format_size, join_names
+
+# Bytes hashed from each end of a file in the partial-hash stage
+BLOCK = 64 * 1024
+
+MAX_LISTED = 20
+
+# Paths named per group in chat answers
+MAX_PATHS = 5
+
+DUPLICATE_QUESTION = re.compile(
+    r"\b(?:duplicat(?:e|es|ed)\b(?!\.\w)|identical files|same content|(?:wasted|wasting) (?:disk )?space)",
+    re.IGNORECASE)
+
+
+class DuplicateGroup(namedtuple("DuplicateGroup", ["size", "paths", "digest"])):
+    """Files with identical contents (paths sorted)"""
+
+    @property
+    def wasted(self):
+        # Every copy after the first could be removed
+        return self.size * (len(self.paths) - 1)
+
+
+def partial_digest(path, size):
+    """Hash of the first and last BLOCK bytes (of the whole file when it is that small)"""
+    with open(path, "rb") as f:
+        if size <= 2 * BLOCK:
+            return hashlib.blake2b(f.read()).digest()
+        digest = hashlib.blake2b(f.read(BLOCK))
+        f.seek(-BLOCK, os.SEEK_END)
+        digest.update(f.read(BLOCK))
+        return digest.digest()
+
+
+def full_digest(path):
+    """Hash of the whole file, fed straight from a memory map (no intermediate copies)"""
+    digest = hashlib.blake2b()
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            digest.update(data)
+    return digest.digest()
+
+
+def is_duplicate_query(query):
+    return DUPLICATE_QUESTION.search(query) is not None
+
+
+def summarize_duplicates(groups):
+    """Chat reply for a duplicate-files question"""
+    if not groups:
+        return "I didn't find any duplicate files."
+    copies = sum(len(group.paths) for group in groups)
+    wasted = sum(group.wasted for group in groups)
+    lines = [f"I found {len(groups)} group{'s' if len(groups) != 1 else ''} of duplicate files "
+             f"({copies} files) wasting {format_size(wasted)}:"]
+    for group in groups[:MAX_LISTED]:
+        lines.append(f"- {len(group.paths)} × {format_size(group.size)}: "
+                     + join_names(list(group.paths[:MAX_PATHS]), len(group.paths)))
+    if len(groups) > MAX_LISTED:
+        lines.append(f"- ...and {len(groups) - MAX_LISTED} more groups")
+    return "\n".join(lines)
+
+
+class DuplicateFinder:
+    """Finds identical files in three stages, each touching only what the previous one left
+
+    1. Bucket by size (no I/O).
+    2. Hash the first and last block of files sharing a size.
+    3. Fully hash files whose partial hashes still collide.
+
+    Reads run on a thread pool (hashlib releases the GIL). Digests are cached
+    by (path, size, mtime), so repeating the search after a change only
+    hashes the files that changed.
+    """
+
+    def __init__(self, root=".", workers=4):
+        self.root = root
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.cache = {}   # path -> ((size, modified), partial digest, full digest)
+
+    @classmethod
+    def from_env(cls):
+        return cls(workers=int(os.getenv("DEDUP_WORKERS", "4")))
+
+    def _cached(self, record, full):
+        """Digest cached for the record's current (size, mtime), or None"""
+        cached = self.cache.get(record_path(record))
+        if cached is None or cached[0] != (record["size"], record["modified"]):
+            return None
+        return cached[2 if full else 1]
+
+    def _digest(self, record, full):
+        path = record_path(record)
+        signature = (record["size"], record["modified"])
+        try:
+            location = os.path.join(self.root, path)
+            digest = full_digest(location) if full else partial_digest(location, record["size"])
+        except (OSError, ValueError):
+            # Unreadable, or changed size while being read
+            return None
+        with self.lock:
+            cached = self.cache.get(path)
+            if cached is None or cached[0] != signature:
+                cached = (signature, None, None)
+            self.cache[path] = (signature, digest, cached[2]) if not full else (signature, cached[1], digest)
+        return digest
+
+    def _refine(self, groups, full, executor):
+        """Split groups of records by (partial or full) digest; returns [(digest, records)] of two or more"""
+        records = [record for _, group in groups for record in group]
+        digests = [self._cached(record, full) for record in records]
+        # Only cache misses go to the pool; submitting is the dominant cost on a warm cache
+        misses = [i for i, digest in enumerate(digests) if digest is None]
+        for i, digest in zip(misses, executor.map(lambda i: self._digest(records[i], full), misses)):
+            digests[i] = digest
+        buckets = defaultdict(list)
+        for record, digest in zip(records, digests):
+            if digest is not None:
+                buckets[(record["size"], digest)].append(record)
+        return [(key[1], bucket) for key, bucket in buckets.items() if len(bucket) > 1]
+
+    def find(self, records, min_size=1):
+        """DuplicateGroups among the file records, most wasted space first"""
+        by_size = defaultdict(list)
+        for record in records:
+            if record["type"] == "file" and record["size"] >= min_size:
+                by_size[record["size"]].append(record)
+        candidates = [(None, group) for group in by_size.values() if len(group) > 1]
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="dedup") as executor:
+            groups = self._refine(candidates, False, executor)
+            # Small files were hashed whole in the partial stage already
+            small = [(digest, group) for digest, group in groups if group[0]["size"] <= 2 * BLOCK]
+            large = self._refine([(digest, group) for digest, group in groups if group[0]["size"] > 2 * BLOCK],
+                                 True, executor)
+
+        # Forget digests of files that are gone or no longer share a size with anything
+        kept = {record_path(record) for _, group in candidates for record in group}
+        with self.lock:
+            self.cache = {path: value for path, value in self.cache.items() if path in kept}
+
+        result = [DuplicateGroup(group[0]["size"], tuple(sorted(record_path(r) for r in group)), digest.hex())
+                  for digest, group in small + large]
+        result.sort(key=lambda group: (-group.wasted, group.paths))
+        return result
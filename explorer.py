@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+
+from scanner import TIME_FORMAT
+from metadata_store import HIDDEN, READONLY
+
+# Sortable columns of the explorer table -> store column
+# (directories sort by the total size of their contents)
+SORT_COLUMNS = {"Name": "path", "Type": "is_dir", "Size": "tree_size", "Owner": "owner",
+                "Created": "created", "Modified": "modified"}
+
+KIND_FILTERS = {"All": None, "Files": "file", "Directories": "directory"}
+
+MAX_CACHED_FILTERS = 8
+
+
+class ExplorerView:
+    """Sorted, filtered, paginated view over one ColumnarStore
+
+    Sort orders and filter masks are computed once per store (i.e. per snapshot
+    version) and reused across reruns; only the visible page is turned into
+    display strings.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.orders = {}
+        self.masks = OrderedDict()
+
+    @property
+    def version(self):
+        return self.store.version
+
+    def order(self, sort_by="Name", descending=False):
+        """Row positions sorted by a column (stable, so ties keep path order)"""
+        key = (sort_by, descending)
+        if key not in self.orders:
+            name = SORT_COLUMNS[sort_by]
+            if name == "owner":
+                # Only sorting by owner needs every row's owner
+                column = pd.Series(self.store.column("owner"), dtype="category")
+            else:
+                column = self.store.frame[name]
+            if sort_by == "Name":
+                values = column.str.lower().to_numpy()
+            elif isinstance(column.dtype, pd.CategoricalDtype):
+                values = column.cat.codes.to_numpy()
+            else:
+                values = column.to_numpy()
+            order = np.argsort(values, kind="stable")
+            self.orders[key] = order[::-1] if descending else order
+        return self.orders[key]
+
+    def mask(self, search="", kind="All"):
+        key = (search.strip().lower(), kind)
+        if key in self.masks:
+            self.masks.move_to_end(key)
+        else:
+            self.masks[key] = self.store.mask(kind=KIND_FILTERS[kind], path_contains=key[0] or None)
+            if len(self.masks) > MAX_CACHED_FILTERS:
+                self.masks.popitem(last=False)
+        return self.masks[key]
+
+    def rows(self, search="", kind="All", sort_by="Name", descending=False):
+        """Positions of matching rows in display order"""
+        order = self.order(sort_by, descending)
+        return order[self.mask(search, kind)[order]]
+
+    def page(self, rows, page=1, page_size=100):
+        """Display frame for one page of rows (1-based page number)"""
+        start = (page - 1) * page_size
+        frame = self.store.frame.iloc[rows[start:start + page_size]]
+        is_dir = frame["is_dir"].to_numpy()
+        # Owners and attributes are loaded for this page's rows only
+        attrs = self.store.column("attrs", frame.index)
+        sizes = frame["tree_size"].map("{:,}".format).to_numpy()
+        return pd.DataFrame({
+            "Name": frame["path"].to_numpy(),
+            "Type": np.where(is_dir, "directory", "file"),
+            "Size": sizes,
+            "Owner": self.store.column("owner", frame.index).astype(str),
+            "Created": format_times(frame["created"]),
+            "Modified": format_times(frame["modified"]),
+            "Hidden": np.where(attrs & HIDDEN, "🔒", ""),
+            "ReadOnly": np.where(attrs & READONLY, "📝", ""),
+        })
+
+
+def duplicate_frame(groups):
+    """Display frame with one row per copy in each DuplicateGroup (largest waste first)"""
+    rows = [(number, path, f"{group.size:,}", len(group.paths), f"{group.wasted:,}", group.digest[:12])
+            for number, group in enumerate(groups, 1) for path in group.paths]
+    return pd.DataFrame(rows, columns=["Group", "Name", "Size", "Copies", "Wasted", "Hash"])
+
+
+def format_times(epochs):
+    """int64 epoch seconds -> the scanner's "MM/DD/YYYY HH:MM:SS" (UTC) strings"""
+    return pd.to_datetime(epochs.to_numpy(), unit="s", utc=True).strftime(TIME_FORMAT).to_numpy()
@@ -1,10 +1,41 @@
+// Lists the entries of the current directory with their metadata.
+//
+//   file_lister                   one JSON document {"files": [...], "total_files": n}
+//   file_lister --format ndjson   one compact JSON record per line, streamed as the listing runs
+//   file_lister --format binary   packed little-endian records (layout at write_binary_entry)
+//   file_lister --no-owner        skip the per-file owner lookup (owner is reported as "Unknown")
+//
+// Windows: gcc -O2 -o file_lister.exe file_lister.c -ladvapi32
+// POSIX:   gcc -O2 -o file_lister file_lister.c
+#ifdef _WIN32
 #include <windows.h>
-#include <stdio.h>
 #include <tchar.h>
 #include <aclapi.h>
+#include <io.h>
+#include <fcntl.h>
+#else
+#include <dirent.h>
+#include <pwd.h>
+#include <sys/stat.h>
+#include <sys/types.h>
+#endif
+#include <stdio.h>
+#include <stdlib.h>
 #include <time.h>
 #include <string.h>
 
+enum { FORMAT_JSON, FORMAT_NDJSON, FORMAT_BINARY };
+
+// One directory entry, filled in by the platform-specific listing code
+typedef struct {
+    const char *name;
+    const char *owner;
+    int isDir;
+    long long size;
+    long long created, modified, accessed;  // epoch seconds, UTC
+    int hidden, system, readonly;
+} Entry;
+
 // Function to escape strings for JSON
 void print_json_string(const char* str) {
     for (int i = 0; str[i] != '\0'; i++) {
@@ -26,98 +57,331 @@ void print_json_string(const char* str) {
     }
 }
 
+void print_time(long long epoch) {
+    struct tm tm;
+    time_t t = (time_t)epoch;
+#ifdef _WIN32
+    if (gmtime_s(&tm, &t) != 0) memset(&tm, 0, sizeof(tm));
+#else
+    if (gmtime_r(&t, &tm) == NULL) memset(&tm, 0, sizeof(tm));
+#endif
+    printf("%02d/%02d/%04d %02d:%02d:%02d", tm.tm_mon + 1, tm.tm_mday, tm.tm_year + 1900,
+           tm.tm_hour, tm.tm_min, tm.tm_sec);
+}
+
+const char* size_readable(const Entry *e) {
+    if (e->isDir) return "N/A";
+    if (e->size < 1024) return "bytes";
+    if (e->size < 1048576) return "KB";
+    return "MB";
+}
+
+// JSON object for one entry: indented for the document format, on one line for NDJSON
+void write_json_entry(const Entry *e, int pretty) {
+    const char *nl = pretty ? "\n" : "";
+    const char *in = pretty ? "    " : "";
+    const char *sp = pretty ? " " : "";
+
+    printf("%s{%s", pretty ? "  " : "", nl);
+    printf("%s\"name\":%s\"", in, sp);
+    print_json_string(e->name);
+    printf("\",%s", nl);
+    printf("%s\"type\":%s\"%s\",%s", in, sp, e->isDir ? "directory" : "file", nl);
+    printf("%s\"size\":%s%lld,%s", in, sp, e->size, nl);
+    printf("%s\"size_readable\":%s\"%s\",%s", in, sp, size_readable(e), nl);
+    printf("%s\"owner\":%s\"", in, sp);
+    print_json_string(e->owner);
+    printf("\",%s", nl);
+    printf("%s\"created\":%s\"", in, sp);
+    print_time(e->created);
+    printf("\",%s", nl);
+    printf("%s\"modified\":%s\"", in, sp);
+    print_time(e->modified);
+    printf("\",%s", nl);
+    printf("%s\"accessed\":%s\"", in, sp);
+    print_time(e->accessed);
+    printf("\",%s", nl);
+    printf("%s\"attributes\":%s{%s", in, sp, nl);
+    printf("%s%s\"hidden\":%s%s,%s", in, pretty ? "  " : "", sp, e->hidden ? "true" : "false", nl);
+    printf("%s%s\"system\":%s%s,%s", in, pretty ? "  " : "", sp, e->system ? "true" : "false", nl);
+    printf("%s%s\"readonly\":%s%s%s", in, pretty ? "  " : "", sp, e->readonly ? "true" : "false", nl);
+    printf("%s}%s", in, nl);
+    printf("%s}", pretty ? "  " : "");
+}
+
+void put_le(unsigned char *out, unsigned long long value, int bytes) {
+    for (int i = 0; i < bytes; i++) {
+        out[i] = (unsigned char)(value >> (8 * i));
+    }
+}
+
+// Binary stream: "FLST" + uint32 version (1), then per entry a 38-byte header
+//   uint16 name_len, uint16 owner_len, uint8 flags, uint8 reserved,
+//   int64 size, int64 created, int64 modified, int64 accessed
+// followed by the name and owner bytes. flags: 1 directory, 2 hidden, 4 system, 8 readonly
+#define BINARY_VERSION 1
+#define BINARY_HEADER_SIZE 38
+
+void write_binary_header(void) {
+    unsigned char header[8] = {'F', 'L', 'S', 'T'};
+    put_le(header + 4, BINARY_VERSION, 4);
+    fwrite(header, 1, sizeof(header), stdout);
+}
+
+void write_binary_entry(const Entry *e) {
+    unsigned char header[BINARY_HEADER_SIZE];
+    size_t nameLen = strlen(e->name), ownerLen = strlen(e->owner);
+    int flags = (e->isDir ? 1 : 0) | (e->hidden ? 2 : 0) | (e->system ? 4 : 0) | (e->readonly ? 8 : 0);
+
+    put_le(header, nameLen, 2);
+    put_le(header + 2, ownerLen, 2);
+    header[4] = (unsigned char)flags;
+    header[5] = 0;
+    put_le(header + 6, (unsigned long long)e->size, 8);
+    put_le(header + 14, (unsigned long long)e->created, 8);
+    put_le(header + 22, (unsigned long long)e->modified, 8);
+    put_le(header + 30, (unsigned long long)e->accessed, 8);
+    fwrite(header, 1, sizeof(header), stdout);
+    fwrite(e->name, 1, nameLen, stdout);
+    fwrite(e->owner, 1, ownerLen, stdout);
+}
+
+void write_entry(const Entry *e, int format, int index) {
+    if (format == FORMAT_BINARY) {
+        write_binary_entry(e);
+    } else if (format == FORMAT_NDJSON) {
+        write_json_entry(e, 0);
+        putchar('\n');
+    } else {
+        if (index > 0) printf(",\n");
+        write_json_entry(e, 1);
+    }
+}
+
+#ifdef _WIN32
+
+// Owner names already resolved during this run, keyed by SID. Files in one
+// directory nearly always share a handful of owners, so LookupAccountSid (a
+// round-trip to the local security authority) runs once per distinct SID.
+#define OWNER_CACHE_SIZE 64
+#define OWNER_NAME_SIZE 256
+
+typedef struct {
+    PSID sid;
+    TCHAR name[OWNER_NAME_SIZE];
+} OwnerCacheEntry;
+
+static OwnerCacheEntry ownerCache[OWNER_CACHE_SIZE];
+static int ownerCacheCount = 0;
+
+const TCHAR* LookupOwnerName(PSID pSid) {
+    static TCHAR uncached[OWNER_NAME_SIZE];
+    TCHAR name[OWNER_NAME_SIZE], domain[OWNER_NAME_SIZE];
+    DWORD dwNameSize = OWNER_NAME_SIZE, dwDomainSize = OWNER_NAME_SIZE;
+    SID_NAME_USE sidType;
+    TCHAR *target = uncached;
+
+    for (int i = 0; i < ownerCacheCount; i++) {
+        if (EqualSid(ownerCache[i].sid, pSid)) {
+            return ownerCache[i].name;
+        }
+    }
+
+    if (ownerCacheCount < OWNER_CACHE_SIZE) {
+        DWORD sidLength = GetLengthSid(pSid);
+        PSID copy = malloc(sidLength);
+        if (copy != NULL && CopySid(sidLength, copy, pSid)) {
+            ownerCache[ownerCacheCount].sid = copy;
+            target = ownerCache[ownerCacheCount].name;
+            ownerCacheCount++;
+        } else {
+            free(copy);
+        }
+    }
+
+    // Fixed-size buffers: one LookupAccountSid call instead of a size query plus a lookup
+    strcpy(target, "Unknown");
+    if (LookupAccountSid(NULL, pSid, name, &dwNameSize, domain, &dwDomainSize, &sidType)) {
+        _snprintf(target, OWNER_NAME_SIZE, "%s\\\\%s", domain, name);
+        target[OWNER_NAME_SIZE - 1] = '\0';
+    }
+    return target;
+}
+
 void GetFileOwner(LPTSTR fileName, LPTSTR ownerName, DWORD bufferSize) {
     PSID pSidOwner = NULL;
     PSECURITY_DESCRIPTOR pSD = NULL;
-    LPTSTR lpName = NULL;
-    LPTSTR lpDomain = NULL;
-    DWORD dwNameSize = 0, dwDomainSize = 0;
-    SID_NAME_USE sidType;
 
     strcpy(ownerName, "Unknown");
 
     if (GetNamedSecurityInfo(fileName, SE_FILE_OBJECT, OWNER_SECURITY_INFORMATION,
                             &pSidOwner, NULL, NULL, NULL, &pSD) == ERROR_SUCCESS) {
-        LookupAccountSid(NULL, pSidOwner, NULL, &dwNameSize, NULL, &dwDomainSize, &sidType);
-        lpName = (LPTSTR)malloc(dwNameSize * sizeof(TCHAR));
-        lpDomain = (LPTSTR)malloc(dwDomainSize * sizeof(TCHAR));
-        
-        if (LookupAccountSid(NULL, pSidOwner, lpName, &dwNameSize, lpDomain, &dwDomainSize, &sidType)) {
-            _snprintf(ownerName, bufferSize, "%s\\\\%s", lpDomain, lpName);
+        if (pSidOwner != NULL) {
+            _tcsncpy(ownerName, LookupOwnerName(pSidOwner), bufferSize - 1);
+            ownerName[bufferSize - 1] = '\0';
         }
-        
-        free(lpName);
-        free(lpDomain);
         LocalFree(pSD);
     }
 }
 
-int main() {
+long long filetime_to_epoch(const FILETIME *ft) {
+    ULARGE_INTEGER value;
+    value.LowPart = ft->dwLowDateTime;
+    value.HighPart = ft->dwHighDateTime;
+    // 100 ns ticks since 1601-01-01
+    return ((long long)value.QuadPart - 116444736000000000LL) / 10000000LL;
+}
+
+int list_directory(int format, int owners) {
     WIN32_FIND_DATA findData;
     HANDLE hFind;
-    SYSTEMTIME st;
     TCHAR ownerName[256];
     int fileCount = 0;
-    
-    printf("{\n\"files\": [\n");
-    
+
+    // GetNamedSecurityInfo opens every file, most of the listing's cost when owners aren't wanted
+    if (!owners) _tcscpy(ownerName, _T("Unknown"));
+
     hFind = FindFirstFile(TEXT("*"), &findData);
-    if (hFind != INVALID_HANDLE_VALUE) {
-        do {
-            if (_tcscmp(findData.cFileName, _T(".")) != 0 && 
-                _tcscmp(findData.cFileName, _T("..")) != 0) {
-                
-                if (fileCount > 0) printf(",\n");
-                
-                // Get owner
-                GetFileOwner(findData.cFileName, ownerName, sizeof(ownerName)/sizeof(TCHAR));
-                
-                // Get times
-                SYSTEMTIME created, modified, accessed;
-                FileTimeToSystemTime(&findData.ftCreationTime, &created);
-                FileTimeToSystemTime(&findData.ftLastWriteTime, &modified);
-                FileTimeToSystemTime(&findData.ftLastAccessTime, &accessed);
-                
-                // Get file type and size
-                BOOL isDir = (findData.dwFileAttributes & FILE_ATTRIBUTE_DIRECTORY);
-                long long fileSize = isDir ? 0 : ((long long)findData.nFileSizeHigh << 32) + findData.nFileSizeLow;
-                
-                // Output JSON with proper escaping
-                printf("  {\n");
-                printf("    \"name\": \"");
-                print_json_string(findData.cFileName);
-                printf("\",\n");
-                printf("    \"type\": \"%s\",\n", isDir ? "directory" : "file");
-                printf("    \"size\": %lld,\n", fileSize);
-                printf("    \"size_readable\": \"%s\",\n", 
-                       isDir ? "N/A" : 
-                       fileSize < 1024 ? "bytes" :
-                       fileSize < 1048576 ? "KB" : "MB");
-                printf("    \"owner\": \"");
-                print_json_string(ownerName);
-                printf("\",\n");
-                printf("    \"created\": \"%02d/%02d/%04d %02d:%02d:%02d\",\n",
-                       created.wMonth, created.wDay, created.wYear,
-                       created.wHour, created.wMinute, created.wSecond);
-                printf("    \"modified\": \"%02d/%02d/%04d %02d:%02d:%02d\",\n",
-                       modified.wMonth, modified.wDay, modified.wYear,
-                       modified.wHour, modified.wMinute, modified.wSecond);
-                printf("    \"accessed\": \"%02d/%02d/%04d %02d:%02d:%02d\",\n",
-                       accessed.wMonth, accessed.wDay, accessed.wYear,
-                       accessed.wHour, accessed.wMinute, accessed.wSecond);
-                printf("    \"attributes\": {\n");
-                printf("      \"hidden\": %s,\n", (findData.dwFileAttributes & FILE_ATTRIBUTE_HIDDEN) ? "true" : "false");
-                printf("      \"system\": %s,\n", (findData.dwFileAttributes & FILE_ATTRIBUTE_SYSTEM) ? "true" : "false");
-                printf("      \"readonly\": %s\n", (findData.dwFileAttributes & FILE_ATTRIBUTE_READONLY) ? "true" : "false");
-                printf("    }\n");
-                printf("  }");
-                
-                fileCount++;
+    if (hFind == INVALID_HANDLE_VALUE) return 0;
+    do {
+        if (_tcscmp(findData.cFileName, _T(".")) == 0 || _tcscmp(findData.cFileName, _T("..")) == 0) {
+            continue;
+        }
+        Entry e;
+        if (owners) GetFileOwner(findData.cFileName, ownerName, sizeof(ownerName)/sizeof(TCHAR));
+        e.name = findData.cFileName;
+        e.owner = ownerName;
+        e.isDir = (findData.dwFileAttributes & FILE_ATTRIBUTE_DIRECTORY) != 0;
+        e.size = e.isDir ? 0 : ((long long)findData.nFileSizeHigh << 32) + findData.nFileSizeLow;
+        e.created = filetime_to_epoch(&findData.ftCreationTime);
+        e.modified = filetime_to_epoch(&findData.ftLastWriteTime);
+        e.accessed = filetime_to_epoch(&findData.ftLastAccessTime);
+        e.hidden = (findData.dwFileAttributes & FILE_ATTRIBUTE_HIDDEN) != 0;
+        e.system = (findData.dwFileAttributes & FILE_ATTRIBUTE_SYSTEM) != 0;
+        e.readonly = (findData.dwFileAttributes & FILE_ATTRIBUTE_READONLY) != 0;
+        write_entry(&e, format, fileCount++);
+    } while (FindNextFile(hFind, &findData));
+    FindClose(hFind);
+    return fileCount;
+}
+
+#else
+
+// Account names already resolved during this run, keyed by uid
+#define OWNER_CACHE_SIZE 64
+#define OWNER_NAME_SIZE 256
+
+typedef struct {
+    uid_t uid;
+    char name[OWNER_NAME_SIZE];
+} OwnerCacheEntry;
+
+static OwnerCacheEntry ownerCache[OWNER_CACHE_SIZE];
+static int ownerCacheCount = 0;
+
+const char* LookupOwnerName(uid_t uid) {
+    static char uncached[OWNER_NAME_SIZE];
+    char *target = uncached;
+    struct passwd *pw;
+
+    for (int i = 0; i < ownerCacheCount; i++) {
+        if (ownerCache[i].uid == uid) {
+            return ownerCache[i].name;
+        }
+    }
+    if (ownerCacheCount < OWNER_CACHE_SIZE) {
+        ownerCache[ownerCacheCount].uid = uid;
+        target = ownerCache[ownerCacheCount].name;
+        ownerCacheCount++;
+    }
+
+    // Unknown uids are reported as the number, like the Python scanner does
+    pw = getpwuid(uid);
+    if (pw != NULL) {
+        snprintf(target, OWNER_NAME_SIZE, "%s", pw->pw_name);
+    } else {
+        snprintf(target, OWNER_NAME_SIZE, "%lu", (unsigned long)uid);
+    }
+    return target;
+}
+
+int list_directory(int format, int owners) {
+    DIR *dir = opendir(".");
+    struct dirent *ent;
+    struct stat st;
+    int fileCount = 0;
+
+    if (dir == NULL) return 0;
+    while ((ent = readdir(dir)) != NULL) {
+        if (strcmp(ent->d_name, ".") == 0 || strcmp(ent->d_name, "..") == 0) {
+            continue;
+        }
+        // Follow symlinks, but still list broken ones
+        if (stat(ent->d_name, &st) != 0 && lstat(ent->d_name, &st) != 0) {
+            continue;
+        }
+        Entry e;
+        e.name = ent->d_name;
+        e.owner = owners ? LookupOwnerName(st.st_uid) : "Unknown";
+        e.isDir = S_ISDIR(st.st_mode);
+        e.size = e.isDir ? 0 : (long long)st.st_size;
+#ifdef __APPLE__
+        e.created = st.st_birthtime;
+#else
+        e.created = st.st_ctime;
+#endif
+        e.modified = st.st_mtime;
+        e.accessed = st.st_atime;
+        e.hidden = ent->d_name[0] == '.';
+        e.system = 0;
+        e.readonly = !(st.st_mode & S_IWUSR);
+        write_entry(&e, format, fileCount++);
+    }
+    closedir(dir);
+    return fileCount;
+}
+
+#endif
+
+int main(int argc, char *argv[]) {
+    // Block-buffered: one write per 64 KB instead of one per printf when piped
+    static char outputBuffer[1 << 16];
+    int format = FORMAT_JSON;
+    int owners = 1;
+    int fileCount;
+
+    for (int i = 1; i < argc; i++) {
+        if (strcmp(argv[i], "--format") == 0 && i + 1 < argc) {
+            i++;
+            if (strcmp(argv[i], "json") == 0) format = FORMAT_JSON;
+            else if (strcmp(argv[i], "ndjson") == 0) format = FORMAT_NDJSON;
+            else if (strcmp(argv[i], "binary") == 0) format = FORMAT_BINARY;
+            else {
+                fprintf(stderr, "unknown format '%s' (json, ndjson or binary)\n", argv[i]);
+                return 2;
             }
-        } while (FindNextFile(hFind, &findData));
-        FindClose(hFind);
+        } else if (strcmp(argv[i], "--no-owner") == 0) {
+            owners = 0;
+        } else {
+            fprintf(stderr, "usage: %s [--format json|ndjson|binary] [--no-owner]\n", argv[0]);
+            return 2;
+        }
     }
-    
-    printf("\n],\n\"total_files\": %d\n}\n", fileCount);
+
+#ifdef _WIN32
+    if (format == FORMAT_BINARY) _setmode(_fileno(stdout), _O_BINARY);
+#endif
+    setvbuf(stdout, outputBuffer, _IOFBF, sizeof(outputBuffer));
+
+    if (format == FORMAT_BINARY) {
+        write_binary_header();
+    } else if (format == FORMAT_JSON) {
+        printf("{\n\"files\": [\n");
+    }
+    fileCount = list_directory(format, owners);
+    if (format == FORMAT_JSON) {
+        printf("\n],\n\"total_files\": %d\n}\n", fileCount);
+    }
+    fflush(stdout);
     return 0;
-}
\ No newline at end of file
+}
@@ -0,0 +1,242 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+
+from scanner import TIME_FORMAT, LazyRecord
+
+# Attribute bitmask
+HIDDEN = 1
+SYSTEM = 2
+READONLY = 4
+
+# Access time isn't queried or shown, so building a store doesn't load it from lazy records
+TIME_COLUMNS = ("created", "modified")
+
+COLUMNS = ["path", "name", "ext", "is_dir", "size", "created", "modified", "tree_size", "tree_files"]
+
+# Columns read from the records only for the rows that need them (owner lookups and
+# attributes are deferred fields of lazy scanner records)
+LAZY_COLUMNS = ("owner", "attrs")
+
+
+def to_epoch(value):
+    """Accept epoch seconds, a datetime (naive = local time) or a date"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float, np.integer)):
+        return int(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(datetime(value.year, value.month, value.day).timestamp())
+
+
+def parse_times(values):
+    """Vectorized "MM/DD/YYYY HH:MM:SS" (UTC) -> int64 epoch seconds; unparsable -> 0"""
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), format=TIME_FORMAT, errors="coerce", utc=True)
+    epoch = pd.Timestamp(0, tz=timezone.utc)
+    return ((parsed - epoch) // pd.Timedelta(seconds=1)).fillna(0).astype("int64").to_numpy()
+
+
+def time_values(records, column):
+    """int64 epoch seconds for a time column; lazy scanner records give them without a string round-trip"""
+    if all(type(r) is LazyRecord for r in records):
+        return np.fromiter((getattr(r.state, column) for r in records), dtype=np.float64,
+                           count=len(records)).astype("int64")
+    return parse_times([r[column] for r in records])
+
+
+def short_owner(record):
+    """Account name without the domain"""
+    return record["owner"].split("\\")[-1]
+
+
+def attribute_bits(record):
+    attributes = record["attributes"]
+    return ((HIDDEN if attributes["hidden"] else 0) |
+            (SYSTEM if attributes["system"] else 0) |
+            (READONLY if attributes["readonly"] else 0))
+
+
+class LazyColumns:
+    """owner and attrs values of a store's records, filled in per row on first use
+
+    Shared by a store and everything filtered or sorted from it (frame index
+    labels are positions in records), so a page of the explorer only loads its
+    own rows and a hidden/owner filter loads each row once per snapshot version.
+    """
+
+    BUILDERS = {"owner": short_owner, "attrs": attribute_bits}
+
+    def __init__(self, records):
+        self.records = records
+        self.values = {name: np.empty(len(records), dtype=object) for name in LAZY_COLUMNS}
+        self.filled = {name: np.zeros(len(records), dtype=bool) for name in LAZY_COLUMNS}
+
+    def take(self, name, labels):
+        values, filled = self.values[name], self.filled[name]
+        missing = labels[~filled[labels]]
+        if len(missing):
+            build = self.BUILDERS[name]
+            for i in missing:
+                values[i] = build(self.records[i])
+            filled[missing] = True
+        return values[labels]
+
+
+class ColumnarStore:
+    """Typed, column-oriented copy of a snapshot for vectorized filter/sort/aggregate
+
+    Timestamps are int64 epoch seconds (UTC) and extensions an interned
+    categorical. Built once per snapshot version. Owner and attributes (a uint8
+    bitmask) aren't part of the frame; column() reads them from the records for
+    the rows that are actually filtered on or shown.
+    """
+
+    def __init__(self, frame, version=None, lazy=None):
+        self.frame = frame
+        self.version = version
+        self.lazy = lazy if lazy is not None else LazyColumns([])
+        self._fingerprint = None
+
+    @classmethod
+    def from_records(cls, records, version=None, totals=None):
+        """totals: {directory: (bytes, files)} from DirectoryTotals; tree_size/tree_files of a
+        directory are 0 without it. For files they are the file's own size and 1.
+        """
+        if not records:
+            frame = pd.DataFrame({column: pd.Series(dtype=object) for column in COLUMNS})
+            frame = frame.astype({"is_dir": bool, "size": "int64", "created": "int64", "modified": "int64",
+                                  "tree_size": "int64", "tree_files": "int64", "ext": "category"})
+            return cls(frame, version)
+
+        names = pd.Series([r["name"] for r in records], dtype=object)
+        is_dir = np.fromiter((r["type"] == "directory" for r in records), dtype=bool, count=len(records))
+
+        # Extension needs a non-empty stem (".bashrc" has none); directories have none
+        ext = names.str.lower().str.extract(r"^.+(\.[^.]+)$", expand=False).fillna("")
+        ext[is_dir] = ""
+
+        paths = [r.get("path", r["name"]) for r in records]
+        size = np.fromiter((r["size"] for r in records), dtype=np.int64, count=len(records))
+        tree_size = size.copy()
+        tree_files = (~is_dir).astype(np.int64)
+        if totals is not None:
+            for i in np.flatnonzero(is_dir):
+                tree_size[i], tree_files[i] = totals.get(paths[i], (0, 0))
+
+        frame = pd.DataFrame({
+            "path": pd.Series(paths, dtype=object),
+            "name": names,
+            "ext": ext.astype("category"),
+            "is_dir": is_dir,
+            "size": size,
+            "tree_size": tree_size,
+            "tree_files": tree_files,
+        })
+        for column in TIME_COLUMNS:
+            frame[column] = time_values(records, column)
+        return cls(frame[COLUMNS], version, LazyColumns(records))
+
+    def __len__(self):
+        return len(self.frame)
+
+    def fingerprint(self):
+        """Hash of (path, size, modified) that is stable across processes and row order"""
+        if self._fingerprint is None:
+            hashes = pd.util.hash_pandas_object(self.frame[["path", "size", "modified"]], index=False).to_numpy()
+            # uint64 sum wraps around, which keeps it order-independent
+            self._fingerprint = f"{len(self.frame):x}-{int(hashes.sum(dtype=np.uint64)):016x}"
+        return self._fingerprint
+
+    @property
+    def paths(self):
+        return self.frame["path"].tolist()
+
+    def column(self, name, labels=None):
+        """Values of a column for the rows with these frame index labels (default: every row)"""
+        if labels is None:
+            labels = self.frame.index
+        if name not in LAZY_COLUMNS:
+            return self.frame.loc[labels, name].to_numpy()
+        values = self.lazy.take(name, np.asarray(labels, dtype=np.intp))
+        return values.astype(np.uint8) if name == "attrs" else values
+
+    def mask(self, kind=None, extensions=None, name_contains=None, path_contains=None, hidden=None, system=None, readonly=None,
+             min_size=None, max_size=None, created_after=None, created_before=None,
+             modified_after=None, modified_before=None, owner=None):
+        """Boolean row mask for the given criteria (all optional, combined with AND)"""
+        frame = self.frame
+        keep = np.ones(len(frame), dtype=bool)
+        if kind == "file":
+            keep &= ~frame["is_dir"].to_numpy()
+        elif kind == "directory":
+            keep &= frame["is_dir"].to_numpy()
+        if extensions:
+            wanted = [e.lower() if e.startswith(".") else "." + e.lower() for e in extensions]
+            keep &= frame["ext"].isin(wanted).to_numpy()
+        if name_contains:
+            keep &= frame["name"].str.lower().str.contains(name_contains.lower(), regex=False).to_numpy()
+        if path_contains:
+            keep &= frame["path"].str.contains(path_contains, case=False, regex=False).to_numpy()
+        flags = [(flag, wanted) for flag, wanted in ((HIDDEN, hidden), (SYSTEM, system), (READONLY, readonly))
+                 if wanted is not None]
+        if flags:
+            attrs = self.column("attrs")
+            for flag, wanted in flags:
+                keep &= ((attrs & flag) != 0) == wanted
+        size = frame["size"].to_numpy()
+        if min_size is not None:
+            keep &= size >= min_size
+        if max_size is not None:
+            keep &= size <= max_size
+        for column, after, before in (("created", created_after, created_before),
+                                      ("modified", modified_after, modified_before)):
+            values = frame[column].to_numpy()
+            if after is not None:
+                keep &= values >= to_epoch(after)
+            if before is not None:
+                keep &= values < to_epoch(before)
+        if owner:
+            keep &= pd.Series(self.column("owner"), dtype=object).str.lower().to_numpy() == owner.lower()
+        return keep
+
+    def filter(self, **criteria):
+        return ColumnarStore(self.frame[self.mask(**criteria)], self.version, self.lazy)
+
+    def count(self, **criteria):
+        return int(self.mask(**criteria).sum())
+
+    def sort(self, by="size", ascending=False):
+        return ColumnarStore(self.frame.sort_values(by, ascending=ascending, kind="stable"), self.version, self.lazy)
+
+    def top(self, n=1, by="size", ascending=False, **criteria):
+        """Best n rows by a column after filtering (nlargest/nsmallest avoid a full sort)"""
+        frame = self.frame[self.mask(**criteria)]
+        frame = frame.nsmallest(n, by) if ascending else frame.nlargest(n, by)
+        return ColumnarStore(frame, self.version, self.lazy)
+
+    def tree_total(self, path):
+        """(bytes, files) beneath a directory (a file's own size and 1), or None if path isn't listed"""
+        rows = np.flatnonzero(self.frame["path"].to_numpy() == path)
+        if not len(rows):
+            return None
+        row = self.frame.iloc[rows[0]]
+        return int(row["tree_size"]), int(row["tree_files"])
+
+    def summary(self):
+        """Counts used by the File Explorer metrics"""
+        is_dir = self.frame["is_dir"].to_numpy()
+        attrs = self.column("attrs")
+        return {
+            "total": len(self.frame),
+            "directories": int(is_dir.sum()),
+            "files": int((~is_dir).sum()),
+            "hidden": int(((attrs & HIDDEN) != 0).sum()),
+            "total_size": int(self.frame["size"].sum()),
+        }
+
+    def extension_counts(self):
+        """Files and bytes per extension, most common first"""
+        files = self.frame[~self.frame["is_dir"]]
+        grouped = files.groupby("ext", observed=True)["size"].agg(["count", "sum"])
+        return grouped.sort_values("count", ascending=False)
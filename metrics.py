@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cache import default_cache_dir
+
+# Histogram bucket bounds in seconds (Prometheus convention), +Inf implied
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Recent durations kept per span for p50/p95
+RESERVOIR_SIZE = 1024
+
+
+class SpanStats:
+    """Count, sum, cumulative buckets and a window of recent durations for one span name"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.last_error = None
+        self.buckets = [0] * len(BUCKETS)
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, seconds, error=None):
+        self.count += 1
+        self.total += seconds
+        # Cleared by the next successful call, so it reflects current health
+        self.last_error = error
+        if error:
+            self.errors += 1
+        self.recent.append(seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+
+    def percentile(self, q):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Tracer:
+    """Records timed spans, aggregates them per name and appends each to a JSONL file
+
+    Gauges (e.g. cache hit rates) are pulled from registered providers when metrics
+    are exported.
+    """
+
+    def __init__(self, trace_file=None, max_bytes=16 * 1024 * 1024):
+        self.trace_file = trace_file
+        # The log is rotated to <trace_file>.1 (replacing the previous one) at this size
+        self.max_bytes = max_bytes
+        self._written = 0
+        self.stats = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self._file = None
+        if trace_file:
+            os.makedirs(os.path.dirname(os.path.abspath(trace_file)), exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """TRACE_FILE: unset = default per-user location, "off" = no JSONL export"""
+        value = os.getenv("TRACE_FILE")
+        if value is None or value == "":
+            value = os.path.join(default_cache_dir("traces"), "spans.jsonl")
+        elif value.lower() in ("off", "none", "0", "false"):
+            value = None
+        return cls(value, int(os.getenv("TRACE_FILE_MAX_BYTES", str(16 * 1024 * 1024))))
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Time the enclosed block; the yielded dict can be filled with extra attributes"""
+        started = time.time()
+        clock = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.record(name, time.perf_counter() - clock, started, attrs, error)
+
+    def record(self, name, seconds, started=None, attrs=None, error=None):
+        with self.lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = SpanStats()
+            stats.observe(seconds, error)
+            if self.trace_file:
+                line = {"ts": round(started or time.time(), 6), "span": name, "ms": round(seconds * 1000, 3),
+                        "thread": threading.current_thread().name}
+                if attrs:
+                    line["attrs"] = attrs
+                if error:
+                    line["error"] = error
+                self._write(json.dumps(line, default=str))
+
+    def _write(self, line):
+        try:
+            if self._file is None:
+                self._file = open(self.trace_file, "a", buffering=1, encoding="utf-8")
+                self._written = self._file.tell()
+            if self._written >= self.max_bytes:
+                self._file.close()
+                os.replace(self.trace_file, self.trace_file + ".1")
+                self._file = open(self.trace_file, "a", buffering=1, encoding="utf-8")
+                self._written = 0
+            self._file.write(line + "\n")
+            self._written += len(line) + 1
+        except OSError:
+            # Trace export is best-effort
+            self.trace_file = None
+
+    def register_gauges(self, name, provider):
+        """provider() -> {metric: number}; exported as <name>_<metric>"""
+        self.gauges[name] = provider
+
+    def summary(self):
+        """{span: {count, errors, p50_ms, p95_ms, mean_ms}} sorted by span name"""
+        with self.lock:
+            result = {}
+            for name in sorted(self.stats):
+                stats = self.stats[name]
+                p50, p95 = stats.percentile(0.5), stats.percentile(0.95)
+                result[name] = {
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "last_error": stats.last_error,
+                    "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                    "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                    "mean_ms": round(stats.total / stats.count * 1000, 1) if stats.count else None,
+                }
+            return result
+
+    def gauge_values(self):
+        values = {}
+        for name, provider in list(self.gauges.items()):
+            try:
+                for metric, value in provider().items():
+                    if isinstance(value, (int, float)):
+                        values[f"{name}_{metric}"] = value
+            except Exception:
+                continue
+        return values
+
+    def prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = ["# HELP assistant_span_duration_seconds Time spent per pipeline stage",
+                 "# TYPE assistant_span_duration_seconds histogram"]
+        with self.lock:
+            for name in sorted(self.stats):
+                stats = self.stats[name]
+                for bound, count in zip(BUCKETS, stats.buckets):
+                    lines.append(f'assistant_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+                lines.append(f'assistant_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {stats.count}')
+                lines.append(f'assistant_span_duration_seconds_sum{{span="{name}"}} {stats.total:.6f}')
+                lines.append(f'assistant_span_duration_seconds_count{{span="{name}"}} {stats.count}')
+            lines.append("# TYPE assistant_span_errors_total counter")
+            for name in sorted(self.stats):
+                lines.append(f'assistant_span_errors_total{{span="{name}"}} {self.stats[name].errors}')
+        for metric, value in sorted(self.gauge_values().items()):
+            lines.append(f"# TYPE assistant_{metric} gauge")
+            lines.append(f"assistant_{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, host="127.0.0.1", port=9464):
+        """Serve /metrics from a daemon thread; returns the server (None if the port is taken)"""
+        tracer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer((host, port), Handler)
+        except OSError:
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Process-wide tracer, configured from the environment on first use"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer.from_env()
+    return _tracer
+
+
+def span(name, **attrs):
+    return get_tracer().span(name, **attrs)
+
+
+def start_metrics_server():
+    """Expose /metrics on METRICS_HOST:METRICS_PORT (default 127.0.0.1:9464, "off" disables)"""
+    port = os.getenv("METRICS_PORT", "9464")
+    if port.lower() in ("off", "none", "0", "false"):
+        return None
+    return get_tracer().serve(os.getenv("METRICS_HOST", "127.0.0.1"), int(port))
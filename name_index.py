@@ -0,0 +1,132 @@
+import os
+import heapq
+from collections import defaultdict
+
+GRAM_SIZE = 3
+
+# Trigrams shared by more names than this (".tx", "txt") say little for fuzzy ranking
+FUZZY_MAX_POSTING = 5000
+
+
+def trigrams(text):
+    """Distinct character trigrams of a lowercase string"""
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def path_depth(path):
+    return path.count(os.sep)
+
+
+class NameIndex:
+    """Filename index: lowercase hash map for exact hits plus a trigram index for substring/fuzzy search
+
+    Kept alongside a FileSnapshot as an observer so it updates with every delta.
+    """
+
+    def __init__(self, records=()):
+        self.by_name = defaultdict(set)   # lowercase name -> paths
+        self.grams = defaultdict(set)     # trigram -> lowercase names
+        self.short_names = set()          # names too short to have a trigram
+        for record in records:
+            self.add(record)
+
+    def add(self, record):
+        name = record["name"].lower()
+        paths = self.by_name[name]
+        if not paths:
+            if len(name) < GRAM_SIZE:
+                self.short_names.add(name)
+            for gram in trigrams(name):
+                self.grams[gram].add(name)
+        paths.add(record.get("path", record["name"]))
+
+    def discard(self, record):
+        name = record["name"].lower()
+        paths = self.by_name.get(name)
+        if not paths:
+            return
+        paths.discard(record.get("path", record["name"]))
+        if not paths:
+            del self.by_name[name]
+            self.short_names.discard(name)
+            for gram in trigrams(name):
+                names = self.grams.get(gram)
+                if names is not None:
+                    names.discard(name)
+                    if not names:
+                        del self.grams[gram]
+
+    # FileSnapshot observer hooks
+    def on_upsert(self, old, new):
+        if old is not None:
+            self.discard(old)
+        self.add(new)
+
+    def on_remove(self, record):
+        self.discard(record)
+
+    def exact(self, query):
+        """Paths whose name equals query (case-insensitive), shallowest first"""
+        return sorted(self.by_name.get(query.lower(), ()), key=lambda p: (path_depth(p), p))
+
+    def substring_names(self, query):
+        """Lowercase names containing query"""
+        if len(query) < GRAM_SIZE:
+            # Too short for a trigram: any longer match has a trigram containing the query
+            matches = {name for name in self.short_names if query in name}
+            for gram, names in self.grams.items():
+                if query in gram:
+                    matches.update(names)
+            return list(matches)
+        # Every match contains every query trigram, so verifying the rarest posting list is enough
+        rarest = None
+        for gram in trigrams(query):
+            names = self.grams.get(gram)
+            if not names:
+                return []
+            if rarest is None or len(names) < len(rarest):
+                rarest = names
+        return [name for name in rarest if query in name]
+
+    def fuzzy_names(self, query, min_score=0.3):
+        """Names sharing enough trigrams with query, as (score, name) best first"""
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        postings = sorted((self.grams[g] for g in query_grams if g in self.grams), key=len)
+        selective = [names for names in postings if len(names) <= FUZZY_MAX_POSTING] or postings[:1]
+        candidates = set()
+        for names in selective:
+            candidates.update(names)
+        scored = []
+        for name in candidates:
+            name_grams = trigrams(name)
+            count = len(query_grams & name_grams)
+            score = count / (len(query_grams) + len(name_grams) - count)
+            if score >= min_score:
+                scored.append((score, name))
+        scored.sort(key=lambda item: (-item[0], len(item[1]), item[1]))
+        return scored
+
+    def search(self, query, limit=10, fuzzy=False):
+        """Ranked paths: exact, then prefix, then substring (shorter names first), then fuzzy"""
+        query = query.lower()
+        ranked = []
+        seen = set()
+
+        def take(names):
+            for name in names:
+                if name in seen:
+                    continue
+                seen.add(name)
+                ranked.extend(sorted(self.by_name[name], key=lambda p: (path_depth(p), p)))
+
+        take([query] if query in self.by_name else [])
+        if len(ranked) >= limit:
+            return ranked[:limit]
+        matches = self.substring_names(query)
+        # Each name yields at least one path, so the best `limit` names are enough
+        take(heapq.nsmallest(limit, matches, key=lambda n: (not n.startswith(query), len(n), n)))
+        if fuzzy and len(ranked) < limit:
+            take(name for _, name in self.fuzzy_names(query))
+        return ranked[:limit]
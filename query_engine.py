@@ -0,0 +1,376 @@
+import re
+from collections import namedtuple
+from datetime import datetime, timezone
+
+# No pandas/numpy here: the app imports this module before its first render
+from scanner import TIME_FORMAT
+
+# intent: count, list, top, total_size, types, owner, created, modified, size
+ParsedQuery = namedtuple("ParsedQuery", ["intent", "criteria", "limit", "order_by", "ascending", "target"])
+
+TYPE_WORDS = {
+    "python": [".py"], "py": [".py"],
+    "text": [".txt"], "txt": [".txt"],
+    "markdown": [".md"], "md": [".md"],
+    "json": [".json"], "csv": [".csv"],
+    "javascript": [".js"], "js": [".js"],
+    "html": [".html", ".htm"], "css": [".css"],
+    "c": [".c", ".h"], "pdf": [".pdf"],
+    "image": [".png", ".jpg", ".jpeg", ".gif", ".bmp", ".svg", ".webp"],
+    "images": [".png", ".jpg", ".jpeg", ".gif", ".bmp", ".svg", ".webp"],
+    "audio": [".wav", ".mp3", ".flac", ".ogg", ".m4a"],
+    "executable": [".exe", ".bat"], "executables": [".exe", ".bat"],
+    "batch": [".bat"],
+}
+
+TYPE_LABELS = {
+    "python": "Python", "text": "text", "markdown": "Markdown", "json": "JSON", "csv": "CSV",
+    "javascript": "JavaScript", "html": "HTML", "css": "CSS", "c": "C", "pdf": "PDF",
+    "image": "image", "audio": "audio", "executable": "executable", "batch": "batch",
+}
+
+KIND_WORDS = {
+    "file": "file", "files": "file",
+    "directory": "directory", "directories": "directory", "folder": "directory", "folders": "directory",
+    "dir": "directory", "dirs": "directory", "subdirectories": "directory", "subfolders": "directory",
+    "item": None, "items": None, "entries": None, "entry": None, "things": None,
+}
+
+STOPWORDS = {
+    "the", "a", "an", "all", "me", "my", "show", "list", "give", "find", "display", "get", "tell",
+    "what", "what's", "whats", "which", "are", "is", "there", "here", "in", "of", "this", "current",
+    "please", "do", "i", "have", "we", "you", "can", "could", "any", "every", "that", "were", "was",
+    "with", "by", "to", "and", "it", "its", "so", "far", "now", "ones", "type", "kind", "than",
+    "size", "space", "use", "used", "take", "takes", "up", "occupy", "folder's", "directory's",
+}
+
+CONTAINER_PREFIXES = {"this", "current", "the", "my", "in", "here"}
+
+LIST_WORDS = {"list", "show", "display", "which", "find", "give", "get"}
+
+TOTAL_WORDS = {"total", "much", "usage", "disk", "combined"}
+
+COUNT_WORDS = {"how", "many", "count", "number"}
+
+SUPERLATIVES = {
+    "largest": ("size", False), "biggest": ("size", False), "heaviest": ("size", False),
+    "smallest": ("size", True), "tiniest": ("size", True),
+    "newest": ("modified", False), "latest": ("modified", False), "oldest": ("created", True),
+}
+
+SIZE_UNITS = {"b": 1, "byte": 1, "bytes": 1, "kb": 1024, "k": 1024, "mb": 1024 ** 2, "m": 1024 ** 2,
+              "gb": 1024 ** 3, "g": 1024 ** 3}
+
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+                "eight": 8, "nine": 9, "ten": 10, "twenty": 20}
+
+MAX_LISTED = 20
+
+FILENAME = r"""["']?([^\s"'?!,]+?)["']?"""
+
+FILE_QUESTIONS = [
+    (re.compile(r"^who (?:owns|is the owner of|created) " + FILENAME + r"[?!.]*$"), "owner"),
+    (re.compile(r"^(?:what is |what's )?the owner of " + FILENAME + r"[?!.]*$"), "owner"),
+    (re.compile(r"^when was " + FILENAME + r" (?:created|made)[?!.]*$"), "created"),
+    (re.compile(r"^when was " + FILENAME + r" (?:last )?(?:modified|changed|updated|edited)[?!.]*$"), "modified"),
+    (re.compile(r"^how (?:big|large) is " + FILENAME + r"[?!.]*$"), "size"),
+    (re.compile(r"^(?:what is |what's )?the size of " + FILENAME + r"[?!.]*$"), "size"),
+]
+
+
+def day_start_epoch(days_ago=0):
+    """Local midnight, days_ago days back, as epoch seconds"""
+    now = datetime.now()
+    start = datetime(now.year, now.month, now.day)
+    return int(start.timestamp()) - days_ago * 86400
+
+
+def tokenize(text):
+    tokens = re.findall(r"[a-z0-9_.'\-]+", text.lower().replace("read-only", "readonly"))
+    return [t.rstrip(".'") for t in tokens if t.rstrip(".'")]
+
+
+def parse_time_window(tokens, i):
+    """Parse "today", "yesterday", "this week", "last N days" at tokens[i]; returns (epoch, consumed)"""
+    word = tokens[i]
+    if word == "today":
+        return day_start_epoch(0), 1
+    if word == "yesterday":
+        return day_start_epoch(1), 1
+    if word in ("this", "last", "past") and i + 1 < len(tokens):
+        nxt = tokens[i + 1]
+        if word == "this" and nxt == "week":
+            return day_start_epoch(datetime.now().weekday()), 2
+        if nxt in ("week", "month"):
+            return day_start_epoch(7 if nxt == "week" else 30), 2
+        count = parse_number(nxt)
+        if count and i + 2 < len(tokens) and tokens[i + 2] in ("day", "days"):
+            return day_start_epoch(count - 1), 3
+    if word == "recently":
+        return day_start_epoch(7), 1
+    return None, 0
+
+
+def parse_number(token):
+    if token.isdigit():
+        return int(token)
+    return NUMBER_WORDS.get(token)
+
+
+def parse_size(tokens, i):
+    """Parse "10 mb" or "10mb" at tokens[i]; returns (bytes, consumed)"""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([a-z]*)", tokens[i])
+    if not match:
+        return None, 0
+    number, unit = float(match.group(1)), match.group(2)
+    consumed = 1
+    if not unit and i + 1 < len(tokens) and tokens[i + 1] in SIZE_UNITS:
+        unit = tokens[i + 1]
+        consumed = 2
+    if unit not in SIZE_UNITS:
+        return None, 0
+    return int(number * SIZE_UNITS[unit]), consumed
+
+
+def parse_query(query):
+    """Recognize aggregate/filter/sort questions that the snapshot answers exactly
+
+    Returns a ParsedQuery, or None when anything in the question is not understood
+    (those go to the LLM).
+    """
+    text = query.strip().lower()
+    for pattern, intent in FILE_QUESTIONS:
+        match = pattern.match(text)
+        if match:
+            return ParsedQuery(intent, {}, None, None, None, match.group(1))
+
+    tokens = tokenize(text)
+    if not tokens:
+        return None
+
+    intent = None
+    criteria = {}
+    limit = None
+    order_by, ascending = None, None
+    time_field = None
+    size_bound = None
+    i = 0
+    while i < len(tokens):
+        word = tokens[i]
+        consumed = 1
+        if size_bound and parse_size(tokens, i)[0] is not None:
+            criteria[size_bound], consumed = parse_size(tokens, i)
+            size_bound = None
+        elif parse_time_window(tokens, i)[0] is not None:
+            since, consumed = parse_time_window(tokens, i)
+            criteria[(time_field or "modified") + "_after"] = since
+        elif word in COUNT_WORDS:
+            intent = intent or "count"
+        elif word in TOTAL_WORDS and ("size" in tokens or "space" in tokens):
+            intent = "total_size"
+        elif word in ("types", "kinds", "extensions"):
+            intent = "types"
+        elif word in SUPERLATIVES:
+            intent = "top"
+            order_by, ascending = SUPERLATIVES[word]
+        elif word == "most" and i + 1 < len(tokens) and tokens[i + 1] in ("recent", "recently"):
+            intent = "top"
+            order_by, ascending = "modified", False
+            consumed = 2
+        elif word == "top":
+            intent = "top"
+        elif parse_number(word) is not None:
+            limit = parse_number(word)
+        elif word in ("directory", "folder", "dir") and i > 0 and tokens[i - 1] in CONTAINER_PREFIXES:
+            # "in this directory" names the scanned location, not a filter
+            pass
+        elif word in KIND_WORDS:
+            # "python files" keeps kind=file; "items" means files and directories
+            if KIND_WORDS[word] is not None or "kind" not in criteria:
+                criteria["kind"] = KIND_WORDS[word]
+        elif word in TYPE_WORDS:
+            criteria.setdefault("extensions", []).extend(TYPE_WORDS[word])
+        elif re.fullmatch(r"\.[a-z0-9]+", word):
+            criteria.setdefault("extensions", []).append(word)
+        elif word == "hidden":
+            criteria["hidden"] = True
+        elif word == "readonly":
+            criteria["readonly"] = True
+        elif word in ("created", "made", "added"):
+            time_field = "created"
+        elif word in ("modified", "changed", "updated", "edited"):
+            time_field = "modified"
+        elif word in ("larger", "bigger", "over", "above", "greater"):
+            size_bound = "min_size"
+        elif word in ("smaller", "under", "below", "less"):
+            size_bound = "max_size"
+        elif word in LIST_WORDS:
+            intent = intent or "list"
+        elif word not in STOPWORDS:
+            # Something we don't understand - let the LLM handle it
+            return None
+        i += consumed
+
+    if size_bound:
+        # "larger than" without a size we could parse
+        return None
+    if intent is None:
+        if not criteria:
+            return None
+        intent = "list"
+    if intent == "top":
+        limit = limit or 1
+        if order_by is None:
+            # A bare "top 5 files" ranks by size
+            order_by, ascending = "size", False
+        if order_by == "size" and not criteria.get("kind"):
+            criteria["kind"] = "file"
+        if time_field == "created" and order_by == "modified":
+            order_by = "created"
+    elif limit is not None:
+        # A stray number outside "top N" questions means we misread something
+        return None
+    if intent == "types" and "kind" not in criteria:
+        criteria["kind"] = "file"
+    if criteria.get("extensions") and not criteria.get("kind"):
+        criteria["kind"] = "file"
+    if criteria.get("kind", "") is None:
+        del criteria["kind"]
+    return ParsedQuery(intent, criteria, limit, order_by, ascending, None)
+
+
+def format_size(size):
+    for unit in ("bytes", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size} {unit}" if unit == "bytes" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_local_time(epoch):
+    return datetime.fromtimestamp(epoch).strftime("%B %d, %Y at %I:%M %p")
+
+
+def format_record_time(value):
+    """Record timestamps are UTC "MM/DD/YYYY HH:MM:SS"; speak them in local time"""
+    try:
+        moment = datetime.strptime(value, TIME_FORMAT).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return value
+    return format_local_time(moment.timestamp())
+
+
+def join_names(names, total):
+    if total > len(names):
+        return ", ".join(names) + f", and {total - len(names)} more"
+    if len(names) == 1:
+        return names[0]
+    return ", ".join(names[:-1]) + " and " + names[-1]
+
+
+def describe(criteria, count):
+    """Human phrase like "Python files" or "hidden directories" for the criteria"""
+    words = []
+    if criteria.get("hidden"):
+        words.append("hidden")
+    if criteria.get("readonly"):
+        words.append("read-only")
+    extensions = criteria.get("extensions")
+    if extensions:
+        labels = [TYPE_LABELS[w] for w, exts in TYPE_WORDS.items() if exts == extensions and w in TYPE_LABELS]
+        words.append(labels[0] if labels else "/".join(extensions))
+    kind = criteria.get("kind")
+    if kind == "directory":
+        words.append("directory" if count == 1 else "directories")
+    elif kind == "file":
+        words.append("file" if count == 1 else "files")
+    else:
+        words.append("item" if count == 1 else "items")
+    phrase = " ".join(words)
+    for field in ("created", "modified"):
+        since = criteria.get(field + "_after")
+        if since is not None:
+            phrase += " " + field + (" today" if since == day_start_epoch(0) else f" since {datetime.fromtimestamp(since):%B %d}")
+    if criteria.get("min_size") is not None:
+        phrase += f" larger than {format_size(criteria['min_size'])}"
+    if criteria.get("max_size") is not None:
+        phrase += f" smaller than {format_size(criteria['max_size'])}"
+    return phrase
+
+
+def answer_locally(query, store, lookup=None):
+    """Answer a structured question from the columnar store; None means ask the LLM"""
+    parsed = parse_query(query)
+    if parsed is None:
+        return None
+
+    if parsed.target is not None:
+        if lookup is None:
+            return None
+        record = lookup(parsed.target)
+        if record is None:
+            return f"I couldn't find a file named {parsed.target} in the directory."
+        name = record.get("path", record["name"])
+        if parsed.intent == "owner":
+            return f"{name} is owned by {record['owner'].split(chr(92))[-1]}."
+        if parsed.intent == "size":
+            if record["type"] == "directory":
+                total = store.tree_total(name)
+                if total is None:
+                    return f"{name} is a directory."
+                files = f"{total[1]} file{'s' if total[1] != 1 else ''}"
+                return f"{name} is a directory holding {files} ({format_size(total[0])} in total)."
+            return f"{name} is {format_size(record['size'])}."
+        return f"{name} was {parsed.intent} on {format_record_time(record[parsed.intent])}."
+
+    criteria = parsed.criteria
+    if parsed.intent == "count":
+        count = store.count(**criteria)
+        if not criteria:
+            summary = store.summary()
+            return (f"There are {summary['total']} items in total: {summary['files']} files "
+                    f"and {summary['directories']} directories.")
+        return f"There {'is' if count == 1 else 'are'} {count} {describe(criteria, count)}."
+
+    if parsed.intent == "total_size":
+        matched = store.filter(**criteria)
+        total = int(matched.frame["size"].sum())
+        count = len(matched)
+        return f"The {describe(criteria, count)} take{'s' if count == 1 else ''} up {format_size(total)} in total."
+
+    if parsed.intent == "types":
+        counts = store.filter(**criteria).extension_counts()
+        if counts.empty:
+            return "There are no files in the directory."
+        parts = [f"{row['count']} {ext or 'without an extension'}" for ext, row in counts.head(MAX_LISTED).iterrows()]
+        return "Here's the breakdown by file type: " + join_names(parts, len(counts)) + "."
+
+    if parsed.intent == "top":
+        # Folders rank by everything beneath them, memoized per directory during the scan
+        folders = parsed.order_by == "size" and criteria.get("kind") == "directory"
+        by = "tree_size" if folders else parsed.order_by
+        top = store.top(parsed.limit, by=by, ascending=parsed.ascending, **criteria).frame
+        if top.empty:
+            return f"There are no {describe(criteria, 2)}."
+        if folders:
+            items = [f"{row.path} ({format_size(row.tree_size)} in {row.tree_files} "
+                     f"file{'s' if row.tree_files != 1 else ''})" for row in top.itertuples()]
+        elif parsed.order_by == "size":
+            items = [f"{row.path} ({format_size(row.size)})" for row in top.itertuples()]
+        else:
+            items = [f"{row.path} ({parsed.order_by} {format_local_time(getattr(row, parsed.order_by))})"
+                     for row in top.itertuples()]
+        label = {("size", False): "largest", ("size", True): "smallest",
+                 ("modified", False): "most recently modified", ("created", False): "most recently created",
+                 ("created", True): "oldest", ("modified", True): "least recently modified"}
+        adjective = label[(parsed.order_by, parsed.ascending)]
+        if len(items) == 1:
+            return f"The {adjective} {describe(criteria, 1)} is {items[0]}."
+        return f"The {len(items)} {adjective} {describe(criteria, len(items))} are: " + join_names(items, len(items)) + "."
+
+    # list
+    matched = store.filter(**criteria)
+    count = len(matched)
+    if count == 0:
+        return f"There are no {describe(criteria, 2)} in the directory."
+    names = matched.frame["path"].head(MAX_LISTED).tolist()
+    return f"I found {count} {describe(criteria, count)}: " + join_names(names, count) + "."
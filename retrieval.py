@@ -0,0 +1,123 @@
+import os
+import numpy as np
+import pandas as pd
+
+from metadata_store import HIDDEN, SYSTEM, READONLY
+from query_engine import tokenize, parse_time_window, format_size, TYPE_WORDS, STOPWORDS, KIND_WORDS
+
+# Rough chars-per-token for English/file names; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+DEFAULT_TOKEN_BUDGET = 8000
+
+HEADER = "path|type|size|owner|created|modified|flags"
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def token_budget():
+    """Prompt budget for the directory listing (GEMINI_CONTEXT_TOKENS)"""
+    return int(os.getenv("GEMINI_CONTEXT_TOKENS", DEFAULT_TOKEN_BUDGET))
+
+
+def relevance_scores(query, frame):
+    """Score each row by name matches, mentioned file types and time predicates in the query"""
+    tokens = tokenize(query)
+    scores = np.zeros(len(frame), dtype=np.float64)
+    names = frame["name"].str.lower()
+    paths = frame["path"].str.lower()
+
+    for i, word in enumerate(tokens):
+        if word in TYPE_WORDS:
+            scores += frame["ext"].isin(TYPE_WORDS[word]).to_numpy() * 3
+        elif word.startswith(".") and len(word) > 1:
+            scores += (frame["ext"] == word).to_numpy() * 3
+        elif word in ("directory", "directories", "folder", "folders"):
+            scores += frame["is_dir"].to_numpy() * 2
+        since, _ = parse_time_window(tokens, i)
+        if since is not None:
+            field = "created" if "created" in tokens else "modified"
+            scores += (frame[field].to_numpy() >= since) * 3
+        if len(word) >= 3 and word not in STOPWORDS and word not in KIND_WORDS:
+            scores += (names == word).to_numpy() * 20
+            scores += names.str.contains(word, regex=False).to_numpy() * 8
+            scores += paths.str.contains(word, regex=False).to_numpy() * 3
+
+    # Tie-break towards recently modified entries
+    modified = frame["modified"].to_numpy()
+    if len(modified):
+        span = max(int(modified.max() - modified.min()), 1)
+        scores += (modified - modified.min()) / span
+    return scores
+
+
+def format_row(row):
+    flags = "".join(flag for bit, flag in ((HIDDEN, "H"), (SYSTEM, "S"), (READONLY, "R")) if row.attrs & bit)
+    return "|".join((
+        row.path,
+        "d" if row.is_dir else "f",
+        "" if row.is_dir else str(row.size),
+        str(row.owner),
+        row.created_text,
+        row.modified_text,
+        flags,
+    ))
+
+
+def summarize_dropped(frame):
+    """One-line statistics for entries left out of the prompt"""
+    if frame.empty:
+        return ""
+    files = frame[~frame["is_dir"]]
+    top_ext = files["ext"].astype(str).replace("", "(none)").value_counts().head(5)
+    ext_text = ", ".join(f"{ext} x{count}" for ext, count in top_ext.items())
+    oldest = pd.to_datetime(frame["modified"].min(), unit="s").strftime("%Y-%m-%d")
+    newest = pd.to_datetime(frame["modified"].max(), unit="s").strftime("%Y-%m-%d")
+    return (f"{len(frame)} more entries not listed ({len(files)} files, {len(frame) - len(files)} directories, "
+            f"{format_size(int(files['size'].sum()))} total; types: {ext_text or 'n/a'}; "
+            f"modified {oldest} to {newest})")
+
+
+def build_context(query, store, budget=None):
+    """Compact, relevance-ranked listing of the snapshot that fits the token budget
+
+    Returns (text, included_count, dropped_count).
+    """
+    budget = budget or token_budget()
+    frame = store.frame
+    if frame.empty:
+        return "(directory is empty)", 0, 0
+
+    order = np.argsort(-relevance_scores(query, frame), kind="stable")
+    ranked = frame.iloc[order]
+
+    # Reserve room for the header and the dropped-entries summary line
+    remaining = budget - estimate_tokens(HEADER) - 60
+    lines = [HEADER]
+    included = 0
+    batch_size = 256
+    for start in range(0, len(ranked), batch_size):
+        batch = ranked.iloc[start:start + batch_size].copy()
+        batch["owner"] = store.column("owner", batch.index)
+        batch["attrs"] = store.column("attrs", batch.index)
+        batch["created_text"] = pd.to_datetime(batch["created"], unit="s").dt.strftime("%Y-%m-%d %H:%M")
+        batch["modified_text"] = pd.to_datetime(batch["modified"], unit="s").dt.strftime("%Y-%m-%d %H:%M")
+        for row in batch.itertuples():
+            line = format_row(row)
+            cost = estimate_tokens(line)
+            if cost > remaining:
+                break
+            lines.append(line)
+            remaining -= cost
+            included += 1
+        else:
+            continue
+        break
+
+    dropped = ranked.iloc[included:]
+    summary = summarize_dropped(dropped)
+    if summary:
+        lines.append(summary)
+    return "\n".join(lines), included, len(dropped)
@@ -0,0 +1,507 @@
+import os
+import stat
+import json
+import time
+import struct
+import fnmatch
+import locale
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from metrics import get_tracer, span
+
+# Same timestamp layout the C lister prints (UTC, like FileTimeToSystemTime)
+TIME_FORMAT = "%m/%d/%Y %H:%M:%S"
+
+# Wire formats of the native lister: one JSON document, JSON lines or packed records
+NATIVE_FORMATS = ("json", "ndjson", "binary")
+
+# Per-entry header of the binary format (see write_binary_entry in file_lister.c)
+BINARY_MAGIC = b"FLST"
+BINARY_VERSION = 1
+BINARY_ENTRY = struct.Struct("<HHBxqqqq")
+
+# Windows attribute bits (stat.FILE_ATTRIBUTE_* only exists on Windows builds)
+FILE_ATTRIBUTE_HIDDEN = 0x2
+FILE_ATTRIBUTE_SYSTEM = 0x4
+FILE_ATTRIBUTE_READONLY = 0x1
+
+try:
+    import pwd
+except ImportError:
+    pwd = None
+
+try:
+    import win32security
+except ImportError:
+    win32security = None
+
+
+def format_timestamp(ts):
+    """Format an epoch timestamp the way file_lister.c does"""
+    return time.strftime(TIME_FORMAT, time.gmtime(ts))
+
+
+def matches_any(rel_path, name, patterns):
+    """True if the relative path or bare name matches one of the glob patterns"""
+    return any(fnmatch.fnmatch(rel_path, p) or fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def entry_selected(record, include=None, exclude=None):
+    """Apply include/exclude globs to a scanned record"""
+    rel_path = record.get("path", record["name"])
+    if exclude and matches_any(rel_path, record["name"], exclude):
+        return False
+    if include and not matches_any(rel_path, record["name"], include):
+        return False
+    return True
+
+
+# Fields a plain listing doesn't need; LazyRecord computes them on first access
+DEFERRED_FIELDS = ("owner", "created", "accessed", "attributes")
+
+# Raw stat values a LazyRecord keeps for its deferred fields (times are epoch seconds;
+# accessed stays last, LazyRecord equality skips it)
+StatState = namedtuple("StatState", ["uid", "mode", "win_attrs", "created", "modified", "accessed"])
+
+
+class LazyRecord(dict):
+    """Scanner record that holds name, path, type, size and mtime, and loads the rest on demand
+
+    Deferred fields are read like any other key (record["owner"], record.get("owner"))
+    and computed once from the raw stat values kept in state (a StatState). They are not stored
+    as dict keys, but keys(), items(), iteration and len() include them, so dict(record),
+    {**record} and json.dumps(record) see every field (loading the deferred ones).
+    """
+    __slots__ = ("state", "full_path", "loader", "loaded")
+
+    def __init__(self, fields, state, full_path, loader):
+        super().__init__(fields)
+        self.state = state
+        self.full_path = full_path
+        self.loader = loader
+        self.loaded = None
+
+    def __missing__(self, key):
+        if key not in DEFERRED_FIELDS:
+            raise KeyError(key)
+        loaded = self.loaded
+        if loaded is None:
+            loaded = self.loaded = {}
+        if key not in loaded:
+            loaded[key] = self.loader(self, key)
+        return loaded[key]
+
+    def get(self, key, default=None):
+        if dict.__contains__(self, key) or key in DEFERRED_FIELDS:
+            return self[key]
+        return default
+
+    def __contains__(self, key):
+        return key in DEFERRED_FIELDS or dict.__contains__(self, key)
+
+    def keys(self):
+        return list(dict.keys(self)) + list(DEFERRED_FIELDS)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return dict.__len__(self) + len(DEFERRED_FIELDS)
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def __eq__(self, other):
+        # The access time is left out: reading a file doesn't change it
+        if isinstance(other, LazyRecord):
+            # Same stat values -> same deferred fields, no need to load them
+            return self.state[:-1] == other.state[:-1] and dict.__eq__(self, other)
+        if isinstance(other, dict):
+            record, other = self.materialize(), dict(other)
+            record.pop("accessed")
+            other.pop("accessed", None)
+            return record == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def materialize(self):
+        """Plain dict with every field loaded"""
+        record = dict(dict.items(self))
+        for key in DEFERRED_FIELDS:
+            record[key] = self[key]
+        return record
+
+
+def size_unit(size, is_dir):
+    """Size unit label matching the C lister's size_readable field"""
+    if is_dir:
+        return "N/A"
+    if size < 1024:
+        return "bytes"
+    if size < 1048576:
+        return "KB"
+    return "MB"
+
+
+class ScannerBackend:
+    """Base class for directory scanner backends"""
+    name = "base"
+    # Backends that can build a record for one path (stat_path) get watcher deltas
+    # applied in place; the others are rescanned on every change
+    supports_stat_path = False
+
+    def prepare(self):
+        """One-time setup; returns (success, message)"""
+        return True, ""
+
+    def scan(self, path="."):
+        """Return {"files": [...], "total_files": n} for the given directory"""
+        raise NotImplementedError
+
+    def walk(self, path=".", max_depth=0, include=None, exclude=None, workers=None, cache=None):
+        """Yield records one by one; backends without recursion only list the top level
+
+        cache is a directory listing cache (see sqlite_index.py); backends that can't use one ignore it.
+        """
+        for record in self.scan(path)["files"]:
+            if entry_selected(record, include, exclude):
+                yield record
+
+
+class ScandirScanner(ScannerBackend):
+    """In-process scanner built on os.scandir (no subprocess, no JSON round-trip)"""
+    name = "scandir"
+    supports_stat_path = True
+
+    def __init__(self):
+        # uid or SID string -> account name, shared by every record of every scan
+        self._owners = {}
+
+    def resolve_owner(self, path, uid):
+        """Look up the owner name for a file (account lookups are memoized per uid/SID)"""
+        if pwd is not None:
+            if uid not in self._owners:
+                try:
+                    self._owners[uid] = pwd.getpwuid(uid).pw_name
+                except KeyError:
+                    self._owners[uid] = str(uid)
+            return self._owners[uid]
+        if win32security is not None:
+            try:
+                sd = win32security.GetFileSecurity(path, win32security.OWNER_SECURITY_INFORMATION)
+                sid = sd.GetSecurityDescriptorOwner()
+                key = win32security.ConvertSidToStringSid(sid)
+                if key not in self._owners:
+                    name, domain, _ = win32security.LookupAccountSid(None, sid)
+                    self._owners[key] = f"{domain}\\{name}"
+                return self._owners[key]
+            except Exception:
+                pass
+        return "Unknown"
+
+    def build_record(self, entry, rel_path=None):
+        """Convert a DirEntry into the lister record schema"""
+        try:
+            st = entry.stat()
+        except OSError:
+            st = entry.stat(follow_symlinks=False)
+        return self.record_from_stat(entry.name, rel_path or entry.name, entry.path, st)
+
+    def stat_path(self, root, rel_path):
+        """Build a record for a single path (used to apply watcher deltas)"""
+        full_path = os.path.join(root, rel_path)
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            st = os.lstat(full_path)
+        return self.record_from_stat(os.path.basename(rel_path), rel_path, full_path, st)
+
+    def record_from_stat(self, name, rel_path, full_path, st):
+        """Assemble a record from stat results; owner, times other than mtime and attributes are deferred"""
+        is_dir = stat.S_ISDIR(st.st_mode)
+        size = 0 if is_dir else st.st_size
+        fields = {
+            "name": name,
+            "path": rel_path,
+            "type": "directory" if is_dir else "file",
+            "size": size,
+            "size_readable": size_unit(size, is_dir),
+            "modified": format_timestamp(st.st_mtime),
+        }
+        state = StatState(st.st_uid, st.st_mode, getattr(st, "st_file_attributes", None),
+                          getattr(st, "st_birthtime", st.st_ctime), st.st_mtime, st.st_atime)
+        return LazyRecord(fields, state, full_path, self.load_field)
+
+    def load_field(self, record, field):
+        """Compute one deferred field of a LazyRecord from its saved stat values"""
+        state = record.state
+        if field == "owner":
+            return self.resolve_owner(record.full_path, state.uid)
+        if field in ("created", "accessed"):
+            return format_timestamp(getattr(state, field))
+
+        win_attrs = state.win_attrs
+        if win_attrs is not None:
+            hidden = bool(win_attrs & FILE_ATTRIBUTE_HIDDEN)
+            system = bool(win_attrs & FILE_ATTRIBUTE_SYSTEM)
+            readonly = bool(win_attrs & FILE_ATTRIBUTE_READONLY)
+        else:
+            hidden = record["name"].startswith(".")
+            system = False
+            readonly = not (state.mode & stat.S_IWUSR)
+        return {
+            "hidden": hidden,
+            "system": system,
+            "readonly": readonly
+        }
+
+    def scan(self, path="."):
+        files = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    files.append(self.build_record(entry))
+                except OSError:
+                    # Entry vanished or is unreadable between listing and stat
+                    continue
+        return {"files": files, "total_files": len(files)}
+
+    def scan_directory(self, path, rel_dir):
+        """Scan a single directory; returns (records, [(subdir_path, subdir_rel)])"""
+        records = []
+        subdirs = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                    try:
+                        record = self.build_record(entry, rel_path)
+                    except OSError:
+                        continue
+                    records.append(record)
+                    if record["type"] == "directory" and not entry.is_symlink():
+                        subdirs.append((entry.path, rel_path))
+        except OSError:
+            # Permission denied or directory removed mid-walk
+            pass
+        return records, subdirs
+
+    def list_directory(self, path, rel_dir, cache=None):
+        """scan_directory, or the cached listing if the directory's mtime hasn't changed since it was stored"""
+        if cache is None:
+            return self.scan_directory(path, rel_dir)
+        try:
+            # Taken before listing, so a change made during the listing invalidates it next time
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return [], []
+        listing = cache.lookup(path, rel_dir, mtime)
+        if listing is None:
+            listing = self.scan_directory(path, rel_dir)
+            cache.store(rel_dir, mtime, *listing)
+        return listing
+
+    def walk(self, path=".", max_depth=0, include=None, exclude=None, workers=None, cache=None):
+        """Recursively yield records, fanning subdirectories out over a bounded thread pool
+
+        max_depth=0 lists only the top directory, None means unlimited.
+        Excluded directories are pruned; include globs only filter what is yielded.
+        With a cache, directories whose mtime is unchanged are served from it instead of re-listed.
+        """
+        workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        if cache is not None:
+            cache.begin_walk()
+        pending = {executor.submit(self.list_directory, path, "", cache): 0}
+        completed = False
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    depth = pending.pop(future)
+                    records, subdirs = future.result()
+                    for record in records:
+                        if entry_selected(record, include, exclude):
+                            yield record
+                    if max_depth is not None and depth >= max_depth:
+                        continue
+                    for sub_path, sub_rel in subdirs:
+                        if exclude and matches_any(sub_rel, os.path.basename(sub_rel), exclude):
+                            continue
+                        pending[executor.submit(self.list_directory, sub_path, sub_rel, cache)] = depth + 1
+            completed = True
+        finally:
+            # Consumer may stop early (e.g. find_file got its hit); drop queued work
+            executor.shutdown(wait=False, cancel_futures=True)
+            if cache is not None:
+                cache.end_walk(completed)
+
+
+def read_ndjson(stream, encoding="utf-8"):
+    """Yield records from a stream of JSON lines as they arrive"""
+    for line in stream:
+        if line.strip():
+            yield json.loads(line.decode(encoding, errors="replace"))
+
+
+def read_exactly(stream, size):
+    data = stream.read(size)
+    if len(data) < size:
+        raise EOFError("native lister output ended mid-record")
+    return data
+
+
+def read_binary(stream, encoding="utf-8"):
+    """Yield records from the lister's packed binary format as they arrive"""
+    header = stream.read(8)
+    if not header:
+        return
+    if len(header) < 8 or header[:4] != BINARY_MAGIC:
+        raise ValueError("not a file_lister binary stream")
+    version = struct.unpack("<I", header[4:])[0]
+    if version != BINARY_VERSION:
+        raise ValueError(f"unsupported file_lister binary version {version}")
+    # Whole-second times repeat a lot within one directory; format each once
+    formatted = {}
+
+    def timestamp(epoch):
+        text = formatted.get(epoch)
+        if text is None:
+            text = formatted[epoch] = format_timestamp(epoch)
+        return text
+
+    while True:
+        fixed = stream.read(BINARY_ENTRY.size)
+        if not fixed:
+            return
+        if len(fixed) < BINARY_ENTRY.size:
+            raise EOFError("native lister output ended mid-record")
+        name_len, owner_len, flags, size, created, modified, accessed = BINARY_ENTRY.unpack(fixed)
+        strings = read_exactly(stream, name_len + owner_len)
+        is_dir = bool(flags & 1)
+        yield {
+            "name": strings[:name_len].decode(encoding, errors="replace"),
+            "type": "directory" if is_dir else "file",
+            "size": size,
+            "size_readable": size_unit(size, is_dir),
+            "owner": strings[name_len:].decode(encoding, errors="replace"),
+            "created": timestamp(created),
+            "modified": timestamp(modified),
+            "accessed": timestamp(accessed),
+            "attributes": {
+                "hidden": bool(flags & 2),
+                "system": bool(flags & 4),
+                "readonly": bool(flags & 8)
+            }
+        }
+
+
+class NativeListerScanner(ScannerBackend):
+    """Runs the compiled file_lister C program and reads its output as it streams in
+
+    NATIVE_LISTER_FORMAT picks the wire format: ndjson (default), binary, or the
+    original single JSON document (json), which can only be parsed once the
+    lister exits. With owners off (NATIVE_LISTER_OWNERS=off) the lister skips the
+    per-file owner lookup and reports every owner as "Unknown".
+    """
+    name = "native"
+
+    def __init__(self, source="file_lister.c", executable=None, wire_format=None, owners=None):
+        self.source = source
+        self.executable = executable or ("file_lister.exe" if os.name == "nt" else "file_lister")
+        self.wire_format = (wire_format or os.getenv("NATIVE_LISTER_FORMAT") or "ndjson").lower()
+        if self.wire_format not in NATIVE_FORMATS:
+            raise ValueError(f"Unknown native lister format '{self.wire_format}'. "
+                             f"Available: {', '.join(NATIVE_FORMATS)}")
+        if owners is None:
+            owners = os.getenv("NATIVE_LISTER_OWNERS", "on").lower() != "off"
+        self.owners = owners
+        # The encoding text=True used to decode the lister's output with
+        self.encoding = locale.getpreferredencoding(False)
+
+    def prepare(self):
+        """Compile the C program if the executable is missing or older than the source"""
+        if os.path.exists(self.executable) and (
+                not os.path.exists(self.source) or os.path.getmtime(self.executable) >= os.path.getmtime(self.source)):
+            return True, ""
+        command = ["gcc", "-O2", "-o", self.executable, self.source]
+        if os.name == "nt":
+            command.append("-ladvapi32")
+        try:
+            result = subprocess.run(command, capture_output=True, text=True)
+        except OSError as e:
+            return False, f"Could not run gcc: {e}"
+        if result.returncode != 0:
+            return False, result.stderr
+        return True, ""
+
+    def iter_records(self, path="."):
+        """Yield records while the lister is still running"""
+        command = [os.path.abspath(self.executable)]
+        if self.wire_format != "json":
+            command += ["--format", self.wire_format]
+        if not self.owners:
+            command.append("--no-owner")
+        started = time.perf_counter()
+        process = subprocess.Popen(command, cwd=path, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        count = 0
+        finished = False
+        try:
+            if self.wire_format == "ndjson":
+                records = read_ndjson(process.stdout, self.encoding)
+            elif self.wire_format == "binary":
+                records = read_binary(process.stdout, self.encoding)
+            else:
+                output = process.stdout.read()
+                with span("json_parse", bytes=len(output)):
+                    records = json.loads(output.decode(self.encoding, errors="replace"))["files"]
+            for record in records:
+                count += 1
+                yield record
+            finished = True
+        finally:
+            if not finished:
+                # Consumer stopped early or the output was malformed
+                process.kill()
+            process.stdout.close()
+            stderr = process.stderr.read()
+            process.stderr.close()
+            returncode = process.wait()
+        if returncode != 0:
+            raise RuntimeError(f"file_lister failed ({returncode}): {stderr.decode(self.encoding, errors='replace')}")
+        get_tracer().record("native_list", time.perf_counter() - started,
+                            attrs={"entries": count, "format": self.wire_format})
+
+    def scan(self, path="."):
+        files = list(self.iter_records(path))
+        return {"files": files, "total_files": len(files)}
+
+    def walk(self, path=".", max_depth=0, include=None, exclude=None, workers=None, cache=None):
+        """Stream the top-level listing (the lister doesn't recurse)"""
+        for record in self.iter_records(path):
+            if entry_selected(record, include, exclude):
+                yield record
+
+
+SCANNER_BACKENDS = {
+    ScandirScanner.name: ScandirScanner,
+    NativeListerScanner.name: NativeListerScanner,
+}
+
+
+def get_scanner(name=None):
+    """Create a scanner backend by name (defaults to FILE_SCANNER_BACKEND or scandir)"""
+    name = (name or os.getenv("FILE_SCANNER_BACKEND") or ScandirScanner.name).lower()
+    if name not in SCANNER_BACKENDS:
+        raise ValueError(f"Unknown scanner backend '{name}'. Available: {', '.join(SCANNER_BACKENDS)}")
+    return SCANNER_BACKENDS[name]()
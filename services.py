@@ -0,0 +1,301 @@
+import os
+import json
+import queue
+import random
+import asyncio
+import threading
+
+import aiohttp
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com"
+DEEPGRAM_BASE_URL = "https://api.deepgram.com"
+
+# Statuses worth retrying (rate limits and transient server errors)
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class ServiceError(Exception):
+    """Non-retryable failure (or retries exhausted) from an upstream API"""
+
+    def __init__(self, service, message, status=None):
+        super().__init__(f"{service}: {message}")
+        self.service = service
+        self.status = status
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+
+    def __init__(self, attempts=3, base_delay=0.25, max_delay=4.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class ServiceConfig:
+    """Endpoints, keys and limits; base URLs can point at local stand-in servers"""
+
+    def __init__(self, gemini_api_key=None, deepgram_api_key=None,
+                 gemini_base_url=GEMINI_BASE_URL, deepgram_base_url=DEEPGRAM_BASE_URL,
+                 gemini_model="gemini-2.0-flash-001", stt_model="nova-2",
+                 pool_size=20, max_concurrency=None, deadlines=None, retry=None):
+        self.gemini_api_key = gemini_api_key
+        self.deepgram_api_key = deepgram_api_key
+        self.gemini_base_url = gemini_base_url.rstrip("/")
+        self.deepgram_base_url = deepgram_base_url.rstrip("/")
+        self.gemini_model = gemini_model
+        self.stt_model = stt_model
+        self.pool_size = pool_size
+        self.max_concurrency = max_concurrency or {"llm": 4, "stt": 4, "tts": 8}
+        self.deadlines = deadlines or {"llm": 30.0, "stt": 15.0, "tts": 10.0}
+        self.retry = retry or RetryPolicy()
+
+    @classmethod
+    def from_env(cls):
+        def limits(prefix, defaults):
+            return {name: float(os.getenv(f"{prefix}_{name.upper()}", value)) for name, value in defaults.items()}
+
+        return cls(
+            gemini_api_key=os.getenv("GEMINI_API_KEY"),
+            deepgram_api_key=os.getenv("DEEPGRAM_API_KEY"),
+            gemini_base_url=os.getenv("GEMINI_BASE_URL", GEMINI_BASE_URL),
+            deepgram_base_url=os.getenv("DEEPGRAM_BASE_URL", DEEPGRAM_BASE_URL),
+            pool_size=int(os.getenv("SERVICE_POOL_SIZE", "20")),
+            max_concurrency={k: int(v) for k, v in limits("SERVICE_CONCURRENCY", {"llm": 4, "stt": 4, "tts": 8}).items()},
+            deadlines=limits("SERVICE_DEADLINE", {"llm": 30.0, "stt": 15.0, "tts": 10.0}),
+            retry=RetryPolicy(attempts=int(os.getenv("SERVICE_RETRIES", "3"))),
+        )
+
+
+class AsyncServiceClient:
+    """asyncio client for Gemini (LLM) and Deepgram (STT/TTS) over one pooled aiohttp session
+
+    Every call runs under a per-service semaphore and deadline and is retried with
+    jittered backoff on transient errors. Cancelling the awaiting task aborts the request.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or ServiceConfig.from_env()
+        self.session = None
+        self.semaphores = {}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.config.pool_size, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(connector=connector)
+            self.semaphores = {name: asyncio.Semaphore(limit) for name, limit in self.config.max_concurrency.items()}
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _call(self, service, method, url, read, **kwargs):
+        """Issue a request with concurrency limit, deadline and retries; read(response) parses it"""
+        await self.open()
+        retry = self.config.retry
+        deadline = self.config.deadlines[service]
+        for attempt in range(retry.attempts):
+            try:
+                async with self.semaphores[service]:
+                    return await asyncio.wait_for(self._request(service, method, url, read, **kwargs), deadline)
+            except ServiceError as e:
+                if e.status not in RETRY_STATUSES or attempt == retry.attempts - 1:
+                    raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == retry.attempts - 1:
+                    raise ServiceError(service, f"{type(e).__name__}: {e}") from e
+            await asyncio.sleep(retry.delay(attempt))
+
+    async def _request(self, service, method, url, read, **kwargs):
+        async with self.session.request(method, url, **kwargs) as response:
+            if response.status >= 400:
+                body = await response.text()
+                raise ServiceError(service, f"HTTP {response.status}: {body[:200]}", response.status)
+            return await read(response)
+
+    # Deepgram STT
+    async def transcribe(self, audio, mimetype="audio/wav", language="en-US"):
+        url = f"{self.config.deepgram_base_url}/v1/listen"
+        params = {"model": self.config.stt_model, "smart_format": "true", "punctuate": "true", "language": language}
+        headers = {"Authorization": f"Token {self.config.deepgram_api_key}", "Content-Type": mimetype}
+
+        async def read(response):
+            payload = await response.json(content_type=None)
+            return payload["results"]["channels"][0]["alternatives"][0]["transcript"]
+
+        return await self._call("stt", "POST", url, read, params=params, headers=headers, data=audio)
+
+    # Gemini LLM
+    def _gemini_request(self, prompt):
+        headers = {"x-goog-api-key": self.config.gemini_api_key or "", "Content-Type": "application/json"}
+        body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        return headers, body
+
+    @staticmethod
+    def _candidate_text(payload):
+        candidates = payload.get("candidates") or []
+        if not candidates:
+            return ""
+        parts = candidates[0].get("content", {}).get("parts", [])
+        return "".join(part.get("text", "") for part in parts)
+
+    async def generate(self, prompt):
+        url = f"{self.config.gemini_base_url}/v1beta/models/{self.config.gemini_model}:generateContent"
+        headers, body = self._gemini_request(prompt)
+
+        async def read(response):
+            return self._candidate_text(await response.json(content_type=None))
+
+        return await self._call("llm", "POST", url, read, headers=headers, json=body)
+
+    async def stream_generate(self, prompt):
+        """Yield text chunks from Gemini's server-sent-events endpoint
+
+        The LLM deadline applies to the response headers and again to every line
+        of the body, so a stream that stalls part-way fails instead of hanging;
+        retries only happen before anything has been yielded.
+        """
+        await self.open()
+        url = f"{self.config.gemini_base_url}/v1beta/models/{self.config.gemini_model}:streamGenerateContent"
+        headers, body = self._gemini_request(prompt)
+        retry = self.config.retry
+        deadline = self.config.deadlines["llm"]
+        yielded = False
+        for attempt in range(retry.attempts):
+            try:
+                async with self.semaphores["llm"]:
+                    response = await asyncio.wait_for(
+                        self.session.post(url, params={"alt": "sse"}, headers=headers, json=body), deadline)
+                    async with response:
+                        if response.status >= 400:
+                            text = await response.text()
+                            raise ServiceError("llm", f"HTTP {response.status}: {text[:200]}", response.status)
+                        while True:
+                            line = await asyncio.wait_for(response.content.readline(), deadline)
+                            if not line:
+                                break
+                            line = line.strip()
+                            if line.startswith(b"data:"):
+                                text = self._candidate_text(json.loads(line[5:]))
+                                if text:
+                                    yielded = True
+                                    yield text
+                return
+            except ServiceError as e:
+                if yielded or e.status not in RETRY_STATUSES or attempt == retry.attempts - 1:
+                    raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if yielded or attempt == retry.attempts - 1:
+                    raise ServiceError("llm", f"{type(e).__name__}: {e}") from e
+            await asyncio.sleep(retry.delay(attempt))
+
+    # Deepgram TTS
+    async def synthesize(self, text, voice_model, options=None):
+        """options overrides encoding/container/sample_rate (linear16 WAV by default)"""
+        url = f"{self.config.deepgram_base_url}/v1/speak"
+        params = {"model": voice_model, "encoding": "linear16", "container": "wav"}
+        params.update({key: str(value) for key, value in (options or {}).items()})
+        headers = {"Authorization": f"Token {self.config.deepgram_api_key}", "Content-Type": "application/json"}
+
+        async def read(response):
+            return await response.read()
+
+        return await self._call("tts", "POST", url, read, params=params, headers=headers, json={"text": text})
+
+
+class ServiceRunner:
+    """Runs an AsyncServiceClient on a background event loop so synchronous code
+    (Streamlit reruns) can share one connection pool across calls"""
+
+    def __init__(self, client=None):
+        self.client = client or AsyncServiceClient()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="service-loop", daemon=True)
+        self.thread.start()
+
+    def submit(self, coro):
+        """Schedule a coroutine; returns a concurrent.futures.Future (cancel() cancels the request)"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def iterate(self, agen, timeout=None):
+        """Consume an async generator from synchronous code, chunk by chunk"""
+        chunks = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    chunks.put(item)
+            except BaseException as e:
+                chunks.put(e)
+                raise
+            finally:
+                chunks.put(done)
+
+        future = self.submit(pump())
+        try:
+            while True:
+                item = chunks.get(timeout=timeout)
+                if item is done:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Consumer stopped early (or failed): cancel the upstream request
+            future.cancel()
+
+    def close(self):
+        self.run(self.client.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class ServiceLLMBackend:
+    """Synchronous LLM backend over the async service layer"""
+
+    def __init__(self, runner):
+        self.runner = runner
+
+    def generate(self, prompt):
+        return self.runner.run(self.runner.client.generate(prompt))
+
+    def stream(self, prompt):
+        # Backstop for the per-line deadline: every attempt may use the full deadline
+        config = self.runner.client.config
+        timeout = config.deadlines["llm"] * (config.retry.attempts + 1)
+        yield from self.runner.iterate(self.runner.client.stream_generate(prompt), timeout=timeout)
+
+
+class ServiceTTSBackend:
+    def __init__(self, runner):
+        self.runner = runner
+
+    def synthesize(self, text, voice_model, options=None):
+        return self.runner.run(self.runner.client.synthesize(text, voice_model, options))
+
+
+class ServiceSTTBackend:
+    def __init__(self, runner):
+        self.runner = runner
+
+    def transcribe(self, audio, mimetype="audio/wav"):
+        return self.runner.run(self.runner.client.transcribe(audio, mimetype))
@@ -0,0 +1,130 @@
+import itertools
+import os
+
+# Process-wide so versions never repeat across rescans (downstream caches key on them)
+_versions = itertools.count(1)
+
+
+def record_path(record):
+    """Relative path of a record (the native lister only reports names)"""
+    return record.get("path", record["name"])
+
+
+def is_under(path, directory):
+    """True if path is inside directory"""
+    return path.startswith(directory + os.sep)
+
+
+class FileSnapshot:
+    """Versioned, path-keyed view of the scanned directory that accepts deltas"""
+
+    def __init__(self, files=()):
+        self.records = {}
+        for record in files:
+            self.records[record_path(record)] = record
+        self.version = next(_versions)
+        self._listing = None
+        self.observers = []
+        self._shared = False
+
+    def fork(self):
+        """Copy-on-write clone: shares the records until either side changes
+
+        Readers keep the original, a frozen view of this version, while the fork
+        takes the deltas; only the first change pays for copying the path table.
+        """
+        clone = FileSnapshot.__new__(FileSnapshot)
+        clone.records = self.records
+        clone.version = self.version
+        clone._listing = self._listing
+        clone.observers = list(self.observers)
+        clone._shared = self._shared = True
+        return clone
+
+    def _own(self):
+        if self._shared:
+            self.records = dict(self.records)
+            self._shared = False
+
+    def add_observer(self, observer):
+        """Register an index kept in step with the snapshot (on_upsert/on_remove hooks)"""
+        self.observers.append(observer)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, path):
+        return path in self.records
+
+    def get(self, path):
+        return self.records.get(path)
+
+    def upsert(self, record):
+        """Add or replace a record"""
+        path = record_path(record)
+        old = self.records.get(path)
+        if old == record:
+            # Re-stat of an unchanged entry (e.g. a watcher echo of our own change)
+            return
+        self._own()
+        self.records[path] = record
+        for observer in self.observers:
+            observer.on_upsert(old, record)
+        self._changed()
+
+    def remove(self, path):
+        """Remove a path and, for directories, everything beneath it; returns removed records"""
+        removed = self._pop(path)
+        if removed:
+            for observer in self.observers:
+                for record in removed:
+                    observer.on_remove(record)
+            self._changed()
+        return removed
+
+    def apply(self, upserts=(), removals=()):
+        """Apply a batch of changes as one delta (a single version bump); returns True if anything changed"""
+        changed = []
+        for path in removals:
+            changed.extend((record, None) for record in self._pop(path))
+        for record in upserts:
+            path = record_path(record)
+            old = self.records.get(path)
+            if old != record:
+                self._own()
+                self.records[path] = record
+                changed.append((old, record))
+        if not changed:
+            return False
+        for observer in self.observers:
+            for old, new in changed:
+                if new is None:
+                    observer.on_remove(old)
+                else:
+                    observer.on_upsert(old, new)
+        self._changed()
+        return True
+
+    def _pop(self, path):
+        if path not in self.records:
+            return []
+        self._own()
+        removed = []
+        record = self.records.pop(path, None)
+        if record is not None:
+            removed.append(record)
+            if record["type"] == "directory":
+                for child in [p for p in self.records if is_under(p, path)]:
+                    removed.append(self.records.pop(child))
+        return removed
+
+    def _changed(self):
+        self.version = next(_versions)
+        self._listing = None
+
+    def as_dict(self):
+        """The {"files", "total_files"} layout the rest of the app expects, plus the version"""
+        if self._listing is None:
+            files = list(self.records.values())
+            self._listing = {"files": files, "total_files": len(files), "version": self.version}
+        return self._listing
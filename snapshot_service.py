@@ -0,0 +1,373 @@
+import os
+import time
+import threading
+from datetime import datetime
+
+from scanner import get_scanner, entry_selected, matches_any
+from snapshot import FileSnapshot
+from watcher import create_watcher
+from name_index import NameIndex
+from dir_sizes import DirectoryTotals
+from sqlite_index import SQLiteIndex
+from content_index import ContentIndex
+from duplicates import DuplicateFinder
+from metrics import get_tracer, span
+
+# Marks constructor arguments that should be read from the environment
+FROM_ENV = object()
+
+
+def parse_glob_list(value):
+    """Split a comma-separated glob list from the environment"""
+    return [p.strip() for p in value.split(",") if p.strip()] if value else None
+
+
+def parse_max_depth(value):
+    """Scan depth from the environment: 0 = current directory only, 'all' = unlimited"""
+    if value is None or value == "":
+        return 0
+    if value.lower() in ("all", "none", "unlimited"):
+        return None
+    return int(value)
+
+
+class SnapshotService:
+    """One scanned, watched snapshot of the working directory shared by every session
+
+    Sessions attach with acquire() and detach with release(); the watcher and the
+    cached snapshot live only while at least one session is attached. Listings
+    handed out by listing()/get_all_files() are copies taken under the lock, so
+    later deltas never touch them and the path table is updated in place. Only
+    when a caller keeps the snapshot object itself (current()) is the next delta
+    applied to a copy-on-write fork. Concurrent full scans are coalesced into one walk, and
+    the columnar store and explorer view are built once per version for everyone.
+
+    With a persistent index (FILE_INDEX_DIR, opt-in), a new process re-lists only
+    the directories whose mtime or entries changed since the last run. The full-text content
+    index (CONTENT_INDEX) outlives the snapshot, so after a rescan only files
+    whose size or mtime changed are read again.
+    """
+
+    def __init__(self, scanner=None, max_depth=FROM_ENV, include=None, exclude=None, index=FROM_ENV,
+                 content_index=FROM_ENV):
+        # Backend is chosen at startup via FILE_SCANNER_BACKEND (scandir or native)
+        self.scanner = scanner or get_scanner()
+        # Compiling the native lister happens once per process, in the background so it
+        # doesn't hold up the first page render; scans wait for it
+        self.prepared = threading.Event()
+        self._prepare_result = None
+        threading.Thread(target=self._prepare, name="scanner-prepare", daemon=True).start()
+
+        # Recursive scan settings (default keeps the original current-directory listing)
+        self.max_depth = parse_max_depth(os.getenv("FILE_SCAN_MAX_DEPTH")) if max_depth is FROM_ENV else max_depth
+        self.include = include or parse_glob_list(os.getenv("FILE_SCAN_INCLUDE"))
+        self.exclude = exclude or parse_glob_list(os.getenv("FILE_SCAN_EXCLUDE"))
+        self.index = SQLiteIndex.from_env(self.scanner) if index is FROM_ENV else index
+        self.content_index = ContentIndex.from_env() if content_index is FROM_ENV else content_index
+        # Keeps its digest cache across snapshots; results are memoized per snapshot version
+        self.dedup = DuplicateFinder.from_env()
+        self.dedup_lock = threading.Lock()
+        self.duplicates = None
+
+        self.lock = threading.RLock()
+        # Serializes columnar store builds so concurrent sessions wait for one build
+        self.store_lock = threading.Lock()
+        self.sessions = 0
+        self.snapshot = None
+        self.published = False
+        self.name_index = None
+        self.dir_totals = None
+        self.store = None
+        self.explorer = None
+        self.watcher = None
+        self.scanning = None
+        self.scans = 0
+        self.last_update = None
+
+    def _prepare(self):
+        try:
+            self._prepare_result = self.scanner.prepare()
+        except Exception as e:
+            self._prepare_result = (False, str(e))
+        finally:
+            self.prepared.set()
+
+    @property
+    def prepare_result(self):
+        """(success, message) of the scanner setup, waiting for it if it is still running"""
+        self.prepared.wait()
+        return self._prepare_result
+
+    def acquire(self):
+        """Attach a session"""
+        with self.lock:
+            self.sessions += 1
+        return self
+
+    def release(self):
+        """Detach a session; the last one out stops the watcher and frees the snapshot"""
+        with self.lock:
+            self.sessions = max(0, self.sessions - 1)
+            if self.sessions == 0:
+                if self.watcher is not None:
+                    self.watcher.close()
+                    self.watcher = None
+                self.snapshot = None
+                self.name_index = None
+                self.dir_totals = None
+                self.store = None
+                self.explorer = None
+                self.duplicates = None
+
+    def current(self):
+        """The latest snapshot object (None before the first scan); callers must not modify it
+
+        The caller may keep iterating it, so the next delta goes to a fork.
+        """
+        with self.lock:
+            self.published = self.snapshot is not None
+            return self.snapshot
+
+    def listing(self):
+        """The latest {"files", "total_files", "version"} (None before the first scan), without publishing"""
+        with self.lock:
+            return self.snapshot.as_dict() if self.snapshot is not None else None
+
+    def _writable(self):
+        # Someone may still be reading the published version: change a fork instead
+        if self.published:
+            self.snapshot = self.snapshot.fork()
+            self.published = False
+        return self.snapshot
+
+    def iter_files(self, full=False):
+        """Stream file records as the scan progresses; the snapshot is published once the walk completes
+
+        If another session is already scanning, wait for its result instead of walking again.
+        full=True re-lists every directory instead of trusting the persistent index.
+        """
+        with self.lock:
+            running = self.scanning
+            if running is None:
+                self.scanning = threading.Event()
+                # Start watching before the walk so changes made during the scan aren't lost
+                if self.watcher is None:
+                    self.watcher = create_watcher(".", self.max_depth, self.exclude)
+                else:
+                    self.watcher.poll()
+        if running is not None:
+            running.wait()
+            data = self.listing()
+            if data is None:
+                # The other scan was abandoned part-way; do our own
+                yield from self.iter_files(full)
+            else:
+                yield from data['files']
+            return
+
+        try:
+            self.prepared.wait()
+            files = []
+            started = time.perf_counter()
+            if full and self.index is not None:
+                self.index.invalidate()
+            for record in self.scanner.walk(max_depth=self.max_depth, include=self.include, exclude=self.exclude,
+                                            cache=self.index):
+                files.append(record)
+                yield record
+            # Time spent waiting on a slow consumer of the stream is included
+            get_tracer().record("scan", time.perf_counter() - started, attrs={"entries": len(files)})
+            with span("index_build", entries=len(files)):
+                snapshot = FileSnapshot(files)
+                name_index = NameIndex(files)
+                snapshot.add_observer(name_index)
+                # Folder sizes: a delta then only updates the changed entry's ancestors
+                dir_totals = DirectoryTotals(files)
+                snapshot.add_observer(dir_totals)
+                if self.index is not None:
+                    # Deltas mark their directory for re-listing on the next start
+                    snapshot.add_observer(self.index)
+                if self.content_index is not None:
+                    # Queues new and changed text files for the background readers
+                    self.content_index.update(files)
+                    snapshot.add_observer(self.content_index)
+            with self.lock:
+                self.snapshot = snapshot
+                self.name_index = name_index
+                self.dir_totals = dir_totals
+                self.published = False
+                self.scans += 1
+                self.last_update = datetime.now()
+        finally:
+            with self.lock:
+                self.scanning.set()
+                self.scanning = None
+
+    def rescan(self, full=False):
+        for _ in self.iter_files(full):
+            pass
+
+    def sync_changes(self):
+        """Apply pending watcher deltas to the snapshot instead of rescanning"""
+        with self.lock:
+            if self.watcher is None or self.snapshot is None or self.scanning is not None:
+                return
+            events = self.watcher.poll()
+            if not events:
+                return
+            # Backend can't stat single paths (native lister) or events were lost
+            needs_rescan = (not self.scanner.supports_stat_path or
+                            any(event.kind == "overflow" for event in events))
+            if not needs_rescan:
+                with span("sync", events=len(events)):
+                    self._writable()
+                    for event in events:
+                        if event.kind == "deleted":
+                            self.snapshot.remove(event.path)
+                        elif event.kind == "renamed":
+                            self.snapshot.remove(event.old_path)
+                            self.refresh_path(event.path)
+                        else:
+                            self.refresh_path(event.path)
+                self.last_update = datetime.now()
+                return
+        self.rescan(full=True)
+
+    def refresh_path(self, path):
+        """Re-stat one path into the (writable) snapshot, walking directories that appeared"""
+        if not os.path.lexists(path):
+            self.snapshot.remove(path)
+            return
+        record = self.stat_selected(path)
+        if record is None:
+            return
+        depth = path.count(os.sep)
+        is_new = path not in self.snapshot
+        self.snapshot.upsert(record)
+
+        # A directory created or moved in brings its contents with it
+        if is_new and record['type'] == 'directory' and (self.max_depth is None or depth < self.max_depth):
+            remaining = None if self.max_depth is None else self.max_depth - depth - 1
+            for child in self.scanner.walk(path, max_depth=remaining, exclude=self.exclude):
+                child['path'] = os.path.join(path, child['path'])
+                if entry_selected(child, self.include, self.exclude):
+                    self.snapshot.upsert(child)
+
+    def stat_selected(self, path):
+        """Record for one path, or None if the scan settings (depth, include/exclude) leave it out"""
+        if self.max_depth is not None and path.count(os.sep) > self.max_depth:
+            return None
+        record = self.scanner.stat_path(".", path)
+        return record if entry_selected(record, self.include, self.exclude) else None
+
+    def apply_changes(self, paths):
+        """Bring a batch of changed paths into the snapshot as one delta"""
+        with self.lock:
+            if self.snapshot is None:
+                return
+            if self.scanner.supports_stat_path:
+                upserts = []
+                removals = []
+                for path in paths:
+                    if not os.path.lexists(path):
+                        removals.append(path)
+                        continue
+                    record = self.stat_selected(path)
+                    if record is not None:
+                        upserts.append(record)
+                if self._writable().apply(upserts, removals):
+                    self.last_update = datetime.now()
+                return
+        # Native lister can't stat single paths
+        self.rescan()
+
+    def get_all_files(self, force_refresh=False):
+        """Current listing as {"files", "total_files", "version"}, scanning if needed"""
+        with self.lock:
+            scanned = self.snapshot is not None
+        if not force_refresh and scanned:
+            self.sync_changes()
+        else:
+            self.rescan(full=force_refresh)
+        data = self.listing()
+        return data if data is not None else {"files": [], "total_files": 0}
+
+    def get_store(self):
+        """Columnar view of the current snapshot, built once per version for all sessions"""
+        # pandas is imported on first use rather than at app startup
+        from metadata_store import ColumnarStore
+        data = self.get_all_files()
+        version = data.get('version')
+        with self.store_lock:
+            if self.store is not None and self.store.version == version:
+                return self.store
+            with self.lock:
+                # Totals move on with later deltas; only use them if they match this version
+                current = self.snapshot
+                totals = (self.dir_totals.copy() if self.dir_totals is not None and current is not None
+                          and current.version == version else None)
+            if totals is None:
+                totals = DirectoryTotals(data['files']).copy()
+            with span("store_build", entries=len(data['files'])):
+                store = ColumnarStore.from_records(data['files'], version, totals)
+            # Versions only grow; never replace a newer store with an older one
+            if self.store is None or version is None or (self.store.version or 0) < version:
+                self.store = store
+            return store
+
+    def get_explorer(self):
+        """Paginated File Explorer view, reused until the snapshot changes"""
+        from explorer import ExplorerView
+        store = self.get_store()
+        with self.lock:
+            if self.explorer is None or self.explorer.store is not store:
+                self.explorer = ExplorerView(store)
+            return self.explorer
+
+    def get_duplicates(self):
+        """DuplicateGroups in the current snapshot, searched once per version for all sessions"""
+        data = self.get_all_files()
+        version = data.get('version')
+        with self.dedup_lock:
+            if self.duplicates is not None and self.duplicates[0] == version:
+                return self.duplicates[1]
+            with span("dedup", entries=len(data['files'])) as attrs:
+                groups = self.dedup.find(data['files'])
+                attrs['groups'] = len(groups)
+            self.duplicates = (version, groups)
+            return groups
+
+    def find_indexed(self, name):
+        """Exact (case-insensitive) name hit from the persistent index, without scanning; None if unsure"""
+        if self.index is None:
+            return None
+        for record in self.index.find(name):
+            path = record["path"]
+            if self.max_depth is not None and path.count(os.sep) > self.max_depth:
+                continue
+            if not entry_selected(record, self.include, self.exclude):
+                continue
+            # Entries under an excluded directory may be left over from runs with other settings
+            parents = path.split(os.sep)[:-1]
+            if self.exclude and any(matches_any(os.sep.join(parents[:i + 1]), part, self.exclude)
+                                    for i, part in enumerate(parents)):
+                continue
+            return record
+        return None
+
+    def search_content(self, terms):
+        """(paths of files containing every term, (indexed, pending)) from the content index"""
+        self.get_all_files()
+        if self.content_index is None:
+            return [], (0, 0)
+        return self.content_index.search(terms), self.content_index.progress()
+
+    def search(self, query, limit=10, fuzzy=False):
+        """Ranked filename lookup via the name index; returns records"""
+        self.get_all_files()
+        with self.lock:
+            if self.name_index is None:
+                return []
+            paths = self.name_index.search(query, limit=limit, fuzzy=fuzzy)
+            records = [self.snapshot.get(path) for path in paths]
+        return [record for record in records if record is not None]
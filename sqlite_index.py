@@ -0,0 +1,250 @@
+import os
+import sqlite3
+import hashlib
+import threading
+
+from cache import default_cache_dir
+from scanner import LazyRecord, StatState, size_unit
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime REAL);
+CREATE TABLE IF NOT EXISTS entries (
+    parent TEXT NOT NULL,
+    name TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    descend INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    uid INTEGER,
+    mode INTEGER,
+    win_attrs INTEGER,
+    created REAL,
+    modified REAL,
+    accessed REAL,
+    modified_text TEXT,
+    PRIMARY KEY (parent, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_name ON entries (name COLLATE NOCASE);
+"""
+
+# Clustered by (parent, name): a directory's listing is one contiguous range
+ENTRY_COLUMNS = ("parent", "name", "is_dir", "descend", "size", "uid", "mode", "win_attrs",
+                 "created", "modified", "accessed", "modified_text")
+
+
+class SQLiteIndex:
+    """Directory listings persisted to SQLite, so a new process only re-reads directories that changed
+
+    Plugs into ScandirScanner.walk as its listing cache: every listed directory
+    is stored with its mtime, and on the next walk a directory whose mtime is
+    unchanged is served from the index instead of being listed again. Editing a
+    file in place doesn't change the directory mtime, so each stored entry is
+    still stat'ed and the directory is re-listed when any size or mtime differs.
+    That keeps the index correct but saves little more than the listing itself,
+    which is why it is opt-in (FILE_INDEX_DIR).
+    """
+
+    def __init__(self, db_path, scanner, root="."):
+        self.db_path = db_path
+        self.scanner = scanner
+        self.root = root
+        self.lock = threading.Lock()
+        self.dirs = {}
+        self.listings = {}
+        self.pending = []
+        self.visited = set()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create()
+
+    @classmethod
+    def from_env(cls, scanner, root="."):
+        """FILE_INDEX_DIR: unset or "off" = no persistent index, "on" = default per-user location,
+        anything else = that directory
+
+        Only backends that list directory by directory (the scandir scanner) can use it.
+        """
+        value = os.getenv("FILE_INDEX_DIR", "")
+        if value.lower() in ("", "off", "none", "0", "false") or not hasattr(scanner, "list_directory"):
+            return None
+        directory = default_cache_dir("index") if value.lower() in ("on", "1", "true") else value
+        key = hashlib.sha256(os.path.abspath(root).encode("utf-8")).hexdigest()[:16]
+        try:
+            return cls(os.path.join(directory, f"{key}.sqlite3"), scanner, root)
+        except (OSError, sqlite3.Error):
+            return None
+
+    def _create(self):
+        row = None
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+        except sqlite3.OperationalError:
+            pass
+        if row is not None and row[0] != str(SCHEMA_VERSION):
+            self.conn.executescript("DROP TABLE IF EXISTS dirs; DROP TABLE IF EXISTS entries;")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('schema', ?)", (str(SCHEMA_VERSION),))
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def begin_walk(self):
+        """Load the stored listings in one query (the walk's workers then look them up in memory)"""
+        with self.lock:
+            self.visited = set()
+            self.pending = []
+            self.listings = {}
+            try:
+                self.dirs = dict(self.conn.execute("SELECT path, mtime FROM dirs"))
+                for row in self.conn.execute(f"SELECT {', '.join(ENTRY_COLUMNS)} FROM entries"):
+                    listing = self.listings.get(row[0])
+                    if listing is None:
+                        listing = self.listings[row[0]] = []
+                    listing.append(row)
+            except sqlite3.Error:
+                self.dirs = {}
+                self.listings = {}
+
+    def end_walk(self, completed):
+        """Write the directories listed during the walk in one transaction
+
+        After a complete walk, directories it no longer reached are forgotten.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, []
+            self.listings = {}
+            try:
+                for rel_dir, mtime, rows in pending:
+                    self.conn.execute("DELETE FROM entries WHERE parent = ?", (rel_dir,))
+                    self.conn.executemany(f"INSERT INTO entries ({', '.join(ENTRY_COLUMNS)}) "
+                                          f"VALUES ({', '.join('?' * len(ENTRY_COLUMNS))})", rows)
+                    self.conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?)", (rel_dir, mtime))
+                    self.dirs[rel_dir] = mtime
+                if completed:
+                    stale = [(path,) for path in self.dirs if path not in self.visited]
+                    self.conn.executemany("DELETE FROM dirs WHERE path = ?", stale)
+                    self.conn.executemany("DELETE FROM entries WHERE parent = ?", stale)
+                    for (path,) in stale:
+                        del self.dirs[path]
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+
+    def lookup(self, path, rel_dir, mtime):
+        """(records, subdirs) stored for rel_dir if its mtime still matches, else None"""
+        with self.lock:
+            self.visited.add(rel_dir)
+            if mtime is None or self.dirs.get(rel_dir) != mtime:
+                return None
+            rows = self.listings.pop(rel_dir, ())
+        records = []
+        subdirs = []
+        for row in rows:
+            if not self.unchanged(row, os.path.join(path, row[1])):
+                # Edited in place: the directory mtime didn't move, the entry did
+                return None
+            record = self.record_from_row(row, os.path.join(path, row[1]))
+            records.append(record)
+            if row[3]:
+                subdirs.append((record.full_path, record["path"]))
+        return records, subdirs
+
+    @staticmethod
+    def unchanged(row, full_path):
+        """True if the entry on disk still has the stored size and mtime"""
+        try:
+            try:
+                st = os.stat(full_path)
+            except OSError:
+                st = os.lstat(full_path)
+        except OSError:
+            return False
+        size = 0 if row[2] else st.st_size
+        return size == row[4] and st.st_mtime == row[9]
+
+    def store(self, rel_dir, mtime, records, subdirs):
+        """Queue rel_dir's fresh listing; end_walk writes it"""
+        descend = {rel for _, rel in subdirs}
+        rows = []
+        for record in records:
+            if not isinstance(record, LazyRecord):
+                return
+            state = record.state
+            rows.append((rel_dir, record["name"], record["type"] == "directory",
+                         record["path"] in descend, record["size"], state.uid, state.mode, state.win_attrs,
+                         state.created, state.modified, state.accessed, record["modified"]))
+        with self.lock:
+            self.visited.add(rel_dir)
+            self.pending.append((rel_dir, mtime, rows))
+
+    def record_from_row(self, row, full_path):
+        parent, name, is_dir, _, size, uid, mode, win_attrs, created, modified, accessed, modified_text = row
+        fields = {
+            "name": name,
+            "path": os.path.join(parent, name) if parent else name,
+            "type": "directory" if is_dir else "file",
+            "size": size,
+            "size_readable": size_unit(size, is_dir),
+            "modified": modified_text,
+        }
+        state = StatState(uid, mode, win_attrs, created, modified, accessed)
+        return LazyRecord(fields, state, full_path, self.scanner.load_field)
+
+    def invalidate(self, rel_dir=None):
+        """Make the next walk re-list rel_dir (every directory when None)"""
+        with self.lock:
+            try:
+                if rel_dir is None:
+                    self.conn.execute("UPDATE dirs SET mtime = NULL")
+                    self.dirs = dict.fromkeys(self.dirs)
+                elif self.dirs.get(rel_dir) is not None:
+                    # Already invalidated (or never listed) directories cost nothing
+                    self.conn.execute("UPDATE dirs SET mtime = NULL WHERE path = ?", (rel_dir,))
+                    self.dirs[rel_dir] = None
+                else:
+                    return
+                self.conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def find(self, name, limit=20):
+        """Indexed entries named name (case-insensitive) in directories that haven't changed since
+
+        Lets a cold find_file answer from the index with one stat per candidate
+        directory instead of walking the tree.
+        """
+        with self.lock:
+            try:
+                rows = self.conn.execute(
+                    f"SELECT {', '.join('e.' + column for column in ENTRY_COLUMNS)}, d.mtime "
+                    f"FROM entries e JOIN dirs d ON d.path = e.parent "
+                    f"WHERE e.name = ? COLLATE NOCASE LIMIT ?", (name, limit)).fetchall()
+            except sqlite3.Error:
+                return []
+        records = []
+        for row in rows:
+            parent = os.path.join(self.root, row[0]) if row[0] else self.root
+            try:
+                if row[-1] is None or os.stat(parent).st_mtime != row[-1]:
+                    continue
+            except OSError:
+                continue
+            if not self.unchanged(row, os.path.join(parent, row[1])):
+                continue
+            records.append(self.record_from_row(row[:-1], os.path.join(parent, row[1])))
+        return records
+
+    # Snapshot observer hooks: a delta means the stored listing of its directory is out of date
+
+    def on_upsert(self, old, new):
+        self.invalidate(os.path.dirname(new["path"]))
+
+    def on_remove(self, record):
+        self.invalidate(os.path.dirname(record.get("path", record["name"])))
@@ -0,0 +1,92 @@
+"""Local stand-in for the Gemini and Deepgram HTTP APIs
+
+Point the async service layer at it to measure throughput and latency offline:
+
+    python stand_in_server.py --port 8765 --latency 0.2
+    GEMINI_BASE_URL=http://127.0.0.1:8765 DEEPGRAM_BASE_URL=http://127.0.0.1:8765 AI_CLIENT=async streamlit run app.py
+"""
+import json
+import asyncio
+import argparse
+
+from aiohttp import web
+
+from backends import FakeLLMBackend, FakeTTSBackend
+
+
+def create_app(latency=0.2, chunk_delay=0.05, transcript="How many files are there?"):
+    llm = FakeLLMBackend(first_token_delay=0, chunk_delay=0)
+    tts = FakeTTSBackend(delay=0, per_char_delay=0)
+    stats = {"llm": 0, "stt": 0, "tts": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def prompt_of(body):
+        return "".join(part.get("text", "") for content in body.get("contents", [])
+                       for part in content.get("parts", []))
+
+    def candidate(text):
+        return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+
+    async def gemini(request):
+        model, _, action = request.match_info["target"].partition(":")
+        body = await request.json()
+        stats["llm"] += 1
+        stats["bytes_in"] += request.content_length or 0
+        answer = llm.respond(prompt_of(body))
+        await asyncio.sleep(latency)
+        if action == "generateContent":
+            return web.json_response(candidate(answer))
+        if action != "streamGenerateContent":
+            raise web.HTTPNotFound()
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for start in range(0, len(answer), llm.chunk_chars):
+            if start:
+                await asyncio.sleep(chunk_delay)
+            data = json.dumps(candidate(answer[start:start + llm.chunk_chars]))
+            await response.write(f"data: {data}\r\n\r\n".encode())
+        await response.write_eof()
+        return response
+
+    async def listen(request):
+        audio = await request.read()
+        stats["stt"] += 1
+        stats["bytes_in"] += len(audio)
+        await asyncio.sleep(latency)
+        return web.json_response({"results": {"channels": [{"alternatives": [{"transcript": transcript}]}]}})
+
+    async def speak(request):
+        body = await request.json()
+        stats["tts"] += 1
+        await asyncio.sleep(latency)
+        options = {key: request.query[key] for key in ("encoding", "container") if key in request.query}
+        if "sample_rate" in request.query:
+            options["sample_rate"] = int(request.query["sample_rate"])
+        audio = tts.synthesize(body.get("text", ""), request.query.get("model"), options)
+        stats["bytes_out"] += len(audio)
+        content_type = "audio/flac" if options.get("encoding") == "flac" else "audio/wav"
+        return web.Response(body=audio, content_type=content_type)
+
+    async def get_stats(request):
+        return web.json_response(stats)
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.router.add_post("/v1beta/models/{target}", gemini)
+    app.router.add_post("/v1/listen", listen)
+    app.router.add_post("/v1/speak", speak)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before each response starts")
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="seconds between streamed LLM chunks")
+    args = parser.parse_args()
+    web.run_app(create_app(args.latency, args.chunk_delay), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import numpy as np
+
+from audio_capture import SAMPLE_RATE, VoiceActivityDetector, WavFileSource, pcm_to_wav, record_until_silence
+
+FRAME = SAMPLE_RATE * 30 // 1000
+
+
+def clip(*parts):
+    """(seconds, amplitude) parts -> 16-bit samples: low noise for 0, a 220 Hz tone otherwise"""
+    rng = np.random.default_rng(0)
+    pieces = []
+    for seconds, amplitude in parts:
+        count = int(seconds * SAMPLE_RATE)
+        if amplitude:
+            pieces.append(amplitude * np.sin(2 * np.pi * 220 * np.arange(count) / SAMPLE_RATE))
+        else:
+            pieces.append(rng.normal(0, 40, count))
+    return np.concatenate(pieces).astype(np.int16)
+
+
+def capture(samples, **kwargs):
+    vad = VoiceActivityDetector(ratio=3.0, min_rms=300.0, start_ms=90, silence_ms=600)
+    return record_until_silence(WavFileSource(pcm_to_wav(samples.tobytes())), vad=vad, **kwargs)
+
+
+def test_segment_boundaries():
+    # Speech starts on frame 33 and lasts 40 frames
+    samples = clip((0.99, 0), (1.2, 3000), (1.5, 0))
+    recording = capture(samples, pre_roll_ms=300, tail_ms=300)
+    assert recording.speech
+    # Onset is confirmed on the 3rd voiced frame; the 10-frame pre-roll then holds
+    # 8 quiet frames before the speech, and 300 ms of trailing silence are kept
+    start = (33 - 8) * FRAME
+    end = (33 + 40) * FRAME + SAMPLE_RATE * 300 // 1000
+    assert recording.pcm == samples[start:end].tobytes()
+    assert abs(recording.duration - 1.74) < 1e-9
+
+
+def test_stops_at_the_silence_not_the_end_of_the_file():
+    # Speech on frames 10-29; the second burst comes after the silence that ends the capture
+    samples = clip((0.3, 0), (0.6, 3000), (1.0, 0), (0.6, 3000))
+    recording = capture(samples, pre_roll_ms=300, tail_ms=0)
+    assert recording.pcm == samples[(10 - 8) * FRAME:30 * FRAME].tobytes()
+
+
+def test_silence_only():
+    recording = capture(clip((2.0, 0)))
+    assert not recording.speech
+    assert recording.pcm == b""
@@ -0,0 +1,45 @@
+from collections import Counter
+
+import scanner
+from explorer import ExplorerView
+from metadata_store import ColumnarStore
+
+
+class CountingScanner(scanner.ScandirScanner):
+    def __init__(self):
+        super().__init__()
+        self.loads = Counter()
+
+    def load_field(self, record, field):
+        self.loads[field] += 1
+        return super().load_field(record, field)
+
+
+def make_store(tmp_path):
+    for i in range(5):
+        (tmp_path / f"f{i}.txt").write_text(str(i))
+    (tmp_path / ".hidden").write_text("h")
+    lister = CountingScanner()
+    records = list(lister.walk(str(tmp_path), max_depth=None))
+    return lister, ColumnarStore.from_records(records, 1)
+
+
+def test_store_build_loads_no_deferred_fields(tmp_path):
+    lister, store = make_store(tmp_path)
+    assert store.count(kind="file") == 6
+    assert not lister.loads
+
+
+def test_page_loads_only_its_rows(tmp_path):
+    lister, store = make_store(tmp_path)
+    view = ExplorerView(store)
+    page = view.page(view.rows(), page=1, page_size=2)
+    assert len(page) == 2
+    assert lister.loads == Counter(owner=2, attributes=2)
+
+
+def test_attribute_filter_loads_each_row_once(tmp_path):
+    lister, store = make_store(tmp_path)
+    assert store.filter(hidden=True).paths == [".hidden"]
+    assert store.summary()["hidden"] == 1
+    assert lister.loads == Counter(attributes=6)
@@ -0,0 +1,34 @@
+import pytest
+
+from metadata_store import ColumnarStore
+from query_engine import parse_query, answer_locally
+
+
+def record(name, size, kind="file"):
+    return {
+        "name": name, "path": name, "type": kind, "size": size, "size_readable": "bytes",
+        "owner": "alice", "created": "01/02/2024 10:00:00", "modified": "01/02/2024 10:00:00",
+        "accessed": "01/02/2024 10:00:00",
+        "attributes": {"hidden": False, "system": False, "readonly": False},
+    }
+
+
+@pytest.fixture
+def store():
+    return ColumnarStore.from_records([record("a.py", 300), record("b.txt", 2000), record("c.txt", 10),
+                                       record("docs", 0, "directory")])
+
+
+@pytest.mark.parametrize("query", ["top 5 files", "show the top 3", "top files"])
+def test_bare_top_ranks_by_size(query):
+    parsed = parse_query(query)
+    assert parsed.intent == "top"
+    assert (parsed.order_by, parsed.ascending) == ("size", False)
+
+
+def test_bare_top_answer(store):
+    assert answer_locally("top 2 files", store) == "The 2 largest files are: b.txt (2.0 KB) and a.py (300 bytes)."
+
+
+def test_total_size_of_one_file(store):
+    assert answer_locally("total size of python files", store) == "The Python file takes up 300 bytes in total."
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+
+import pytest
+
+from services import (AsyncServiceClient, RetryPolicy, ServiceConfig, ServiceError, ServiceLLMBackend,
+                      ServiceRunner, ServiceSTTBackend, ServiceTTSBackend)
+
+
+class StubClient:
+    """Stands in for AsyncServiceClient: same coroutine API, no network"""
+
+    def __init__(self, chunks=("Hello ", "from ", "the stub."), fail_after=None):
+        self.config = ServiceConfig(deadlines={"llm": 1.0, "stt": 1.0, "tts": 1.0}, retry=RetryPolicy(attempts=1))
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.prompts = []
+        self.cancelled = threading.Event()
+
+    async def generate(self, prompt):
+        self.prompts.append(prompt)
+        return "".join(self.chunks)
+
+    async def stream_generate(self, prompt):
+        self.prompts.append(prompt)
+        try:
+            for i, chunk in enumerate(self.chunks):
+                if i == self.fail_after:
+                    raise ServiceError("llm", "HTTP 400: bad request", 400)
+                await asyncio.sleep(0.01)
+                yield chunk
+        except asyncio.CancelledError:
+            self.cancelled.set()
+            raise
+
+    async def synthesize(self, text, voice_model, options=None):
+        return f"{voice_model}:{text}:{sorted((options or {}).items())}".encode()
+
+    async def transcribe(self, audio, mimetype="audio/wav"):
+        return f"{len(audio)} bytes of {mimetype}"
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def runner():
+    runner = ServiceRunner(StubClient())
+    yield runner
+    runner.close()
+
+
+def test_llm_backend_generate_and_stream(runner):
+    llm = ServiceLLMBackend(runner)
+    assert llm.generate("q1") == "Hello from the stub."
+    assert list(llm.stream("q2")) == ["Hello ", "from ", "the stub."]
+    assert runner.client.prompts == ["q1", "q2"]
+
+
+def test_stream_error_reaches_the_caller(runner):
+    runner.client.fail_after = 1
+    chunks = []
+    with pytest.raises(ServiceError) as error:
+        for chunk in ServiceLLMBackend(runner).stream("q"):
+            chunks.append(chunk)
+    assert chunks == ["Hello "]
+    assert error.value.status == 400
+
+
+def test_stopping_a_stream_cancels_the_request(runner):
+    runner.client.chunks = ["x"] * 100
+    stream = ServiceLLMBackend(runner).stream("q")
+    assert next(stream) == "x"
+    stream.close()
+    assert runner.client.cancelled.wait(1)
+
+
+def test_tts_and_stt_backends(runner):
+    assert ServiceTTSBackend(runner).synthesize("hi", "aura", {"encoding": "mulaw"}) == b"aura:hi:[('encoding', 'mulaw')]"
+    assert ServiceSTTBackend(runner).transcribe(b"abcd", "audio/flac") == "4 bytes of audio/flac"
+
+
+def test_call_retries_transient_statuses_only():
+    config = ServiceConfig(retry=RetryPolicy(attempts=3, base_delay=0))
+    client = AsyncServiceClient(config)
+    statuses = [503, 429, None]
+
+    async def request(service, method, url, read, **kwargs):
+        status = statuses.pop(0)
+        if status is not None:
+            raise ServiceError(service, f"HTTP {status}", status)
+        return "ok"
+
+    client._request = request
+
+    async def call():
+        async with client:
+            return await client._call("llm", "POST", "http://stub", None)
+
+    assert asyncio.run(call()) == "ok"
+    assert statuses == []
+
+    statuses[:] = [400, None]
+    with pytest.raises(ServiceError):
+        asyncio.run(call())
+    assert statuses == [None]
@@ -0,0 +1,17 @@
+import io
+import wave
+
+import numpy as np
+
+from audio_capture import pcm_to_wav
+from voice_pipeline import merge_wav
+
+
+def tone(seconds, rate):
+    return pcm_to_wav((np.sin(np.arange(int(seconds * rate)) / 10) * 1000).astype(np.int16).tobytes(), rate)
+
+
+def test_merge_wav_resamples_mixed_rates():
+    merged = wave.open(io.BytesIO(merge_wav([tone(0.5, 24000), tone(0.25, 16000), tone(0.25, 24000)])))
+    assert merged.getframerate() == 24000
+    assert merged.getnframes() == 24000
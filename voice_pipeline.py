@@ -0,0 +1,141 @@
+import io
+import re
+import time
+import wave
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# One synthesized piece of the reply; latency is seconds from pipeline start until audio was ready
+SpeechSegment = namedtuple("SpeechSegment", ["index", "text", "audio", "latency"])
+
+# Sentence end: terminal punctuation followed by whitespace (so "notes.txt" is not cut)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+class SentenceSplitter:
+    """Accumulates streamed text and hands back complete sentences
+
+    Sentences shorter than min_chars are held and merged with the next one,
+    except the first, which is released immediately to start audio sooner.
+    """
+
+    def __init__(self, min_chars=25):
+        self.min_chars = min_chars
+        self.buffer = ""
+        self.pending = ""
+        self.emitted = 0
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        parts = SENTENCE_END.split(self.buffer)
+        self.buffer = parts.pop()
+        sentences = []
+        for part in parts:
+            sentence = self._merge(part.strip())
+            if sentence:
+                sentences.append(sentence)
+        return sentences
+
+    def _merge(self, sentence):
+        if not sentence:
+            return None
+        text = f"{self.pending} {sentence}".strip()
+        if self.emitted and len(text) < self.min_chars:
+            self.pending = text
+            return None
+        self.pending = ""
+        self.emitted += 1
+        return text
+
+    def flush(self):
+        text = f"{self.pending} {self.buffer.strip()}".strip()
+        self.pending = ""
+        self.buffer = ""
+        if text:
+            self.emitted += 1
+        return text or None
+
+
+class StreamingVoicePipeline:
+    """Cuts a streamed LLM reply at sentence boundaries and synthesizes sentences concurrently
+
+    synthesize(text) -> audio bytes is called from worker threads, so it must not
+    touch Streamlit state. Segments are yielded in order as soon as each is ready.
+    """
+
+    def __init__(self, synthesize, clean=None, max_workers=3, min_chars=25, max_chars=500):
+        self.synthesize = synthesize
+        self.clean = clean or (lambda text: text)
+        self.max_workers = max_workers
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.first_audio_latency = None
+
+    def _synthesize(self, text, started):
+        audio = self.synthesize(text[:self.max_chars])
+        return audio, time.perf_counter() - started
+
+    def run(self, chunks):
+        started = time.perf_counter()
+        splitter = SentenceSplitter(self.min_chars)
+        futures = []
+        next_index = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            def submit(sentence):
+                text = self.clean(sentence)
+                if text:
+                    futures.append((text, executor.submit(self._synthesize, text, started)))
+
+            def ready():
+                # Release finished segments in order without waiting on the rest
+                nonlocal next_index
+                while next_index < len(futures) and futures[next_index][1].done():
+                    yield self._segment(next_index, *futures[next_index])
+                    next_index += 1
+
+            for chunk in chunks:
+                for sentence in splitter.feed(chunk):
+                    submit(sentence)
+                yield from ready()
+            tail = splitter.flush()
+            if tail:
+                submit(tail)
+            while next_index < len(futures):
+                futures[next_index][1].result()
+                yield from ready()
+
+    def _segment(self, index, text, future):
+        audio, latency = future.result()
+        if self.first_audio_latency is None:
+            self.first_audio_latency = latency
+        return SpeechSegment(index, text, audio, latency)
+
+
+def merge_wav(chunks):
+    """Concatenate WAV clips into one WAV in the first clip's format
+
+    Replies can mix sample rates (TTS_CODEC=mulaw comes back at 16 kHz, short
+    sentences requested as WAV at 24 kHz), so 16-bit mono clips are resampled;
+    any other channel count or sample width mismatch raises ValueError.
+    """
+    chunks = [c for c in chunks if c]
+    if not chunks:
+        return None
+    output = io.BytesIO()
+    with wave.open(output, "wb") as out:
+        for i, chunk in enumerate(chunks):
+            with wave.open(io.BytesIO(chunk), "rb") as clip:
+                if i == 0:
+                    out.setparams(clip.getparams())
+                frames = clip.readframes(clip.getnframes())
+                if (clip.getnchannels(), clip.getsampwidth()) != (out.getnchannels(), out.getsampwidth()):
+                    raise ValueError(f"Can't merge a {clip.getnchannels()}-channel {8 * clip.getsampwidth()}-bit "
+                                     f"clip into {out.getnchannels()}-channel {8 * out.getsampwidth()}-bit audio")
+                if clip.getframerate() != out.getframerate():
+                    if (clip.getnchannels(), clip.getsampwidth()) != (1, 2):
+                        raise ValueError(f"Can't resample {clip.getframerate()} Hz audio that isn't 16-bit mono")
+                    from audio_codec import resample_pcm
+                    frames = resample_pcm(frames, clip.getframerate(), out.getframerate())
+                out.writeframes(frames)
+    return output.getvalue()
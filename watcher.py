@@ -0,0 +1,261 @@
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+from collections import namedtuple
+
+from scanner import matches_any
+
+# kind is one of: created, deleted, modified, renamed, overflow (rescan needed)
+FileEvent = namedtuple("FileEvent", ["kind", "path", "old_path"])
+FileEvent.__new__.__defaults__ = (None,)
+
+# inotify masks (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def join_rel(rel_dir, name):
+    return os.path.join(rel_dir, name) if rel_dir else name
+
+
+def should_descend(rel_dir, max_depth, exclude):
+    """Whether a directory's contents are part of the scanned tree"""
+    if rel_dir and exclude and matches_any(rel_dir, os.path.basename(rel_dir), exclude):
+        return False
+    if max_depth is None or not rel_dir:
+        return True
+    return len(rel_dir.split(os.sep)) <= max_depth
+
+
+def parent_dir(rel_path):
+    return os.path.dirname(rel_path)
+
+
+class BaseWatcher:
+    """Collects filesystem changes under root; poll() drains them without blocking"""
+
+    def __init__(self, root=".", max_depth=0, exclude=None):
+        self.root = root
+        self.max_depth = max_depth
+        self.exclude = exclude
+
+    def poll(self, timeout=0):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PollingWatcher(BaseWatcher):
+    """Portable fallback: periodically stats the tree and diffs (inode, mtime, size)"""
+    name = "polling"
+
+    def __init__(self, root=".", max_depth=0, exclude=None, interval=2.0):
+        super().__init__(root, max_depth, exclude)
+        self.interval = interval
+        self.state = self.take_state()
+        self.last_poll = time.monotonic()
+
+    def take_state(self):
+        state = {}
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            try:
+                with os.scandir(os.path.join(self.root, rel_dir)) as it:
+                    for entry in it:
+                        rel_path = join_rel(rel_dir, entry.name)
+                        try:
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        state[rel_path] = (st.st_ino, st.st_mtime_ns, st.st_size, is_dir)
+                        if is_dir and should_descend(rel_path, self.max_depth, self.exclude):
+                            stack.append(rel_path)
+            except OSError:
+                continue
+        return state
+
+    def poll(self, timeout=0):
+        if time.monotonic() - self.last_poll < self.interval:
+            return []
+        self.last_poll = time.monotonic()
+        new_state = self.take_state()
+        old_state = self.state
+        self.state = new_state
+
+        events = []
+        deleted = {p: v for p, v in old_state.items() if p not in new_state}
+        deleted_by_ino = {v[0]: p for p, v in deleted.items()}
+        for path, value in new_state.items():
+            old = old_state.get(path)
+            if old is None:
+                old_path = deleted_by_ino.pop(value[0], None)
+                if old_path is not None:
+                    del deleted[old_path]
+                    events.append(FileEvent("renamed", path, old_path))
+                else:
+                    events.append(FileEvent("created", path))
+            elif old[0] != value[0] or old[1:3] != value[1:3]:
+                events.append(FileEvent("modified", path))
+        for path in deleted:
+            events.append(FileEvent("deleted", path))
+        return events
+
+
+class InotifyWatcher(BaseWatcher):
+    """Linux inotify watcher (via libc, no extra dependency)"""
+    name = "inotify"
+
+    def __init__(self, root=".", max_depth=0, exclude=None):
+        super().__init__(root, max_depth, exclude)
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.wd_to_dir = {}
+        self.dir_to_wd = {}
+        self.add_tree("")
+
+    def add_watch(self, rel_dir):
+        path = os.path.join(self.root, rel_dir).encode()
+        wd = self.libc.inotify_add_watch(self.fd, path, WATCH_MASK)
+        if wd >= 0:
+            self.wd_to_dir[wd] = rel_dir
+            self.dir_to_wd[rel_dir] = wd
+
+    def add_tree(self, rel_dir):
+        """Watch a directory and every subdirectory within the depth/exclude limits"""
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            if not should_descend(current, self.max_depth, self.exclude):
+                continue
+            self.add_watch(current)
+            try:
+                with os.scandir(os.path.join(self.root, current)) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(join_rel(current, entry.name))
+            except OSError:
+                continue
+
+    def drop_tree(self, rel_dir):
+        """Forget watches for a directory that was removed or moved away"""
+        for path in [d for d in self.dir_to_wd if d == rel_dir or d.startswith(rel_dir + os.sep)]:
+            wd = self.dir_to_wd.pop(path)
+            self.wd_to_dir.pop(wd, None)
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read_raw(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return b""
+        chunks = []
+        while True:
+            try:
+                chunk = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def poll(self, timeout=0):
+        buffer = self.read_raw(timeout)
+        events = []
+        moves = {}
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buffer):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = buffer[offset:offset + length].rstrip(b"\0").decode(errors="surrogateescape")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                events.append(FileEvent("overflow", ""))
+                continue
+            if mask & IN_IGNORED:
+                rel_dir = self.wd_to_dir.pop(wd, None)
+                if rel_dir is not None:
+                    self.dir_to_wd.pop(rel_dir, None)
+                continue
+            rel_dir = self.wd_to_dir.get(wd)
+            if rel_dir is None or not name:
+                # Self events (IN_DELETE_SELF/IN_MOVE_SELF) are reported by the parent watch
+                continue
+
+            path = join_rel(rel_dir, name)
+            is_dir = bool(mask & IN_ISDIR)
+            if mask & IN_CREATE:
+                events.append(FileEvent("created", path))
+                if is_dir:
+                    self.add_tree(path)
+            elif mask & IN_DELETE:
+                events.append(FileEvent("deleted", path))
+            elif mask & IN_MOVED_FROM:
+                moves[cookie] = (path, is_dir, len(events))
+                events.append(FileEvent("deleted", path))
+                if is_dir:
+                    self.drop_tree(path)
+            elif mask & IN_MOVED_TO:
+                moved = moves.pop(cookie, None)
+                if moved is not None:
+                    # Collapse the paired MOVED_FROM into a single rename
+                    events[moved[2]] = None
+                    events.append(FileEvent("renamed", path, moved[0]))
+                else:
+                    events.append(FileEvent("created", path))
+                if is_dir:
+                    self.add_tree(path)
+            elif mask & (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE):
+                events.append(FileEvent("modified", path))
+                continue
+            else:
+                continue
+
+            # Adding/removing an entry also changes the parent's mtime
+            if rel_dir:
+                events.append(FileEvent("modified", rel_dir))
+        return [e for e in events if e is not None]
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def create_watcher(root=".", max_depth=0, exclude=None, kind=None):
+    """Pick a watcher: FILE_WATCHER=inotify|polling|off, default inotify on Linux with polling fallback"""
+    kind = (kind or os.getenv("FILE_WATCHER") or "auto").lower()
+    if kind == "off":
+        return None
+    if kind in ("auto", "inotify") and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, max_depth, exclude)
+        except (OSError, AttributeError):
+            # No inotify (old libc, exhausted instances) - fall back to polling
+            pass
+    return PollingWatcher(root, max_depth, exclude,
+                          interval=float(os.getenv("FILE_WATCHER_INTERVAL", "2.0")))